@@ -0,0 +1,162 @@
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Signal, \
+    Cat, C
+from amaranth.sim import *
+
+from hram import HRAM
+from hram_arbiter import HRAMArbiter
+
+# Three masters share an HRAM through HRAMArbiter. The HRAM is a stand
+# in with HRAM's valid/ready handshake and a fixed transfer time (a real
+# single word transfer is ~40-60 cycles, see HRAM.CS_LOW_OVERHEAD_CYCLES).
+# Reads return ~addr so the masters can check they got their own data.
+#
+# Then the same masters write through the arbiter into HRAM itself
+# (hram.py, OSPI_SIM pins). OSPI_SIM has no device behind it, so a read
+# would wait for DQS forever and only writes are checked there.
+#
+# Master i keeps valid up for i cycles after ready and counts an error
+# if ready drops before valid does, HRAM's handshake.
+
+CYCLES = 20000
+LATENCY = 48
+LOADS = [1.0, 0.5, 0.1]     # Chance per idle cycle to start a transfer
+
+class HRAMStandIn(Elaboratable):
+    def __init__(self, arbiter, latency):
+        self.arb = arbiter
+        self.latency = latency
+
+    def elaborate(self, platform):
+        m = Module()
+
+        arb = self.arb
+        count = Signal(range(self.latency + 1))
+
+        with m.If(arb.valid & ~arb.ready):
+            with m.If(count == self.latency - 1):
+                m.d.sync += [
+                    count.eq(0),
+                    arb.ready.eq(1),
+                    arb.rdata.eq(~arb.addr),
+                ]
+            with m.Else():
+                m.d.sync += count.eq(count + 1)
+        with m.Elif(~arb.valid & arb.ready):
+            m.d.sync += arb.ready.eq(0)
+
+        return m
+
+class Master(Elaboratable):
+    def __init__(self, port, load, seed, hold=0, write=False):
+        self.port = port
+        self.threshold = int(load * 0x10000)
+        self.seed = seed
+        self.hold = hold
+        self.write = write
+
+        self.words = Signal(32)
+        self.errors = Signal(32)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        p = self.port
+
+        lfsr = Signal(16, reset=self.seed)
+        m.d.sync += lfsr.eq(Cat(lfsr[1:], lfsr[0] ^ lfsr[2] ^ lfsr[3] ^ lfsr[5]))
+
+        held = Signal(range(self.hold + 1))
+
+        m.d.comb += [
+            p.addr.eq(Cat(C(0, 2), self.words[0:8], C(self.seed & 0xFF, 8))),
+            p.wdata.eq(p.addr),
+            p.wstrb.eq(0b1111 if self.write else 0),
+        ]
+
+        with m.FSM():
+            with m.State("IDLE"):
+                with m.If(lfsr < self.threshold):
+                    m.next = "WAIT"
+            with m.State("WAIT"):
+                m.d.comb += p.valid.eq(1)
+                with m.If(p.ready):
+                    if not self.write:
+                        with m.If(p.rdata != ~p.addr):
+                            m.d.sync += self.errors.eq(self.errors + 1)
+                    m.d.sync += [
+                        self.words.eq(self.words + 1),
+                        held.eq(0),
+                    ]
+                    m.next = "HOLD" if self.hold else "IDLE"
+            with m.State("HOLD"):
+                m.d.comb += p.valid.eq(1)
+                with m.If(~p.ready):
+                    m.d.sync += self.errors.eq(self.errors + 1)
+                with m.If(held == self.hold - 1):
+                    m.next = "IDLE"
+                with m.Else():
+                    m.d.sync += held.eq(held + 1)
+
+        return m
+
+class Top(Elaboratable):
+    def __init__(self, scheme, hram=False):
+        self.hram = hram
+        self.arbiter = HRAMArbiter(scheme)
+        self.masters = [
+            Master(self.arbiter.add("m{}".format(i)), load, 0xACE1 + i * 0x1234,
+                   hold=i, write=hram)
+            for i, load in enumerate(LOADS)
+        ]
+
+    def elaborate(self, platform):
+        m = Module()
+
+        arb = self.arbiter
+        m.submodules.arbiter = arb
+        if self.hram:
+            m.submodules.hram = HRAM(Signal(), arb.addr, arb.wdata, arb.rdata,
+                                     arb.ready, arb.valid, arb.wstrb,
+                                     Signal(), Signal(4))
+        else:
+            m.submodules.hram = HRAMStandIn(arb, LATENCY)
+        for i, master in enumerate(self.masters):
+            m.submodules["m{}".format(i)] = master
+
+        return m
+
+def run(scheme, hram=False):
+    top = Top(scheme, hram)
+    sim = Simulator(top)
+
+    def stop():
+        for _ in range(CYCLES):
+            yield
+        print("{}{}:".format(scheme, " (HRAM)" if hram else ""))
+        total = 0
+        errors = 0
+        for i, load in enumerate(LOADS):
+            words = yield top.masters[i].words
+            errors += yield top.masters[i].errors
+            grants = yield top.arbiter.grants[i]
+            stalls = yield top.arbiter.stalls[i]
+            total += words
+            # A starved master has no words to divide its stalls by
+            per_word = "{:.1f}".format(stalls / words) if words else "-"
+            print("  m{} load {:.2f}: {:4} words, {:4} grants, {:>5} stall cycles per word ({} stalls)".format(
+                i, load, words, grants, per_word, stalls))
+        print("  {} words in {} cycles ({:.1f} cycles/word{})".format(
+            total, CYCLES, CYCLES / total,
+            "" if hram else ", transfer {} cycles".format(LATENCY)))
+        assert errors == 0
+
+    sim.add_clock(1e-6)
+    sim.add_sync_process(stop)
+    sim.run()
+
+for scheme in ("priority", "round_robin"):
+    run(scheme)
+run("round_robin", hram=True)
@@ -22,6 +22,7 @@ from amaranth.hdl import \
     Mux
 
 from ospi_sim import OSPI_SIM
+from hram_timing import HRAMTiming
 
 class HRAM(Elaboratable):
     """An interface for a Double-Data-Rate Octal SPI PSRAM.
@@ -47,16 +48,42 @@ class HRAM(Elaboratable):
         initng: (O)   Active (high).
                       Device is resetting and configuring.
         ```
+
+    Parameters:
+    -----------
+    clk_freq : Frequency (Hz) of the clock driving the controller. All
+               device timings (power-up, reset, tCEM, tCPH, tRC) are
+               converted to cycles of this clock. Defaults to the
+               platform's default clock, or SIM_CLK_FREQ in simulation.
+               Raises an Exception when a word transfer does not fit
+               inside tCEM, except on the SIM_CLK_FREQ default.
+    timing   : An optional HRAMTiming to override the datasheet defaults.
     """
 
+    # Simulation benches run the sync domain from a 1us clock.
+    SIM_CLK_FREQ = 1e6
+
+    # CE# low cycles of a single word transfer, excluding the data bytes.
+    # That is command, address and the worst case variable latency
+    # (2 x LC when the device inserts a refresh).
+    CS_LOW_OVERHEAD_CYCLES = 40
+    # Each data byte takes one clock edge which is two FSM states.
+    BYTE_CYCLES = 2
+    # Shortest CE# low time of any transfer (a read with minimum latency).
+    MIN_CS_LOW_CYCLES = 20
+
     def __init__(self,
                     reset: Signal,
                     addr: Signal, wdata: Signal, rdata: Signal,
                     ready: Signal, valid: Signal, wstrb: Signal,
                     initng: Signal,
                     debug: Signal,
+                    clk_freq = None,
+                    timing: HRAMTiming = None,
                 ):
-        
+        self.clk_freq = clk_freq
+        self.timing = timing
+
         # --- Ports ---
         self.reset     = reset
         self.address   = addr
@@ -74,6 +101,36 @@ class HRAM(Elaboratable):
     def elaborate(self,  platform: Platform) -> Module:
         m = Module()
 
+        timing = self.timing
+        # The simulation clock is not real time, so tCEM means nothing there
+        sim_clock = False
+        if timing is None:
+            clk_freq = self.clk_freq
+            if clk_freq is None:
+                if platform is not None:
+                    clk_freq = platform.default_clk_constraint.frequency
+                else:
+                    clk_freq = self.SIM_CLK_FREQ
+                    sim_clock = True
+            timing = HRAMTiming(clk_freq)
+        self.timing = timing
+
+        # The controller moves one word per CE# window. A whole word has to
+        # fit inside tCEM, otherwise the device misses refreshes.
+        self.max_burst_bytes = None
+        if not sim_clock:
+            self.max_burst_bytes = timing.max_burst_bytes(
+                self.CS_LOW_OVERHEAD_CYCLES, self.BYTE_CYCLES)
+            if self.max_burst_bytes < 4:
+                raise Exception("HRAM: a word transfer ({} cycles) exceeds tCEM ({} cycles) at {:.3f}MHz"
+                                .format(self.CS_LOW_OVERHEAD_CYCLES + 4 * self.BYTE_CYCLES,
+                                        timing.cem_cycles, timing.clk_freq / 1e6))
+
+        recovery = timing.recovery_cycles(self.MIN_CS_LOW_CYCLES)
+        print("HRAM: {}, recovery = {}, max burst = {}".format(
+            timing, recovery,
+            "-" if self.max_burst_bytes is None else "{} bytes".format(self.max_burst_bytes)))
+
         # Amaranth positive logic (1 = assert)
         SIG_ASSERT = Const(1, 1)
         SIG_DEASSERT = Const(0, 1)
@@ -85,6 +142,11 @@ class HRAM(Elaboratable):
         target_hit = Signal(4, reset=0)
 
         reset_ctr = Signal(4, reset=0)
+        # Counts down the power-up and reset-to-command delays.
+        delay_ctr = Signal(range(max(timing.pu_cycles, timing.rst_cycles) + 1),
+                           reset=timing.pu_cycles)
+        # Counts down the CE# high time between transfers (tCPH/tRC).
+        recover_ctr = Signal(range(recovery + 1), reset=0)
         # Latency counter
         lc_ctr = Signal(3, reset=0)
         # alternate
@@ -119,12 +181,12 @@ class HRAM(Elaboratable):
                 # m.d.sync += target_hit.eq(target_hit + 1)
                 # m.d.sync += self.debug.eq(0b0001)
 
-                # Device requires anything from 500us to 1ms to
-                # enter normal operation.
-                # TODO Calculate delay based on system clock
-                with m.If(self.reset):
+                # Device requires tPU (150us) to enter normal operation.
+                # The external reset can still cut the wait short.
+                with m.If(self.reset | (delay_ctr == 0)):
                     m.next = "RESET"
                 with m.Else():
+                    m.d.sync += delay_ctr.eq(delay_ctr - 1)
                     m.next = "POWERUP"
 
             with m.State("RESET"):
@@ -158,11 +220,11 @@ class HRAM(Elaboratable):
                 with m.If(reset_ctr == 8):
                     # m.d.sync += target_hit.eq(target_hit + 1)
                     m.d.sync += [
-                        self.initng.eq(SIG_DEASSERT),
                         reset_ctr.eq(0),
                         ospi.cs.eq(SIG_DEASSERT),
+                        delay_ctr.eq(timing.rst_cycles),
                     ]
-                    m.next = "IDLE"
+                    m.next = "RESET_WAIT"
                 with m.Else():
                     m.d.sync += [
                         spi_clk.eq(~spi_clk),   # Toggle clock
@@ -173,6 +235,15 @@ class HRAM(Elaboratable):
             with m.State("RESET_COMPLETE_H"):
                 m.next = "RESET_COMPLETE"
 
+            with m.State("RESET_WAIT"):
+                # No command is accepted for tRST after a global reset.
+                with m.If(delay_ctr == 0):
+                    m.d.sync += self.initng.eq(SIG_DEASSERT)
+                    m.next = "IDLE"
+                with m.Else():
+                    m.d.sync += delay_ctr.eq(delay_ctr - 1)
+                    m.next = "RESET_WAIT"
+
             with m.State("IDLE"):
                 m.d.sync += target_hit.eq(0b1100)
                 # m.d.sync += target_hit.eq(target_hit | 0b1000)
@@ -183,10 +254,14 @@ class HRAM(Elaboratable):
                     ospi.cs.eq(SIG_DEASSERT),
                 ]
 
+                # CE# must stay high for tCPH/tRC before the next transfer.
+                with m.If(recover_ctr != 0):
+                    m.d.sync += recover_ctr.eq(recover_ctr - 1)
+
                 # Wait for the "valid" signal to start a transfer.
                 # The "ready" flag is cleared by the host via the
                 # "valid" flag deasserting.
-                with m.If(self.valid & ~self.ready):
+                with m.If(self.valid & ~self.ready & (recover_ctr == 0)):
                     with m.If(write):
                         m.d.sync += [
                             # Copy data to buffer for transmission
@@ -424,6 +499,7 @@ class HRAM(Elaboratable):
                     # 1 = driven, 0 = not-driven (high-Z)
                     # Stop driving PIN
                     ospi.adq.oe.eq(0x00),
+                    recover_ctr.eq(recovery),
                 ]
                 m.next = "IDLE"
 
@@ -0,0 +1,161 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Signal, \
+    Const
+
+class HRAMPort():
+    """One master of an HRAMArbiter, the host side of HRAM.
+
+    Attributes:
+    -----------
+        ```txt
+        addr  : (I) Address
+        wdata : (I) Data to write
+        wstrb : (I) Write strobe/mask (0 = read)
+        valid : (I) Active (high), start a transfer
+        ready : (O) Active (high), transfer complete. It stays high
+                    until *valid* is deasserted, like HRAM's.
+        rdata : (O) Data read
+        ```
+    """
+    def __init__(self, name):
+        self.name = name
+
+        self.addr = Signal(32, name=name + "_addr")
+        self.wdata = Signal(32, name=name + "_wdata")
+        self.wstrb = Signal(4, name=name + "_wstrb")
+        self.valid = Signal(name=name + "_valid")
+        self.ready = Signal(name=name + "_ready")
+        self.rdata = Signal(32, name=name + "_rdata")
+
+class HRAMArbiter(Elaboratable):
+    """Shares one HRAM (valid/ready) between several masters.
+
+    An HRAM transfer takes tens of cycles, so the arbiter locks onto a
+    master for one transfer, from its *valid* until both the master has
+    dropped *valid* and HRAM has dropped *ready* again, then picks the
+    next master round-robin (or by priority, the first port added wins).
+    Arbitration costs a cycle per transfer.
+
+    The slave signals are created here and passed to HRAM(...):
+        ```txt
+        addr, wdata, wstrb, valid : (O) To HRAM
+        ready, rdata              : (I) From HRAM
+        ```
+
+    Parameters:
+    -----------
+    scheme : "round_robin" or "priority"
+
+    Attributes:
+    -----------
+        ```txt
+        grants : Per master count of transfers
+        stalls : Per master count of cycles waiting for the HRAM
+        ```
+    """
+
+    def __init__(self, scheme="round_robin"):
+        if scheme not in ("round_robin", "priority"):
+            raise Exception("Unknown arbitration scheme '{}'".format(scheme))
+        self.scheme = scheme
+        self.ports = []
+
+        self.addr = Signal(32)
+        self.wdata = Signal(32)
+        self.wstrb = Signal(4)
+        self.valid = Signal()
+        self.ready = Signal()
+        self.rdata = Signal(32)
+
+        self.grants = []
+        self.stalls = []
+
+    def add(self, name):
+        """Add a master and return its HRAMPort."""
+        port = HRAMPort(name)
+        self.ports.append(port)
+        self.grants.append(Signal(32, name=name + "_grants"))
+        self.stalls.append(Signal(32, name=name + "_stalls"))
+        return port
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        SIG_ASSERT = Const(1, 1)
+        SIG_DEASSERT = Const(0, 1)
+
+        n = len(self.ports)
+        if n == 0:
+            raise Exception("HRAMArbiter has no masters")
+
+        owner = Signal(range(n))
+        locked = Signal()
+        # HRAM has answered the owner's transfer
+        done = Signal()
+        # The owner has dropped valid since
+        released = Signal()
+
+        # Read data goes to everyone, only the owner sees ready.
+        for p in self.ports:
+            m.d.comb += p.rdata.eq(self.rdata)
+
+        for i, p in enumerate(self.ports):
+            with m.If(p.valid & ~(locked & (owner == i))):
+                m.d.sync += self.stalls[i].eq(self.stalls[i] + 1)
+
+        with m.If(locked):
+            with m.Switch(owner):
+                for i, p in enumerate(self.ports):
+                    with m.Case(i):
+                        m.d.comb += [
+                            self.addr.eq(p.addr),
+                            self.wdata.eq(p.wdata),
+                            self.wstrb.eq(p.wstrb),
+                            self.valid.eq(p.valid & ~done),
+                            # Held until the owner drops valid, like HRAM
+                            p.ready.eq((self.ready | done) & ~released),
+                        ]
+                        with m.If(done & ~p.valid):
+                            m.d.sync += released.eq(SIG_ASSERT)
+
+            # The owner gets one transfer. Once HRAM has answered, valid
+            # to HRAM drops so it clears ready, while the owner keeps
+            # seeing ready until it drops valid. The lock is released
+            # when both have happened, a new valid from the same master
+            # then waits for arbitration like any other.
+            with m.If(self.ready):
+                m.d.sync += done.eq(SIG_ASSERT)
+            with m.Elif(done & released):
+                m.d.sync += [
+                    done.eq(SIG_DEASSERT),
+                    released.eq(SIG_DEASSERT),
+                    locked.eq(SIG_DEASSERT),
+                ]
+        with m.Else():
+            def take(i):
+                m.d.sync += [
+                    owner.eq(i),
+                    locked.eq(SIG_ASSERT),
+                    self.grants[i].eq(self.grants[i] + 1),
+                ]
+
+            def pick(order):
+                with m.If(self.ports[order[0]].valid):
+                    take(order[0])
+                for i in order[1:]:
+                    with m.Elif(self.ports[i].valid):
+                        take(i)
+
+            if self.scheme == "priority":
+                pick(list(range(n)))
+            else:
+                with m.Switch(owner):
+                    for o in range(n):
+                        with m.Case(o):
+                            pick([(o + 1 + i) % n for i in range(n)])
+
+        return m
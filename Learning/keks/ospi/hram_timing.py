@@ -0,0 +1,68 @@
+from math import ceil, floor
+
+class HRAMTiming():
+    """Datasheet timings of the APS256XXN OPI PSRAM expressed in
+    system clock cycles.
+
+    The defaults come from the AC characteristics table (Table 30) of
+    APM_PSRAM_OPI_Xccela-APS256XXN-OBRx-v1.0-PKG.pdf in the root of the repo.
+
+    Parameters:
+    -----------
+    clk_freq : frequency (Hz) of the clock driving the HRAM controller.
+    t_pu     : Device initialization (power-up) time. (150us)
+    t_rst    : Global reset to first valid command. (2us)
+    t_cem    : Maximum CE# low time. The device refreshes itself while
+               CE# is high, so no single transfer may hold CE# low longer
+               than this. (2us standard temp, 0.5us extended temp)
+    t_cph    : Minimum CE# high time between transfers. (24ns @ 200MHz part)
+    t_rc     : Minimum read/write cycle time, CE# fall to CE# fall. (60ns)
+
+    Attributes:
+    -----------
+        ```txt
+        pu_cycles  : Cycles to wait after power-up before the reset command.
+        rst_cycles : Cycles to wait after the reset command.
+        cem_cycles : Maximum number of cycles CE# may stay low.
+        cph_cycles : Minimum number of cycles CE# must stay high.
+        rc_cycles  : Minimum number of cycles between CE# falling edges.
+        ```
+    """
+
+    def __init__(self, clk_freq,
+                    t_pu=150e-6, t_rst=2e-6,
+                    t_cem=2e-6, t_cph=24e-9, t_rc=60e-9):
+        if clk_freq <= 0:
+            raise Exception("HRAM clock frequency ({}) must be positive".format(clk_freq))
+
+        self.clk_freq = clk_freq
+
+        # Minimum times round up, maximum times round down. That way every
+        # value below is safe while padding by less than a single cycle.
+        self.pu_cycles  = ceil(t_pu * clk_freq)
+        self.rst_cycles = ceil(t_rst * clk_freq)
+        self.cph_cycles = max(1, ceil(t_cph * clk_freq))
+        self.rc_cycles  = max(1, ceil(t_rc * clk_freq))
+        self.cem_cycles = floor(t_cem * clk_freq)
+
+    def recovery_cycles(self, min_cs_low_cycles):
+        """Cycles CE# must stay high after a transfer that held CE# low
+        for at least *min_cs_low_cycles*. Both tCPH and tRC are met."""
+        return max(self.cph_cycles, self.rc_cycles - min_cs_low_cycles)
+
+    def max_burst_bytes(self, overhead_cycles, cycles_per_byte):
+        """The largest burst (in bytes) that fits inside tCEM.
+
+        *overhead_cycles* are the CE# low cycles spent on the command,
+        address and latency phases, *cycles_per_byte* the cycles needed
+        to move one data byte. Returns 0 if not even the overhead fits.
+        """
+        available = self.cem_cycles - overhead_cycles
+        if available <= 0:
+            return 0
+        return available // cycles_per_byte
+
+    def __repr__(self):
+        return ("HRAMTiming({:.3f}MHz: pu={}, rst={}, cem={}, cph={}, rc={} cycles)"
+                .format(self.clk_freq / 1e6, self.pu_cycles, self.rst_cycles,
+                        self.cem_cycles, self.cph_cycles, self.rc_cycles))
@@ -57,13 +57,19 @@ class Top(Elaboratable):
         clkDom = ClockDomain(domainName)#, reset_less=True)
         m.domains.sync = clkDom
 
+        # SIMPLE feedback: board clock * (DIVF + 1) / (DIVR + 1) / 2^DIVQ
+        DIVR = 0b0000
+        DIVF = 0b0000111
+        # DIVQ = 0b101        # 25MHz
+        DIVQ = 0b100        # 50MHz
+        clk_freq = platform.default_clk_constraint.frequency * (DIVF + 1) / (DIVR + 1) / 2 ** DIVQ
+
         pll = Instance("SB_PLL40_CORE",
             p_FEEDBACK_PATH = "SIMPLE",
             p_PLLOUT_SELECT = "GENCLK",
-            p_DIVR = Const(0b0000, 4),
-            p_DIVF = Const(0b0000111, 7),
-            # p_DIVQ = Const(0b101, 3),       # 25MHz
-            p_DIVQ = Const(0b100, 3),     # 50MHz
+            p_DIVR = Const(DIVR, 4),
+            p_DIVF = Const(DIVF, 7),
+            p_DIVQ = Const(DIVQ, 3),
             p_FILTER_RANGE = Const(0b101, 3),
 
             i_REFERENCECLK = clk_pin,
@@ -108,7 +114,8 @@ class Top(Elaboratable):
                                         ospi_ready, ospi_valid,
                                         ospi_wr_strb,
                                         ospi_initng,
-                                        ospi_debug)
+                                        ospi_debug,
+                                        clk_freq=clk_freq)  # PLL output
         # m.submodules.hramInserter = hramInserter = ResetInserter(ospi_reset)(hram)
 
         if platform is not None:
@@ -25,37 +25,73 @@ class ICEPLL(Elaboratable):
     -----------
     f_in      - the input frequency on inclk
     f_out     - the requested output frequency.
-    inclk     - the input clock signal
+    inclk     - the input clock, a resource name (e.g. "clk12") or a
+                clock signal, e.g. ClockSignal("sync") to leave the
+                board clock to the default domain as well
     outdomain - the clock domain of the output (defaults to "sync")
+    f_out_b   - frequency of a second output, f_out or f_out/2. Uses
+                SB_PLL40_2F_CORE.
+    outdomain_b - the clock domain of the second output
     """
 
-    def __init__(self, f_in, f_out, inclk, outdomain = "sync"):
-        self.params = PLLParams(f_in, f_out)
+    def __init__(self, f_in, f_out, inclk, outdomain = "sync", f_out_b = None,
+                 outdomain_b = None):
+        if (f_out_b is None) != (outdomain_b is None):
+            raise Exception("ICEPLL needs both f_out_b and outdomain_b for a second output")
+
+        self.params = PLLParams(f_in, f_out, f_out_b = f_out_b)
         self.outdomain = outdomain
+        self.outdomain_b = outdomain_b
         self.inclk = inclk
 
     def elaborate(self, platform):
         m = Module()
-        m.domains.sync = cd_sync = ClockDomain("sync")
+        cd_out = ClockDomain(self.outdomain)
+        m.domains += cd_out
+
+        # Lets nextpnr check (and report) the output clock
+        if platform is not None:
+            platform.add_clock_constraint(cd_out.clk, self.params.f_out)
 
         lock = Signal()
-        
-        m.submodules += Instance("SB_PLL40_CORE",
+
+        if isinstance(self.inclk, str):
+            inclk = platform.request(self.inclk).i
+        else:
+            inclk = self.inclk
+
+        settings = dict(
             p_FEEDBACK_PATH = self.params.feedback_path,
-            p_PLLOUT_SELECT = "GENCLK",
             p_DIVR = self.params.divr,
             p_DIVF = self.params.divf,
             p_DIVQ = self.params.divq,
             p_FILTER_RANGE = self.params.filter_range,
 
-            i_REFERENCECLK = platform.request(self.inclk).i,
+            i_REFERENCECLK = inclk,
             i_BYPASS = Const(0),
             i_RESETB = Const(1),
 
-            o_PLLOUTGLOBAL = ClockSignal(self.outdomain),
             o_LOCK = lock,
         )
 
+        if self.outdomain_b is None:
+            m.submodules += Instance("SB_PLL40_CORE",
+                p_PLLOUT_SELECT = "GENCLK",
+                o_PLLOUTGLOBAL = ClockSignal(self.outdomain),
+                **settings)
+        else:
+            cd_out_b = ClockDomain(self.outdomain_b)
+            m.domains += cd_out_b
+            if platform is not None:
+                platform.add_clock_constraint(cd_out_b.clk, self.params.f_out_b)
+            m.submodules += Instance("SB_PLL40_2F_CORE",
+                p_PLLOUT_SELECT_PORTA = "GENCLK",
+                p_PLLOUT_SELECT_PORTB = self.params.portb_select,
+                o_PLLOUTGLOBALA = ClockSignal(self.outdomain),
+                o_PLLOUTGLOBALB = ClockSignal(self.outdomain_b),
+                **settings)
+            m.submodules += ResetSynchronizer(~lock, domain = self.outdomain_b)
+
         m.submodules += ResetSynchronizer(~lock, domain = self.outdomain)
 
         return m
\ No newline at end of file
@@ -1,75 +1,136 @@
-class PLLParams():
-    """Object to hold PLL configuration parameters. """
-    
-    def __init__(self, f_in, req_f_out, simple_feedback = True):
-        """ Construct the PLL parameters from an input frequency and a
-        requested output frequency"""
-        if not 10e6 <= f_in <= 133e6:
-            raise Exception("PLL f_in (%.3f MHz) out of range" % (f_in / 1e6))
+from collections import namedtuple
+from functools import lru_cache
 
-        if not 16e6 <= req_f_out <= 275e6:
-            raise Exception("PLL f_out (%.3f MHz) out of range" % (req_f_out / 1e6))
+# iCE40 PLL limits (iCE40 sysCLOCK PLL Design and Usage Guide)
+F_IN_MIN, F_IN_MAX = 10e6, 133e6
+F_PFD_MIN, F_PFD_MAX = 10e6, 133e6
+F_VCO_MIN, F_VCO_MAX = 533e6, 1066e6
+F_OUT_MIN, F_OUT_MAX = 16e6, 275e6
+DIVR_MAX = 15
+DIVQ_MIN, DIVQ_MAX = 1, 6
 
-        # The documentation in the iCE40 PLL Usage Guide incorrectly lists the
-        # maximum value of DIVF as 63, when it is only limited to 63 when using
-        # feedback modes other that SIMPLE.
-        if simple_feedback:
-            divf_max = 128
-        else:
-            divf_max = 64
-
-        f_out = 0
-        
-        variants = []
-        for divr in range(0, 16):
-            f_pfd = f_in / (divr + 1)
-            if not 10e6 <= f_pfd <= 133e6:
+# One PLL setting. f_* are in Hz, ppm is the error against the request.
+PLLConfig = namedtuple("PLLConfig",
+                       ["divr", "divf", "divq", "f_pfd", "f_vco", "f_out", "ppm", "filter_range"])
+
+def filter_range(f_pfd):
+    """Loop filter setting for a PFD frequency (Hz), as icepll picks it."""
+    for i, limit in enumerate((17e6, 26e6, 44e6, 66e6, 101e6)):
+        if f_pfd < limit:
+            return i + 1
+    return 6
+
+@lru_cache(maxsize=None)
+def solve(f_in, f_out, simple_feedback=True):
+    """All valid settings for f_out, best first.
+
+    DIVR and DIVQ are enumerated, DIVF is not: for each (DIVR, DIVQ)
+    the VCO and output bounds fix the DIVF range and the two DIVFs
+    closest to f_out are computed directly, so at most 16 x 6 x 2
+    settings are checked instead of 16 x 128 x 6.
+
+    The ranking is the output error first, then the settings with less
+    jitter: the highest PFD frequency (the PLL multiplies less of the
+    reference's phase noise) and then the highest VCO frequency.
+
+    Results are cached per (f_in, f_out, simple_feedback).
+    """
+    divf_max = 127 if simple_feedback else 63
+    found = {}
+
+    for divr in range(DIVR_MAX + 1):
+        f_pfd = f_in / (divr + 1)
+        if f_pfd < F_PFD_MIN:
+            break
+        if f_pfd > F_PFD_MAX:
+            continue
+
+        for divq in range(DIVQ_MIN, DIVQ_MAX + 1):
+            # SIMPLE:     f_vco = f_pfd * (DIVF + 1), f_out = f_vco / 2^DIVQ
+            # NON_SIMPLE: f_out = f_pfd * (DIVF + 1), f_vco = f_out * 2^DIVQ
+            if simple_feedback:
+                vco_step, out_step = f_pfd, f_pfd / 2 ** divq
+            else:
+                vco_step, out_step = f_pfd * 2 ** divq, f_pfd
+
+            # DIVF + 1 within the VCO and output bounds
+            lo = max(1, -int(-max(F_VCO_MIN / vco_step, F_OUT_MIN / out_step) // 1))
+            hi = min(divf_max + 1, int(min(F_VCO_MAX / vco_step, F_OUT_MAX / out_step)))
+            if lo > hi:
                 continue
 
-            for divf in range(0, divf_max):
-                if simple_feedback:
-                    f_vco = f_pfd * (divf + 1)
-                    if not 533e6 <= f_vco <= 1066e6:
-                        continue
+            ideal = int(f_out / out_step)
+            for n in {min(hi, max(lo, ideal)), min(hi, max(lo, ideal + 1))}:
+                divf = n - 1
+                out = out_step * n
+                f_vco = vco_step * n
+
+                ppm = abs(out - f_out) / f_out * 1e6
+                found[(divr, divf, divq)] = PLLConfig(divr, divf, divq, f_pfd, f_vco, out,
+                                                      ppm, filter_range(f_pfd))
+
+    # Within 1e-3ppm counts as the same error
+    return tuple(sorted(found.values(),
+                        key=lambda c: (round(c.ppm, 3), -c.f_pfd, -c.f_vco)))
 
-                    for divq in range(1, 7):
-                        f_out = f_vco * (2 ** -divq)
-                        variants.append((divr, divf, divq, f_pfd, f_out))
+class PLLParams():
+    """Object to hold PLL configuration parameters.
+
+    f_in            - input frequency (Hz)
+    req_f_out       - requested output frequency (Hz)
+    simple_feedback - SIMPLE feedback (VCO divided by DIVF+1), else the
+                      output is fed back (NON_SIMPLE)
+    f_out_b         - second output of SB_PLL40_2F_CORE: the same
+                      frequency ("GENCLK") or half of it ("GENCLK_HALF").
+                      None for a single output PLL.
 
-                else:
-                    for divq in range(1, 7):
-                        f_vco = f_pfd * (divf + 1) * (2 ** divq)
-                        if not 533e6 <= f_vco <= 1066e6:
-                            continue
+    The chosen setting is in divr, divf, divq, filter_range, f_out and
+    ppm. alternatives holds every valid setting, best first, e.g. to
+    try a lower jitter one.
+    """
 
-                        f_out = f_vco * (2 ** -divq)
-                        variants.append((divr, divf, divq, f_pfd, f_out))
+    def __init__(self, f_in, req_f_out, simple_feedback = True, f_out_b = None):
+        if not F_IN_MIN <= f_in <= F_IN_MAX:
+            raise Exception("PLL f_in (%.3f MHz) out of range" % (f_in / 1e6))
 
-        if not variants:
+        if not F_OUT_MIN <= req_f_out <= F_OUT_MAX:
+            raise Exception("PLL f_out (%.3f MHz) out of range" % (req_f_out / 1e6))
+
+        self.alternatives = solve(f_in, req_f_out, simple_feedback)
+
+        if not self.alternatives:
             raise Exception("PLL f_in (%.3f MHz)/f_out (%.3f MHz) out of range" %
                     (f_in / 1e6, req_f_out / 1e6))
 
-        def f_out_diff(variant):
-            *_, f_out = variant
-            return abs(f_out - req_f_out)
-        self.divr, self.divf, self.divq, f_pfd, self.f_out = min(variants, key=f_out_diff)
-
-        if f_pfd < 17:
-            self.filter_range = 1
-        elif f_pfd < 26:
-            self.filter_range = 2
-        elif f_pfd < 44:
-            self.filter_range = 3
-        elif f_pfd < 66:
-            self.filter_range = 4
-        elif f_pfd < 101:
-            self.filter_range = 5
-        else:
-            self.filter_range = 6
+        best = self.alternatives[0]
+        self.divr = best.divr
+        self.divf = best.divf
+        self.divq = best.divq
+        self.f_pfd = best.f_pfd
+        self.f_vco = best.f_vco
+        self.f_out = best.f_out
+        self.ppm = best.ppm
+        self.filter_range = best.filter_range
 
         if simple_feedback:
             self.feedback_path = "SIMPLE"
         else:
             self.feedback_path = "NON_SIMPLE"
 
-        self.ppm = abs(req_f_out - f_out) / req_f_out * 1e6
+        # Port B of the 2F PLL
+        self.f_out_b = None
+        self.portb_select = None
+        if f_out_b is not None:
+            for select, divider in (("GENCLK", 1), ("GENCLK_HALF", 2)):
+                if abs(f_out_b * divider - req_f_out) <= req_f_out * 1e-6:
+                    self.portb_select = select
+                    self.f_out_b = self.f_out / divider
+                    break
+            else:
+                raise Exception("PLL f_out_b (%.3f MHz) must be f_out or f_out/2 (%.3f MHz)" %
+                        (f_out_b / 1e6, req_f_out / 1e6))
+
+    def __repr__(self):
+        return "PLLParams(DIVR={}, DIVF={}, DIVQ={}, FILTER_RANGE={}, {} -> {:.6f}MHz, {:.1f}ppm)".format(
+            self.divr, self.divf, self.divq, self.filter_range, self.feedback_path,
+            self.f_out / 1e6, self.ppm)
@@ -0,0 +1,46 @@
+from amaranth.sim import *
+
+from lib.sram_march import SRAMMarch, ALGORITHMS
+from lib.sram_sim import SRAMModel
+
+# Runs every march algorithm over the first WORDS words of bank 0
+# against the behavioral SRAM model. One data bit is stuck at 1 at
+# STUCK_HALF to show that failures are caught.
+
+WORDS = 1024
+STUCK_HALF = 0x155      # Half-word address in bank 0
+STUCK_BIT = 3
+
+for name in ALGORITHMS:
+    march = SRAMMarch(name, words=WORDS)
+
+    sim = Simulator(march)
+
+    # The controller's pins only exist once the design is elaborated.
+    model = SRAMModel(march.ctl.pins, read_cycles=2, write_cycles=2,
+                      stuck=[(0, STUCK_HALF, STUCK_BIT, 1)])
+
+    def proc():
+        yield march.start.eq(1)
+        yield
+        yield march.start.eq(0)
+        yield
+        while not (yield march.done):
+            yield
+
+        print("{:<13} errors={:<4} first={:#07x} last={:#07x} bits={:#010x} cycles={} (expected {})".format(
+            name,
+            (yield march.error_count),
+            (yield march.first_fail),
+            (yield march.last_fail),
+            (yield march.fail_bits),
+            (yield march.cycles),
+            march.expected_cycles()))
+        if model.violations:
+            print("  {} timing violations, first: {}".format(
+                len(model.violations), model.violations[0]))
+
+    sim.add_clock(1e-6)
+    sim.add_sync_process(proc)
+    sim.add_sync_process(model.process)
+    sim.run()
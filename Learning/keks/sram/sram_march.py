@@ -0,0 +1,118 @@
+from amaranth.build import Platform
+
+from amaranth_boards.machdyne_keks import KeksPlatform
+
+from lib.sram_march import SRAMMarch
+from lib.debouncer import Debouncer
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Signal, \
+    Array, \
+    Const, \
+    Mux
+
+from amaranth.build import \
+    Resource,\
+    PinsN
+
+# In this test we:
+# Run a March C- test over both banks (1MB) using lib/sram_march.py.
+# While running PMOD-B shows a moving bit. When complete
+# PMOD-B shows 0b11100000 on a pass or 0b1010pppp on a failure, in which
+# case PMOD-A shows page pppp of the results:
+#   0     : error count (saturated at 255)
+#   1-3   : first failing byte address, bits 0-7, 8-15, 16-23
+#   4-6   : last failing byte address, bits 0-7, 8-15, 16-23
+#   7-10  : failing data bits, bits 0-7 ... 24-31
+# After a failure button 0 steps through the pages, after the last page
+# (or on a pass) it runs the test again.
+
+ALGORITHM = "march_c-"
+# ALGORITHM = "checkerboard"
+# ALGORITHM = "address"
+
+class Top(Elaboratable):
+
+    def elaborate(self, platform: Platform) -> Module:
+        # We need a top level module
+        m = Module()
+
+        march = SRAMMarch(ALGORITHM)
+        m.submodules.march = march
+
+        count = Signal(32, reset = 0)
+        started = Signal()
+
+        m.d.sync += count.eq(count + 1)
+
+        # Start once after configuration.
+        with m.If(~started):
+            m.d.sync += started.eq(1)
+        m.d.comb += march.start.eq(~started)
+
+        if platform is not None:
+            # This pin arrangement is for the iCESugar LED pmods.
+            platform.add_resources([
+                Resource("pmod_a", 0, PinsN("1 2 3 4 7 8 9 10", dir="o", conn=("pmod", 0))),
+                Resource("pmod_b", 1, PinsN("1 2 3 4 7 8 9 10", dir="o", conn=("pmod", 1))),
+            ])
+
+            wht_led = platform.request('led_w', 0)
+            pmod_a = platform.request('pmod_a', 0)    # Vertical pmod
+            # PMOD-B has status
+            pmod_b = platform.request('pmod_b', 1)
+            button = platform.request('button', 0)
+
+            m.d.comb += wht_led.o.eq(count[23])
+
+            m.submodules.debouncer = debouncer = Debouncer()
+            m.d.comb += debouncer.btn_in.eq(button.i)
+
+            pages = Array([
+                Mux(march.error_count > 255, 255, march.error_count[0:8]),
+                march.first_fail[0:8], march.first_fail[8:16], march.first_fail[16:24],
+                march.last_fail[0:8], march.last_fail[8:16], march.last_fail[16:24],
+                march.fail_bits[0:8], march.fail_bits[8:16],
+                march.fail_bits[16:24], march.fail_bits[24:32],
+            ])
+            page = Signal(range(len(pages)))
+
+            with m.If(debouncer.btn_down_out & ~march.running):
+                with m.If((march.error_count == 0) | (page == len(pages) - 1)):
+                    m.d.comb += march.start.eq(1)
+                    m.d.sync += page.eq(0)
+                with m.Else():
+                    m.d.sync += page.eq(page + 1)
+
+            with m.If(march.running):
+                m.d.comb += [
+                    pmod_a.o.eq(0),
+                    pmod_b.o.eq(Const(1, 8) << count[21:24]),
+                ]
+            with m.Elif(march.error_count == 0):
+                m.d.comb += pmod_b.o.eq(0b11100000)
+            with m.Else():
+                m.d.comb += [
+                    pmod_a.o.eq(pages[page]),
+                    pmod_b.o.eq(0b10100000 | page),
+                ]
+
+        return m
+
+# To generate the bitstream, we build() the platform using our top level
+# module m.
+
+def builder():
+    top = Top()
+
+    # A platform contains board specific information about FPGA pin assignments,
+    # toolchain and specific information for uploading the bitfile.
+    platform = KeksPlatform()
+
+    platform.build(top, build_dir="/media/RAMDisk/build")
+
+
+if __name__ == "__main__":
+    builder()
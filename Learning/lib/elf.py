@@ -0,0 +1,112 @@
+import mmap
+import struct
+import sys
+
+# Loads the segments of a linked RISC-V program (the output of `ld` in
+# assembly/tests_femto) straight into a word image for a Mem, instead
+# of going through objdump, out2hex and firmware.hex.
+#
+# The file is mmap'ed and the segments are memoryviews into it, so the
+# only copy made is the final list of words.
+
+ELF_MAGIC = b"\x7fELF"
+ELFCLASS32 = 1
+ELFDATA2LSB = 1
+EM_RISCV = 0xF3
+PT_LOAD = 1
+
+# e_ident[16], e_type, e_machine, e_version, e_entry, e_phoff, e_shoff,
+# e_flags, e_ehsize, e_phentsize, e_phnum, e_shentsize, e_shnum, e_shstrndx
+EHDR = struct.Struct("<16sHHIIIIIHHHHHH")
+# p_type, p_offset, p_vaddr, p_paddr, p_filesz, p_memsz, p_flags, p_align
+PHDR = struct.Struct("<IIIIIIII")
+
+class ElfImage():
+    """The loadable segments of a little endian ELF32 RISC-V file.
+
+    Segments are placed at their physical (load) address, the part of
+    memsz beyond filesz (.bss) is zero.
+
+    Attributes:
+    -----------
+        ```txt
+        entry    : Entry point (e_entry)
+        segments : List of (address, data memoryview, memsz)
+        ```
+
+    Use as a context manager, or call close() when done, the views
+    keep the file mapped.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mm)
+        self.segments = []
+
+        if len(self.view) < EHDR.size or self.view[0:4] != ELF_MAGIC:
+            self.close()
+            raise Exception("{} is not an ELF file".format(path))
+
+        (ident, _, machine, _, entry, phoff, _, _, _,
+         phentsize, phnum, _, _, _) = EHDR.unpack_from(self.view)
+
+        if ident[4] != ELFCLASS32 or ident[5] != ELFDATA2LSB or machine != EM_RISCV:
+            self.close()
+            raise Exception("{} is not a little endian ELF32 RISC-V file".format(path))
+
+        self.entry = entry
+
+        for i in range(phnum):
+            (p_type, offset, _, paddr, filesz, memsz, _, _) = PHDR.unpack_from(
+                self.view, phoff + i * phentsize)
+            if p_type == PT_LOAD and memsz > 0:
+                self.segments.append((paddr, self.view[offset:offset + filesz], memsz))
+
+    def words(self, base=0, size=None) -> list:
+        """The image from *base* as 32bit words.
+
+        base : Address of the first word, segments below it are an error
+        size : Size in bytes, None ends at the last segment. Segments
+               that don't fit are an error.
+        """
+        if not self.segments:
+            return []
+
+        end = max(addr + memsz for addr, _, memsz in self.segments)
+        if size is None:
+            size = end - base
+        size = (size + 3) & ~3
+
+        image = bytearray(size)
+        for addr, data, memsz in self.segments:
+            if addr < base or addr + memsz > base + size:
+                raise Exception("Segment {:#010x}-{:#010x} of {} is outside {:#010x}-{:#010x}".format(
+                    addr, addr + memsz - 1, self.path, base, base + size - 1))
+            start = addr - base
+            image[start:start + len(data)] = data
+
+        # One copy into Python ints, native order when the host is little
+        # endian like the target.
+        if sys.byteorder == "little":
+            return memoryview(image).cast("I").tolist()
+        return list(struct.unpack("<{}I".format(size // 4), image))
+
+    def close(self):
+        for _, data, _ in self.segments:
+            data.release()
+        self.segments = []
+        self.view.release()
+        self.mm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+def load_elf(path, base=0, size=None) -> list:
+    """Word image of the ELF file at *path*, see ElfImage.words()."""
+    with ElfImage(path) as elf:
+        return elf.words(base, size)
@@ -0,0 +1,222 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Signal, \
+    Array, \
+    Cat, \
+    Const, \
+    Mux
+
+from lib.sram_sim import SRAM_SIM
+
+class SRAMController(Elaboratable):
+    """A 32bit memory port for the two Keks 16bit asynchronous SRAM banks.
+
+    The port uses the same bus as the FemtoRV cores (lib/femtorv32.py).
+    Each 32bit word is stored as two consecutive half-words of one bank:
+    the lower half-word at an even SRAM address, the upper half-word at
+    the next odd address. Bank 0 holds the first 512KB and bank 1 the
+    second 512KB, forming a single 1MB space (addresses 0x00000-0xFFFFF).
+
+    A read keeps OE asserted for both half-words and only changes A0, so
+    the two half-word cycles run back-to-back. A write skips any half-word
+    whose byte lanes are all masked and uses UB/LB for the partial ones.
+
+    Attributes:
+    -----------
+        ```txt
+        mem_addr  : (I)   Byte address (20 bits used)
+        mem_wdata : (I)   Data to write (32 bits)
+        mem_wmask : (I)   Write mask for each byte of a word. Active (high)
+                          A non-zero mask starts a write.
+        mem_rdata : (O)   Data read (32 bits), valid once mem_rbusy falls.
+        mem_rstrb : (I)   Active (high) to initiate memory read
+        mem_rbusy : (O)   Active (high) while a read is in progress
+        mem_wbusy : (O)   Active (high) while a write is in progress
+        ```
+    Requests are only accepted while both busy signals are low. Busy
+    rises the cycle after the request.
+
+    Parameters:
+    -----------
+    access_cycles : Cycles OE/WE are held for each half-word. Must cover
+                    the SRAM's access time (tAA/tWP) at the sync clock.
+    pins          : SRAM pins to drive. Defaults to the board resources,
+                    or SRAM_SIM() pins when simulating.
+    """
+
+    BANK_ADDR_WIDTH = 18    # Half-word address width of a bank
+
+    def __init__(self, access_cycles=2, pins=None):
+        if access_cycles < 1:
+            raise Exception("SRAM access_cycles ({}) must be >= 1".format(access_cycles))
+
+        self.access_cycles = access_cycles
+        self.pins = pins
+
+        self.mem_addr  = Signal(32)
+        self.mem_wdata = Signal(32)
+        self.mem_wmask = Signal(4)
+        self.mem_rdata = Signal(32)
+        self.mem_rstrb = Signal()
+        self.mem_rbusy = Signal()
+        self.mem_wbusy = Signal()
+
+    @property
+    def read_cycles(self):
+        """Cycles from mem_rstrb until the next request can be issued."""
+        return 1 + 2 * self.access_cycles
+
+    @property
+    def write_cycles(self):
+        """Cycles from a full word write until the next request."""
+        return 1 + 2 * (1 + self.access_cycles)
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        SIG_ASSERT = Const(1, 1)
+        SIG_DEASSERT = Const(0, 1)
+
+        if self.pins is None:
+            if platform is not None:
+                # The address bus of bank 1 is shared with bank 0.
+                self.pins = [platform.request('sram', 0),
+                             platform.request('sram_shared', 1)]
+            else:
+                m.submodules.sram = sram = SRAM_SIM()
+                self.pins = sram.banks
+        banks = self.pins
+
+        # Latched request
+        word_addr = Signal(self.BANK_ADDR_WIDTH - 1)
+        bank = Signal()
+        half = Signal()
+        wdata = Signal(32)
+        wmask = Signal(4)
+        lower = Signal(16)  # First half-word read
+
+        access_ctr = Signal(range(self.access_cycles), reset=0)
+
+        half_addr = Signal(self.BANK_ADDR_WIDTH)
+        m.d.comb += half_addr.eq(Cat(half, word_addr))
+
+        # The address bus is shared, drive every bank that has one.
+        for b in banks:
+            if hasattr(b, "a"):
+                m.d.comb += b.a.o.eq(half_addr)
+
+        d_in = Array([b.d.i for b in banks])[bank]
+
+        def select(en, sel=bank):
+            # Chip select, only the addressed bank is enabled.
+            return [b.cs.o.eq(en & (sel == n)) for n, b in enumerate(banks)]
+
+        def strobe(pin, en, sel=bank):
+            return [getattr(b, pin).o.eq(en & (sel == n))
+                    for n, b in enumerate(banks)]
+
+        def drive(data, mask):
+            return [s for b in banks for s in (
+                    b.d.o.eq(data),
+                    b.d.oe.eq(SIG_ASSERT),
+                    b.dm.o.eq(mask))]
+
+        def release():
+            return [b.d.oe.eq(SIG_DEASSERT) for b in banks]
+
+        m.d.comb += [
+            self.mem_rbusy.eq(0),
+            self.mem_wbusy.eq(0),
+        ]
+
+        with m.FSM(reset="IDLE") as fsm:
+            self.fsm = fsm
+
+            with m.State("IDLE"):
+                with m.If(self.mem_rstrb):
+                    m.d.sync += [
+                        bank.eq(self.mem_addr[19]),
+                        word_addr.eq(self.mem_addr[2:19]),
+                        half.eq(0),
+                        access_ctr.eq(self.access_cycles - 1),
+                        *select(SIG_ASSERT, self.mem_addr[19]),
+                        *strobe("oe", SIG_ASSERT, self.mem_addr[19]),
+                        *[b.dm.o.eq(0b11) for b in banks],
+                    ]
+                    m.next = "READ"
+                with m.Elif(self.mem_wmask.any()):
+                    # Start with the lower half-word unless it is masked off.
+                    first_upper = ~self.mem_wmask[0:2].any()
+                    m.d.sync += [
+                        bank.eq(self.mem_addr[19]),
+                        word_addr.eq(self.mem_addr[2:19]),
+                        half.eq(first_upper),
+                        wdata.eq(self.mem_wdata),
+                        wmask.eq(self.mem_wmask),
+                        *select(SIG_ASSERT, self.mem_addr[19]),
+                        *drive(Mux(first_upper, self.mem_wdata[16:32],
+                                                self.mem_wdata[0:16]),
+                               Mux(first_upper, self.mem_wmask[2:4],
+                                                self.mem_wmask[0:2])),
+                    ]
+                    m.next = "WRITE_SETUP"
+
+            # ------------------------------------------------
+            # Read cycle (OE controlled). OE stays asserted for both
+            # half-words, only A0 changes.
+            # ------------------------------------------------
+            with m.State("READ"):
+                m.d.comb += self.mem_rbusy.eq(1)
+                with m.If(access_ctr == 0):
+                    m.d.sync += access_ctr.eq(self.access_cycles - 1)
+                    with m.If(~half):
+                        m.d.sync += [
+                            lower.eq(d_in),
+                            half.eq(1),
+                        ]
+                    with m.Else():
+                        m.d.sync += [
+                            self.mem_rdata.eq(Cat(lower, d_in)),
+                            *strobe("oe", SIG_DEASSERT),
+                            *select(SIG_DEASSERT),
+                        ]
+                        m.next = "IDLE"
+                with m.Else():
+                    m.d.sync += access_ctr.eq(access_ctr - 1)
+
+            # ------------------------------------------------
+            # Write cycle (WE controlled). Address, data and UB/LB
+            # were set up in the previous cycle.
+            # ------------------------------------------------
+            with m.State("WRITE_SETUP"):
+                m.d.comb += self.mem_wbusy.eq(1)
+                m.d.sync += [
+                    *strobe("we", SIG_ASSERT),
+                    access_ctr.eq(self.access_cycles - 1),
+                ]
+                m.next = "WRITE_STROBE"
+
+            with m.State("WRITE_STROBE"):
+                m.d.comb += self.mem_wbusy.eq(1)
+                with m.If(access_ctr == 0):
+                    m.d.sync += strobe("we", SIG_DEASSERT)
+                    with m.If(~half & wmask[2:4].any()):
+                        # Upper half-word
+                        m.d.sync += [
+                            half.eq(1),
+                            *drive(wdata[16:32], wmask[2:4]),
+                        ]
+                        m.next = "WRITE_SETUP"
+                    with m.Else():
+                        m.d.sync += [
+                            *release(),
+                            *select(SIG_DEASSERT),
+                        ]
+                        m.next = "IDLE"
+                with m.Else():
+                    m.d.sync += access_ctr.eq(access_ctr - 1)
+
+        return m
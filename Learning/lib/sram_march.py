@@ -0,0 +1,267 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Signal, \
+    Array, \
+    Cat, \
+    Const, \
+    Mux
+
+from lib.sram_controller import SRAMController
+
+# Data generators. Each march operation reads or writes one of these
+# patterns, derived from the word index being tested.
+D_ZERO  = 0     # 0x00000000
+D_ONE   = 1     # 0xFFFFFFFF
+D_CB    = 2     # Checkerboard: 0x55555555 on even words, 0xAAAAAAAA on odd
+D_NCB   = 3     # Inverted checkerboard
+D_ADDR  = 4     # Address-in-address: the word index
+D_NADDR = 5     # Inverted word index
+
+UP   = 0
+DOWN = 1
+
+def W(data):
+    return (1, data)
+
+def R(data):
+    return (0, data)
+
+# March elements: (direction, [operations]). A "don't care" direction
+# is written as UP.
+ALGORITHMS = {
+    # March C-: {⇕(w0); ⇑(r0,w1); ⇑(r1,w0); ⇓(r0,w1); ⇓(r1,w0); ⇕(r0)}
+    # Detects stuck-at, transition, coupling and address decoder faults.
+    "march_c-": [
+        (UP,   [W(D_ZERO)]),
+        (UP,   [R(D_ZERO), W(D_ONE)]),
+        (UP,   [R(D_ONE), W(D_ZERO)]),
+        (DOWN, [R(D_ZERO), W(D_ONE)]),
+        (DOWN, [R(D_ONE), W(D_ZERO)]),
+        (UP,   [R(D_ZERO)]),
+    ],
+    # Adjacent cells (and bits) hold opposite values.
+    "checkerboard": [
+        (UP, [W(D_CB)]),
+        (UP, [R(D_CB)]),
+        (UP, [W(D_NCB)]),
+        (UP, [R(D_NCB)]),
+    ],
+    # Every word holds its own index, catches aliased addresses.
+    "address": [
+        (UP, [W(D_ADDR)]),
+        (UP, [R(D_ADDR)]),
+        (UP, [W(D_NADDR)]),
+        (UP, [R(D_NADDR)]),
+    ],
+}
+
+class SRAMMarch(Elaboratable):
+    """A march test engine mastering an SRAMController.
+
+    The elements of the selected algorithm are flattened into a small
+    table of operations. A new operation is issued the same cycle the
+    controller drops busy, and the previous read is checked in that
+    cycle too, so the test runs at the controller's full rate.
+
+    Attributes:
+    -----------
+        ```txt
+        start          : (I) Pulse to (re)start the test.
+        running        : (O) Active (high) while the test runs.
+        done           : (O) Set when the test has finished.
+        error_count    : (O) Number of failing reads.
+        first_fail     : (O) Byte address of the first failing read.
+        last_fail      : (O) Byte address of the last failing read.
+        fail_bits      : (O) OR of expected ^ read over all failing reads,
+                             shows which data lines are bad.
+        cycles         : (O) Clock cycles taken by the test.
+        ```
+
+    Parameters:
+    -----------
+    algorithm     : A key of ALGORITHMS or a list of march elements.
+    words         : Number of 32bit words to test. Default is both banks.
+    ctl           : The SRAMController to use. One is created if None.
+    access_cycles : Passed to the created SRAMController.
+    """
+
+    WORDS = 1 << 18     # 2 banks x 256K half-words = 256K words
+
+    def __init__(self, algorithm="march_c-", words=WORDS, ctl=None, access_cycles=2):
+        if isinstance(algorithm, str):
+            if algorithm not in ALGORITHMS:
+                raise Exception("Unknown march algorithm '{}'".format(algorithm))
+            algorithm = ALGORITHMS[algorithm]
+
+        if words < 1 or words > self.WORDS:
+            raise Exception("Word count ({}) must be 1..{}".format(words, self.WORDS))
+
+        self.elements = algorithm
+        self.words = words
+        self.ctl = ctl if ctl is not None else SRAMController(access_cycles)
+
+        self.start = Signal()
+        self.running = Signal()
+        self.done = Signal()
+        self.error_count = Signal(32)
+        self.first_fail = Signal(32)
+        self.last_fail = Signal(32)
+        self.fail_bits = Signal(32)
+        self.cycles = Signal(32)
+
+    def expected_cycles(self):
+        """Test time in cycles when there are no gaps between requests."""
+        total = 0
+        for _, ops in self.elements:
+            for write, _ in ops:
+                total += self.ctl.write_cycles if write else self.ctl.read_cycles
+        # Plus the cycle "start" is seen and the final check.
+        return total * self.words + 2
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        ctl = self.ctl
+        m.submodules.ctl = ctl
+
+        # ---------------------------------------------------
+        # Flatten the elements into an operation table
+        # ---------------------------------------------------
+        op_write = []
+        op_data = []
+        op_last = []
+        elem_first = []
+        elem_down = []
+        for direction, ops in self.elements:
+            elem_first.append(len(op_write))
+            elem_down.append(direction == DOWN)
+            for n, (write, data) in enumerate(ops):
+                op_write.append(write)
+                op_data.append(data)
+                op_last.append(n == len(ops) - 1)
+
+        op_write = Array([Const(x, 1) for x in op_write])
+        op_data = Array([Const(x, 3) for x in op_data])
+        op_last = Array([Const(x, 1) for x in op_last])
+        elem_first = Array([Const(x, range(len(op_data))) for x in elem_first])
+        elem_down = Array([Const(x, 1) for x in elem_down])
+
+        last_elem = len(self.elements) - 1
+        last_word = self.words - 1
+
+        elem = Signal(range(len(self.elements)))
+        op = Signal(range(len(op_data)))
+        word = Signal(range(self.words))
+
+        # ---------------------------------------------------
+        # Data generator
+        # ---------------------------------------------------
+        def pattern(kind, index):
+            cb = Mux(index[0], Const(0xAAAAAAAA, 32), Const(0x55555555, 32))
+            addr = Signal(32)
+            m.d.comb += addr.eq(index)
+            return Array([
+                Const(0x00000000, 32),
+                Const(0xFFFFFFFF, 32),
+                cb,
+                ~cb,
+                addr,
+                ~addr,
+                Const(0, 32),
+                Const(0, 32),
+            ])[kind]
+
+        data = Signal(32)
+        m.d.comb += data.eq(pattern(op_data[op], word))
+
+        # Read waiting to be checked
+        check = Signal()
+        expected = Signal(32)
+        check_addr = Signal(32)
+
+        idle = Signal()
+        m.d.comb += idle.eq(~ctl.mem_rbusy & ~ctl.mem_wbusy)
+
+        m.d.comb += [
+            ctl.mem_addr.eq(Cat(Const(0, 2), word)),
+            ctl.mem_wdata.eq(data),
+        ]
+
+        with m.If(self.running):
+            m.d.sync += self.cycles.eq(self.cycles + 1)
+
+        # Check the previous read as soon as the controller is idle.
+        with m.If(check & idle):
+            m.d.sync += check.eq(0)
+            with m.If(ctl.mem_rdata != expected):
+                m.d.sync += [
+                    self.error_count.eq(self.error_count + 1),
+                    self.last_fail.eq(check_addr),
+                    self.fail_bits.eq(self.fail_bits | (ctl.mem_rdata ^ expected)),
+                ]
+                with m.If(self.error_count == 0):
+                    m.d.sync += self.first_fail.eq(check_addr)
+
+        with m.FSM(reset="IDLE") as fsm:
+            self.fsm = fsm
+
+            with m.State("IDLE"):
+                with m.If(self.start):
+                    m.d.sync += [
+                        self.running.eq(1),
+                        self.done.eq(0),
+                        self.error_count.eq(0),
+                        self.first_fail.eq(0),
+                        self.last_fail.eq(0),
+                        self.fail_bits.eq(0),
+                        self.cycles.eq(0),
+                        elem.eq(0),
+                        op.eq(elem_first[0]),
+                        word.eq(Mux(elem_down[0], last_word, 0)),
+                    ]
+                    m.next = "RUN"
+
+            with m.State("RUN"):
+                with m.If(idle):
+                    # Issue the current operation
+                    m.d.comb += [
+                        ctl.mem_rstrb.eq(~op_write[op]),
+                        ctl.mem_wmask.eq(Mux(op_write[op], 0b1111, 0b0000)),
+                    ]
+                    with m.If(~op_write[op]):
+                        m.d.sync += [
+                            check.eq(1),
+                            expected.eq(data),
+                            check_addr.eq(ctl.mem_addr),
+                        ]
+
+                    # and step to the next one.
+                    with m.If(~op_last[op]):
+                        m.d.sync += op.eq(op + 1)
+                    with m.Elif(word != Mux(elem_down[elem], 0, last_word)):
+                        m.d.sync += [
+                            op.eq(elem_first[elem]),
+                            word.eq(Mux(elem_down[elem], word - 1, word + 1)),
+                        ]
+                    with m.Elif(elem != last_elem):
+                        m.d.sync += [
+                            elem.eq(elem + 1),
+                            op.eq(elem_first[elem + 1]),
+                            word.eq(Mux(elem_down[elem + 1], last_word, 0)),
+                        ]
+                    with m.Else():
+                        m.next = "FINISH"
+
+            with m.State("FINISH"):
+                # Wait for the final request and its check.
+                with m.If(idle & ~check):
+                    m.d.sync += [
+                        self.running.eq(0),
+                        self.done.eq(1),
+                    ]
+                    m.next = "IDLE"
+
+        return m
@@ -0,0 +1,206 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Signal
+
+from amaranth.sim import Passive, Settle
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+    from array import array
+
+# Stand-ins for the Keks "sram" resources when there is no platform.
+# The pins use the same names and (asserted = 1) polarity that
+# platform.request('sram', n) returns.
+
+class SRAMPin():
+    def __init__(self, width, name, io=False):
+        self.o = Signal(width, name=name + "_o")
+        if io:
+            self.oe = Signal(name=name + "_oe")
+            self.i = Signal(width, name=name + "_i")
+
+class SRAMBank():
+    def __init__(self, bank, addr_width=18, data_width=16):
+        prefix = "sram{}_".format(bank)
+        self.cs = SRAMPin(1, prefix + "cs")
+        self.oe = SRAMPin(1, prefix + "oe")
+        self.we = SRAMPin(1, prefix + "we")
+        self.dm = SRAMPin(2, prefix + "dm")     # 01 = LB, 10 = UB
+        self.a = SRAMPin(addr_width, prefix + "a")
+        self.d = SRAMPin(data_width, prefix + "d", io=True)
+
+class SRAM_SIM(Elaboratable):
+    """Both Keks SRAM banks for simulation.
+
+    Each bank is a 256K x 16bit asynchronous SRAM. On the board the
+    address lines are shared, here each bank has its own copy and a
+    controller drives both with the same value.
+    """
+
+    def __init__(self, banks=2):
+        self.banks = [SRAMBank(n) for n in range(banks)]
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        return m
+
+class SRAMModel():
+    """Behavioral model of the Keks asynchronous SRAM banks.
+
+    Attach it to a simulation with:
+        sim.add_sync_process(SRAMModel(pins).process)
+
+    The model looks at the pins once per clock and works in whole
+    cycles, like the controllers do:
+
+    - Read: the data pins carry the stored half-word once CS, OE and the
+      address have been stable for *read_cycles* cycles. Before that they
+      carry UNDEFINED, so a controller sampling too early reads garbage.
+    - Write: the half-word is stored when WE deasserts, using the address,
+      data and UB/LB seen in the last cycle of the pulse. A pulse shorter
+      than *write_cycles*, or one where the address moves, is a violation
+      and nothing is written.
+    - The controller driving the data pins while the chip has OE asserted
+      is a bus contention violation.
+
+    Violations are collected as strings in *violations*, and raised
+    straight away if *strict* is set.
+
+    Parameters:
+    -----------
+    pins         : A list of SRAMBank (SRAM_SIM().banks or a controller's pins)
+    read_cycles  : Cycles needed from address/OE to valid data (tAA/tDOE).
+    write_cycles : Minimum cycles WE must be asserted (tPWE).
+    words        : Half-words per bank.
+    strict       : Raise an Exception on the first violation.
+    stuck        : Faults to inject, a list of (bank, addr, bit, value).
+    """
+
+    UNDEFINED = 0xDEAD
+
+    def __init__(self, pins, read_cycles=1, write_cycles=1, words=1 << 18, strict=False, stuck=None):
+        if read_cycles < 1 or write_cycles < 1:
+            raise Exception("SRAM model read/write cycles must be >= 1")
+
+        self.pins = pins
+        self.read_cycles = read_cycles
+        self.write_cycles = write_cycles
+        self.words = words
+        self.strict = strict
+        self.stuck = list(stuck or [])
+
+        if np is not None:
+            self.mem = np.zeros((len(pins), words), dtype=np.uint16)
+        else:
+            self.mem = [array('H', bytes(2 * words)) for _ in pins]
+
+        self.violations = []
+        self.reads = 0
+        self.writes = 0
+
+    def load(self, bank, addr, halfwords):
+        """Preload *halfwords* into *bank* starting at half-word *addr*."""
+        for n, hw in enumerate(halfwords):
+            self.mem[bank][addr + n] = hw
+
+    def load_words(self, byte_addr, words):
+        """Preload 32bit words using the SRAMController layout."""
+        for n, w in enumerate(words):
+            wa = (byte_addr >> 2) + n
+            bank, half = (wa >> 17) & 1, (wa & 0x1FFFF) << 1
+            self.load(bank, half, [w & 0xFFFF, w >> 16])
+
+    def read_word(self, byte_addr):
+        """Read back a 32bit word using the SRAMController layout."""
+        wa = byte_addr >> 2
+        bank, half = (wa >> 17) & 1, (wa & 0x1FFFF) << 1
+        return int(self.mem[bank][half]) | (int(self.mem[bank][half + 1]) << 16)
+
+    def _violation(self, cycle, bank, msg):
+        text = "cycle {} bank {}: {}".format(cycle, bank, msg)
+        self.violations.append(text)
+        if self.strict:
+            raise Exception("SRAM timing violation: " + text)
+
+    def process(self):
+        yield Passive()
+
+        # Per bank state
+        read_state = [None] * len(self.pins)    # (addr) being read
+        read_age = [0] * len(self.pins)
+        write_state = [None] * len(self.pins)   # (addr, data, dm)
+        write_age = [0] * len(self.pins)
+        write_bad = [False] * len(self.pins)
+
+        cycle = 0
+        while True:
+            yield
+            yield Settle()
+            cycle += 1
+
+            for n, b in enumerate(self.pins):
+                cs = yield b.cs.o
+                oe = yield b.oe.o
+                we = yield b.we.o
+                addr = yield b.a.o
+                driving = yield b.d.oe
+
+                if addr >= self.words:
+                    addr %= self.words
+
+                # ---- Write cycle ----
+                if cs and we:
+                    state = (addr, (yield b.d.o), (yield b.dm.o))
+                    if write_state[n] is not None and write_state[n][0] != addr:
+                        write_bad[n] = True
+                        self._violation(cycle, n,
+                            "address changed from {:#x} to {:#x} while WE asserted"
+                            .format(write_state[n][0], addr))
+                    write_state[n] = state
+                    write_age[n] += 1
+                elif write_state[n] is not None:
+                    waddr, data, dm = write_state[n]
+                    if write_age[n] < self.write_cycles:
+                        self._violation(cycle, n,
+                            "WE pulse of {} cycles at {:#x}, needs {}"
+                            .format(write_age[n], waddr, self.write_cycles))
+                    elif not write_bad[n]:
+                        old = int(self.mem[n][waddr])
+                        if dm & 0b01:
+                            old = (old & 0xFF00) | (data & 0x00FF)
+                        if dm & 0b10:
+                            old = (old & 0x00FF) | (data & 0xFF00)
+                        for bank, saddr, bit, value in self.stuck:
+                            if bank == n and saddr == waddr:
+                                old = (old | (1 << bit)) if value else (old & ~(1 << bit))
+                        self.mem[n][waddr] = old
+                        self.writes += 1
+                    write_state[n] = None
+                    write_age[n] = 0
+                    write_bad[n] = False
+
+                # ---- Read cycle ----
+                if cs and oe and not we:
+                    if driving:
+                        self._violation(cycle, n, "bus contention, OE asserted while data driven")
+                    if read_state[n] == addr:
+                        read_age[n] += 1
+                    else:
+                        read_state[n] = addr
+                        read_age[n] = 1
+                    if read_age[n] >= self.read_cycles:
+                        if read_age[n] == self.read_cycles:
+                            self.reads += 1
+                        yield b.d.i.eq(int(self.mem[n][addr]))
+                    else:
+                        yield b.d.i.eq(self.UNDEFINED)
+                else:
+                    read_state[n] = None
+                    read_age[n] = 0
+                    yield b.d.i.eq(self.UNDEFINED)
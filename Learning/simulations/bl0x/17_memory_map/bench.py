@@ -1,61 +1,77 @@
+import sys
+
 from amaranth import *
 from amaranth.sim import *
 
 from soc import SOC
+from memory import firmware
+from tools.uart_monitor import UartMonitor
+
+# Traces the CPU and collects what the UART sends (tools/uart_monitor.py)
+# through the first alphabet. The firmware waits 2^WAIT_SHIFT loops per LED
+# step instead of the board's 2^18, and "slow" runs on the simulation
+# clock itself (sim_slow=0), so that is ~16K cycles. bench_compiled.py
+# runs the board's waits.
+#
+#   python bench.py [--bypass]      # --bypass: TX UART takes a byte per cycle
 
-soc = SOC()
+WAIT_SHIFT = 6
+# 16 waits of ~8 cycles per loop, then the alphabet
+CYCLES = 256 * 2 ** WAIT_SHIFT + 5000
+
+soc = SOC(uart_bypass="--bypass" in sys.argv[1:], program=firmware(wait_shift=WAIT_SHIFT).mem,
+          sim_slow=0)
 
 sim = Simulator(soc)
 
-prev_clk = 0
+# The UART runs in "slow": 1MBaud from 12MHz, 12 clocks per bit
+monitor = UartMonitor(soc.tx, 12, uart=soc.uart_tx)
 
 def proc():
     cpu = soc.cpu
     mem = soc.memory
     while True:
-        global prev_clk
-        clk = yield soc.slow_clk
-        if prev_clk == 0 and prev_clk != clk:
-            state = (yield soc.cpu.fsm.state)
-            if state == 2:
-                print("-- NEW CYCLE -----------------------")
-                print("  F: LEDS = {:05b}".format((yield soc.leds)))
-                print("  F: pc={}".format((yield cpu.pc)))
-                print("  F: instr={:#032b}".format((yield cpu.instr)))
-                if (yield cpu.isALUreg):
-                    print("     ALUreg rd={} rs1={} rs2={} funct3={}".format(
-                        (yield cpu.rdId), (yield cpu.rs1Id), (yield cpu.rs2Id),
-                        (yield cpu.funct3)))
-                if (yield cpu.isALUimm):
-                    print("     ALUimm rd={} rs1={} imm={} funct3={}".format(
-                        (yield cpu.rdId), (yield cpu.rs1Id), (yield cpu.Iimm),
-                        (yield cpu.funct3)))
-                if (yield cpu.isBranch):
-                    print("    BRANCH rs1={} rs2={}".format(
-                        (yield cpu.rs1Id), (yield cpu.rs2Id)))
-                if (yield cpu.isLoad):
-                    print("    LOAD")
-                if (yield cpu.isStore):
-                    print("    STORE")
-                if (yield cpu.isSystem):
-                    print("    SYSTEM")
-                    break
-            if state == 4:
-                print("  R: LEDS = {:05b}".format((yield soc.leds)))
-                print("  R: rs1={}".format((yield cpu.rs1)))
-                print("  R: rs2={}".format((yield cpu.rs2)))
-            if state == 1:
-                print("  E: LEDS = {:05b}".format((yield soc.leds)))
-                print("  E: Writeback x{} = {:032b}".format((yield cpu.rdId),
-                                             (yield cpu.writeBackData)))
-            if state == 8:
-                print("  NEW")
+        state = (yield soc.cpu.fsm.state)
+        if state == 2:
+            print("-- NEW CYCLE -----------------------")
+            print("  F: LEDS = {:05b}".format((yield soc.leds)))
+            print("  F: pc={}".format((yield cpu.pc)))
+            print("  F: instr={:#032b}".format((yield cpu.instr)))
+            if (yield cpu.isALUreg):
+                print("     ALUreg rd={} rs1={} rs2={} funct3={}".format(
+                    (yield cpu.rdId), (yield cpu.rs1Id), (yield cpu.rs2Id),
+                    (yield cpu.funct3)))
+            if (yield cpu.isALUimm):
+                print("     ALUimm rd={} rs1={} imm={} funct3={}".format(
+                    (yield cpu.rdId), (yield cpu.rs1Id), (yield cpu.Iimm),
+                    (yield cpu.funct3)))
+            if (yield cpu.isBranch):
+                print("    BRANCH rs1={} rs2={}".format(
+                    (yield cpu.rs1Id), (yield cpu.rs2Id)))
+            if (yield cpu.isLoad):
+                print("    LOAD")
+            if (yield cpu.isStore):
+                print("    STORE")
+            if (yield cpu.isSystem):
+                print("    SYSTEM")
+                break
+        if state == 4:
+            print("  R: LEDS = {:05b}".format((yield soc.leds)))
+            print("  R: rs1={}".format((yield cpu.rs1)))
+            print("  R: rs2={}".format((yield cpu.rs2)))
+        if state == 1:
+            print("  E: LEDS = {:05b}".format((yield soc.leds)))
+            print("  E: Writeback x{} = {:032b}".format((yield cpu.rdId),
+                                     (yield cpu.writeBackData)))
+        if state == 8:
+            print("  NEW")
         yield
-        prev_clk = clk
 
 sim.add_clock(1e-6)
-sim.add_sync_process(proc)
+sim.add_sync_process(proc, domain="slow")
+sim.add_sync_process(monitor.process, domain="slow")
 
 with sim.write_vcd('bench.vcd', 'bench.gtkw', traces=soc.ports):
-    # Let's run for a quite long time
-    sim.run_until(2, )
+    sim.run_until(CYCLES * 1e-6, run_passive=True)
+
+print("UART: {!r}".format(bytes(monitor.data)))
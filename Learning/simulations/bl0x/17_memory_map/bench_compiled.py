@@ -0,0 +1,49 @@
+import sys
+import time
+
+from amaranth.sim import *
+
+from soc import SOC
+from memory import firmware
+from tools.cxxrtl_sim import CxxrtlSim
+
+# The firmware of memory.py compiled with CXXRTL, up to the end of its
+# first alphabet. The SOC runs "slow" on the simulation clock itself
+# (sim_slow=0), so the UART at 1MBaud from 12MHz is 12 clocks per bit.
+# The 16 LED steps wait 2^wait_shift loops, 18 like on the board takes
+# ~34M clocks (a few minutes), the default 10 a fraction of a second.
+#
+# The design is built with an empty RAM and the firmware is loaded when
+# the simulation starts, so a firmware change does not rebuild it.
+#
+#   python bench_compiled.py [wait_shift]
+
+WAIT_SHIFT = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+# 16 waits of ~8 clocks per loop, then the alphabet
+CYCLES = 256 * 2 ** WAIT_SHIFT + 100000
+BIT_CYCLES = 12000000 // 1000000
+PYTHON_CYCLES = 20000
+ALPHABET = b"abcdefghijklmnopqrstuvwxyz\r\n"
+
+image = firmware(wait_shift=WAIT_SHIFT).mem
+
+soc = SOC(program=[], sim_slow=0)
+compiled = CxxrtlSim(soc, ports=[soc.tx, soc.rx, soc.leds], tx=soc.tx, leds=soc.leds,
+                     memory="memory r_port")
+result = compiled.run(CYCLES, bit_cycles=BIT_CYCLES, stop=b"z\r\n", image=image)
+
+print("UART: {!r}".format(result["output"].decode("latin-1")))
+print("LEDs: {:05b} after {} cycles".format(result["leds"], result["cycles"]))
+print("CXXRTL:       {:12.0f} cycles/s".format(result["rate"]))
+
+assert result["stopped"], "no alphabet in {} cycles".format(CYCLES)
+assert result["output"] == ALPHABET
+
+# The same design in amaranth.sim for a few cycles, for the speed
+soc = SOC(program=image, sim_slow=0)
+sim = Simulator(soc)
+sim.add_clock(1e-6)
+start = time.time()
+sim.run_until(PYTHON_CYCLES * 1e-6, run_passive=True)
+rate = PYTHON_CYCLES / (time.time() - start)
+print("amaranth.sim: {:12.0f} cycles/s ({:.0f}x)".format(rate, result["rate"] / rate))
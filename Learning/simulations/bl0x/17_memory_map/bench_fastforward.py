@@ -0,0 +1,41 @@
+import time
+
+from amaranth.sim import *
+
+from soc import SOC
+from tools.fastforward import fast_forward, restore
+from tools.uart_monitor import UartMonitor
+
+# The alphabet of the firmware in memory.py without the 16 LED waits
+# before it: ~8M instructions, weeks of amaranth.sim. The instruction
+# model runs them up to the label l2, the RTL continues from there and
+# prints the alphabet. The TX UART is bypassed (tools/uart_monitor.py)
+# so the CPU does not wait for the bits either.
+
+soc = SOC(uart_bypass=True)
+sim = Simulator(soc)
+memory = soc.memory
+
+start = time.time()
+model = fast_forward(memory.mem.init, size=memory.mem.depth, until_pc=memory.labels["L2"])
+print("Model: {} instructions in {:.1f}s to pc 0x{:x}, LEDs {:05b}".format(
+    model.instret, time.time() - start, model.pc, model.io.leds))
+
+monitor = UartMonitor(soc.tx, 12, uart=soc.uart_tx)
+
+def done():
+    yield from monitor.wait_for(b"\r\n")
+
+sim.add_clock(1e-6)
+sim.add_process(restore(soc.cpu, memory.mem, model, leds=soc.leds))
+sim.add_sync_process(monitor.process, domain="slow")
+sim.add_sync_process(done, domain="slow")
+
+start = time.time()
+sim.run()
+print("RTL:   {!r} in {} CPU cycles, {:.1f}s".format(
+    bytes(monitor.data), monitor.cycle, time.time() - start))
+
+# The model from the same point prints the same
+model.run(until=lambda m: m.io.uart.endswith(b"\r\n"))
+assert bytes(monitor.data) == bytes(model.io.uart)
@@ -9,12 +9,13 @@ from amaranth.hdl import \
 
 from tools.riscv_assembler import RiscvAssembler
 
-class Mem(Elaboratable):
-
-    def __init__(self):
-        a = RiscvAssembler()
+def firmware(wait_shift=18):
+    """The LED counter and alphabet firmware, assembled. Each LED step
+    waits 2^wait_shift loops, a smaller wait_shift fits a simulation.
+    """
+    a = RiscvAssembler()
 
-        a.read("""begin:
+    a.read("""begin:
         LI sp, 0x1800
         LI gp, 0x400000
 
@@ -49,7 +50,7 @@ class Mem(Elaboratable):
 
         wait:
         LI t0, 1
-        SLLI t0, t0, 18
+        SLLI t0, t0, {wait_shift}
 
         wait_loop:
         ADDI t0, t0, -1
@@ -64,10 +65,27 @@ class Mem(Elaboratable):
         AND t1, t1, t0
         BNEZ t1, putc_loop
         RET
-        """)
+        """.format(wait_shift=wait_shift))
 
-        a.assemble()
-        self.instructions = a.mem
+    a.assemble()
+    return a
+
+class Mem(Elaboratable):
+    """Block RAM on the CPU bus, 1536 words.
+
+    Parameters
+    ----------
+    program : Initial contents (list of words), zero filled. The
+              firmware() above if None, then labels has its labels.
+    """
+
+    def __init__(self, program=None):
+        if program is None:
+            a = firmware()
+            program, self.labels = a.mem, a.labels
+        else:
+            self.labels = {}
+        self.instructions = list(program)
 
         # Add 0 memory up to offset 1024 / word 256
         while len(self.instructions) < (1024 * 6 / 4):
@@ -7,22 +7,35 @@ from amaranth.hdl import \
     Module, \
     ClockSignal, \
     DomainRenamer, \
-    Repl, \
-    Mux, \
     Cat, C
 
 from lib.clockworks import Clockworks
-from lib.uart_tx import UartTx
+from lib.uart_tx import UartTxFifo
+from lib.uart_rx import UartRxFifo
+from lib.interconnect import Interconnect
 
 from memory import Mem
 from cpu import CPU
 
 class SOC(Elaboratable):
 
-    def __init__(self):
+    def __init__(self, uart_bypass=False, program=None, sim_slow=10):
+        """The CPU, RAM, LEDs and UARTs behind the memory map.
+
+        uart_bypass : Simulation only, the TX UART takes a byte per
+                      cycle instead of shifting it out
+        program     : Optional words for the RAM, instead of the
+                      firmware in memory.py
+        sim_slow    : "slow" is the clock divided by 2^(sim_slow + 1)
+                      in simulation, 0 for the undivided clock
+        """
+        self.uart_bypass = uart_bypass
+        self.program = program
+        self.sim_slow = sim_slow
 
         self.leds = Signal(5)
         self.tx = Signal()
+        self.rx = Signal(reset=1)
 
         # Signals in this list can easily be plotted as vcd traces
         self.ports = []
@@ -31,7 +44,7 @@ class SOC(Elaboratable):
         
         m = Module()
         
-        cw = Clockworks(slow=19, sim_slow=10)
+        cw = Clockworks(slow=19, sim_slow=self.sim_slow)
 
         if platform is not None:
             clk_frequency = int(platform.default_clk_constraint.frequency)
@@ -40,74 +53,115 @@ class SOC(Elaboratable):
             clk_frequency = 12000000
 
         # Move the modules into the "slow" domain
-        memory = DomainRenamer("slow")(Mem())
+        memory = DomainRenamer("slow")(Mem(self.program))
         cpu = DomainRenamer("slow")(CPU())
         uart_tx = DomainRenamer("slow")(
-                UartTx(freq_hz=clk_frequency, baud_rate=1000000))
+                UartTxFifo(freq_hz=clk_frequency, baud_rate=1000000, depth=16,
+                           bypass=self.uart_bypass))
+        uart_rx = DomainRenamer("slow")(
+                UartRxFifo(freq_hz=clk_frequency, baud_rate=1000000,
+                           oversample=8, depth=16))
 
         m.submodules.cw = cw
         m.submodules.cpu = cpu
         m.submodules.memory = memory
         m.submodules.uart_tx = uart_tx
+        m.submodules.uart_rx = uart_rx
 
         self.cpu = cpu
         self.memory = memory
-
-        ram_rdata = Signal(32)
-        mem_wordaddr = Signal(30)
-        isIO = Signal()
-        isRAM = Signal()
-        mem_wstrb = Signal()
-        io_rdata = Signal(32)
-
-        # Memory map bits (one-hot encoding)
-        IO_LEDS_bit = 0
-        IO_UART_DAT_bit = 1
-        IO_UART_CNTL_bit = 2
-
+        self.uart_tx = uart_tx
+        self.uart_rx = uart_rx
+
+        # Memory map. The IO addresses are the ones the firmware in
+        # memory.py uses (gp = 0x400000).
+        RAM_BASE = 0x000000
+        RAM_SIZE = 0x2000
+        IO_LEDS = 0x400004
+        IO_UART_DAT = 0x400008
+        IO_UART_CNTL = 0x400010
+
+        bus = Interconnect(addr_width=23)
+        m.submodules.bus = DomainRenamer("slow")(bus)
+        self.bus = bus
+
+        ram_port = bus.add("ram", RAM_BASE, RAM_SIZE)
+        leds_port = bus.add("leds", IO_LEDS, 4)
+        uart_dat_port = bus.add("uart_dat", IO_UART_DAT, 4)
+        uart_cntl_port = bus.add("uart_cntl", IO_UART_CNTL, 4)
+
+        for p in bus.memory_map():
+            print("  {}".format(p))
+
+        # Connect CPU to the bus
         m.d.comb += [
-            mem_wordaddr.eq(cpu.mem_addr[2:32]),
-            isIO.eq(cpu.mem_addr[22]),
-            isRAM.eq(~isIO),
-            mem_wstrb.eq(cpu.mem_wmask.any())
+            bus.mem_addr.eq(cpu.mem_addr),
+            bus.mem_rstrb.eq(cpu.mem_rstrb),
+            bus.mem_wdata.eq(cpu.mem_wdata),
+            bus.mem_wmask.eq(cpu.mem_wmask),
+            cpu.mem_rdata.eq(bus.mem_rdata)
         ]
 
-        # Connect memory to CPU
+        # Connect memory to the bus
         m.d.comb += [
-            memory.mem_addr.eq(cpu.mem_addr),
-            memory.mem_rstrb.eq(isRAM & cpu.mem_rstrb),
-            memory.mem_wdata.eq(cpu.mem_wdata),
-            memory.mem_wmask.eq(Repl(isRAM, 4) & cpu.mem_wmask),
-            ram_rdata.eq(memory.mem_rdata),
-            cpu.mem_rdata.eq(Mux(isRAM, ram_rdata, io_rdata))
+            memory.mem_addr.eq(ram_port.mem_addr),
+            memory.mem_rstrb.eq(ram_port.mem_rstrb),
+            memory.mem_wdata.eq(ram_port.mem_wdata),
+            memory.mem_wmask.eq(ram_port.mem_wmask),
+            ram_port.mem_rdata.eq(memory.mem_rdata)
         ]
 
         # LEDs
-        with m.If(isIO & mem_wstrb & mem_wordaddr[IO_LEDS_bit]):
-            m.d.sync += self.leds.eq(cpu.mem_wdata)
+        with m.If(leds_port.mem_wmask.any()):
+            m.d.slow += self.leds.eq(leds_port.mem_wdata)
+
+        with m.If(leds_port.mem_rstrb):
+            m.d.slow += leds_port.mem_rdata.eq(self.leds)
 
         # UART
         uart_valid = Signal()
         uart_ready = Signal()
 
         m.d.comb += [
-            uart_valid.eq(isIO & mem_wstrb & mem_wordaddr[IO_UART_DAT_bit])
+            uart_valid.eq(uart_dat_port.mem_wmask.any())
         ]
 
         # Hook up UART
         m.d.comb += [
             uart_tx.valid.eq(uart_valid),
-            uart_tx.data.eq(cpu.mem_wdata[0:8]),
+            uart_tx.data.eq(uart_dat_port.mem_wdata[0:8]),
             uart_ready.eq(uart_tx.ready),
             self.tx.eq(uart_tx.tx)
         ]
 
-        # Data from UART
+        # Reading the data register pops the RX FIFO:
+        #   bits 0-7 : received byte
+        #   bit 31   : set when the RX FIFO was empty (no byte)
         m.d.comb += [
-            io_rdata.eq(Mux(mem_wordaddr[IO_UART_CNTL_bit],
-                Cat(C(0, 9), ~uart_ready, C(0, 22)), C(0, 32)))
+            uart_rx.rx.eq(self.rx),
+            uart_rx.read.eq(uart_dat_port.mem_rstrb & uart_rx.ready),
         ]
-
+        with m.If(uart_dat_port.mem_rstrb):
+            m.d.slow += uart_dat_port.mem_rdata.eq(
+                Cat(uart_rx.data, C(0, 23), ~uart_rx.ready))
+
+        # UART status:
+        #   bit 8      : TX FIFO empty
+        #   bit 9      : TX FIFO full (the firmware polls this before the
+        #                next character, so it only waits when full)
+        #   bit 10     : RX byte available
+        #   bit 11     : RX overrun
+        #   bit 12     : RX frame error
+        #   bits 16-23 : TX FIFO level
+        #   bits 24-31 : RX FIFO level
+        # Writing the status word clears the RX errors.
+        m.d.comb += uart_rx.clear_errors.eq(uart_cntl_port.mem_wmask.any())
+        with m.If(uart_cntl_port.mem_rstrb):
+            m.d.slow += uart_cntl_port.mem_rdata.eq(
+                Cat(C(0, 8), uart_tx.empty, ~uart_ready,
+                    uart_rx.ready, uart_rx.overrun, uart_rx.frame_error, C(0, 3),
+                    uart_tx.level, C(0, 8 - len(uart_tx.level)),
+                    uart_rx.level, C(0, 8 - len(uart_rx.level))))
 
         # Export signals for simulation
         def export(signal, name):
@@ -0,0 +1,64 @@
+from amaranth import *
+from amaranth.sim import *
+
+from lib.uart_tx import UartTxFifo
+from lib.uart_rx import UartRxFifo
+
+# Loopback: UartTxFifo -> UartRxFifo at high baud rates on the iCESugar
+# (12MHz) and Keks (100MHz) clocks. The transmitter can be set slightly
+# off rate to mimic the far end of a real link.
+
+MESSAGE = b"Hello, fractional baud!\r\n"
+
+class Loopback(Elaboratable):
+    def __init__(self, freq_hz, baud_rate, oversample, tx_error=0.0):
+        self.tx = UartTxFifo(freq_hz, baud_rate * (1 + tx_error), depth=32)
+        self.rx = UartRxFifo(freq_hz, baud_rate, oversample, depth=32)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.tx = self.tx
+        m.submodules.rx = self.rx
+        m.d.comb += self.rx.rx.eq(self.tx.tx)
+        return m
+
+def run(freq_hz, baud_rate, oversample, tx_error=0.0):
+    print("---- {:.0f}MHz {:.1f}Mbaud x{} tx error {:+.1%}".format(
+        freq_hz / 1e6, baud_rate / 1e6, oversample, tx_error))
+    dut = Loopback(freq_hz, baud_rate, oversample, tx_error)
+    sim = Simulator(dut)
+
+    received = []
+
+    def proc():
+        tx, rx = dut.tx, dut.rx
+        for c in MESSAGE:
+            yield tx.data.eq(c)
+            yield tx.valid.eq(1)
+            yield
+        yield tx.valid.eq(0)
+
+        # 11 bit times per byte (UartTx idles one bit between bytes)
+        cycles = int(freq_hz / baud_rate * 11 * (len(MESSAGE) + 2))
+        for _ in range(cycles):
+            yield Settle()
+            if (yield rx.ready):
+                received.append((yield rx.data))
+                yield rx.read.eq(1)
+            else:
+                yield rx.read.eq(0)
+            yield
+        print("received {!r}".format(bytes(received)))
+        print("{}, overrun={} frame_error={}".format(
+            "OK" if bytes(received) == MESSAGE else "FAIL",
+            (yield rx.overrun), (yield rx.frame_error)))
+
+    sim.add_clock(1 / freq_hz)
+    sim.add_sync_process(proc)
+    sim.run()
+
+run(12e6, 3e6, 4)
+run(12e6, 1e6, 12)
+run(100e6, 3e6, 16)
+run(100e6, 3e6, 16, tx_error=0.02)
+run(100e6, 3e6, 16, tx_error=-0.02)
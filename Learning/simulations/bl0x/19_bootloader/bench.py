@@ -0,0 +1,108 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+from tools.bootloader import frames, jump_frame, words_to_bytes, ACK
+from tools.uart_monitor import UartMonitor
+
+# Boots the SOC, streams a small firmware over the UART with the same
+# frames tools/bootloader.py sends, jumps to it and watches the output.
+
+CLK_FREQ = 12000000
+BAUD = 3000000
+
+# The LED/alphabet firmware of 17_memory_map, with a shorter wait loop.
+a = RiscvAssembler()
+a.read("""begin:
+        LI sp, 0x1800
+        LI gp, 0x400000
+
+        LI s0, 4
+        LI a0, 0
+        l1:
+        SW a0, gp, 4
+        ADDI a0, a0, 1
+        BNE a0, s0, l1
+
+        LI s0, 26
+        LI a0, "a"
+        LI s1, 0
+        l2:
+        CALL putc
+        ADDI a0, a0, 1
+        ADDI s1, s1, 1
+        BNE s1, s0, l2
+
+        done:
+        J done
+
+        putc:
+        SW a0, gp, 8
+        LI t0, 0x200
+        putc_loop:
+        LW t1, gp, 0x10
+        AND t1, t1, t0
+        BNEZ t1, putc_loop
+        RET
+        """)
+a.assemble()
+image = words_to_bytes(a.mem)
+
+soc = SOC(baud_rate=BAUD)
+sim = Simulator(soc)
+
+bit_cycles = CLK_FREQ // BAUD
+monitor = UartMonitor(soc.tx, bit_cycles)
+received = monitor.data
+cycles = [0]
+
+def host():
+    """Drives the rx pin like the PC side of the link."""
+    yield soc.rx.eq(1)
+
+    def send(data):
+        for byte in data:
+            bits = [0] + [(byte >> i) & 1 for i in range(8)] + [1]
+            for b in bits:
+                yield soc.rx.eq(b)
+                for _ in range(bit_cycles):
+                    yield
+
+    # Boot prompt
+    yield from monitor.wait(1)
+    print("ROM says {!r}".format(bytes(received)))
+
+    start = None
+    for addr, f in frames(image, address=0, chunk=64):
+        if start is None:
+            start = cycles[0]
+        expected = len(received) + 1
+        yield from send(f)
+        yield from monitor.wait(expected)
+        reply = bytes([received[-1]])
+        print("chunk @ {:#06x}, {} bytes: {!r}".format(addr, len(f), reply))
+        assert reply == ACK
+    load_cycles = cycles[0] - start
+    print("Loaded {} bytes in {} cycles ({:.0f} bytes/s at {:.0f}MHz, link max {:.0f})".format(
+        len(image), load_cycles, len(image) * CLK_FREQ / load_cycles, CLK_FREQ / 1e6,
+        BAUD / 10))
+
+    first = len(received)
+    yield from send(jump_frame(0))
+    yield from monitor.wait(first + 26)
+    print("Firmware says {!r}".format(bytes(received[first:])))
+    print("LEDs = {}".format((yield soc.leds)))
+
+def counter():
+    yield Passive()
+    while True:
+        yield
+        cycles[0] += 1
+
+sim.add_clock(1 / CLK_FREQ)
+sim.add_sync_process(host)
+sim.add_sync_process(monitor.process)
+sim.add_sync_process(counter)
+
+with sim.write_vcd('bench.vcd', traces=soc.ports):
+    sim.run()
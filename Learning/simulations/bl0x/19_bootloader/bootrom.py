@@ -0,0 +1,138 @@
+from tools.riscv_assembler import RiscvAssembler
+
+# The boot ROM. It runs from BOOT_BASE after reset, sends '>' and then
+# waits for frames from tools/bootloader.py:
+#
+#   0x55, address (4 bytes LE), length (4 bytes LE), data, sum (4 bytes LE)
+#
+# The data is stored byte by byte from address onwards. sum is the 32bit
+# sum of the data bytes; the ROM answers 'K' if it matches, 'E' if not.
+# A frame with length 0 has no data or sum and jumps to address.
+#
+# Once a frame has started, the ROM gives up on it when no byte arrives
+# for TIMEOUT polls of the UART (a few ms to a few 100ms, depending on
+# the clock) and answers 'E', so a dropped byte costs a retry instead
+# of the next frame being read as the rest of this one. A frame that
+# doesn't fit the RAM (0 to RAM_SIZE) is rejected: the ROM waits for the
+# line to go quiet for TIMEOUT polls, then answers 'E'.
+#
+# The receive loop is kept short (no calls, the UART data register reads
+# negative while the RX FIFO is empty) so the CPU keeps up with the
+# UART at 3Mbaud on a 12MHz clock.
+
+BOOT_BASE = 0x10000
+BOOT_SIZE = 0x400
+
+RAM_SIZE = 0x2000
+TIMEOUT = 1 << 18
+
+SOURCE = """boot:
+        LI gp, 0x400000
+        LI s6, {timeout}
+        LI a0, ">"
+        CALL putc
+
+        frame:
+        LW t1, gp, 8
+        BLT t1, zero, frame
+        ANDI t1, t1, 255
+        LI t2, 0x55
+        BNE t1, t2, frame
+
+        CALL getw
+        MV s0, a0
+        CALL getw
+        BEQZ a0, run
+
+        LI t2, {ram_size}
+        BLTU t2, s0, reject
+        BLTU t2, a0, reject
+        MV s3, s0
+        ADD s1, s0, a0
+        BLTU t2, s1, reject
+        LI s2, 0
+
+        data:
+        MV t5, s6
+        data_wait:
+        LW t1, gp, 8
+        BGE t1, zero, data_byte
+        ADDI t5, t5, -1
+        BNEZ t5, data_wait
+        J bad
+        data_byte:
+        ADD s2, s2, t1
+        SB t1, s3, 0
+        ADDI s3, s3, 1
+        BNE s3, s1, data
+
+        CALL getw
+        BNE a0, s2, bad
+        LI a0, "K"
+        CALL putc
+        J frame
+
+        reject:
+        MV t5, s6
+        reject_wait:
+        LW t1, gp, 8
+        BGE t1, zero, reject
+        ADDI t5, t5, -1
+        BNEZ t5, reject_wait
+
+        bad:
+        LI a0, "E"
+        CALL putc
+        J frame
+
+        run:
+        JALR zero, s0, 0
+
+        getw:
+        MV s5, ra
+        LI s4, 0
+        LI t3, 0
+        LI t4, 32
+        getw_loop:
+        CALL getc
+        SLL a0, a0, t3
+        OR s4, s4, a0
+        ADDI t3, t3, 8
+        BNE t3, t4, getw_loop
+        MV a0, s4
+        JALR zero, s5, 0
+
+        getc:
+        MV t5, s6
+        getc_wait:
+        LW t1, gp, 8
+        BGE t1, zero, getc_byte
+        ADDI t5, t5, -1
+        BNEZ t5, getc_wait
+        J bad
+        getc_byte:
+        ANDI a0, t1, 255
+        RET
+
+        putc:
+        SW a0, gp, 8
+        LI t0, 0x200
+        putc_loop:
+        LW t1, gp, 0x10
+        AND t1, t1, t0
+        BNEZ t1, putc_loop
+        RET
+        """
+
+def boot_rom(timeout=TIMEOUT):
+    """Assemble the boot ROM and return its words. timeout is the number
+    of UART polls without a byte after which a frame is given up.
+    """
+    a = RiscvAssembler()
+    a.read(SOURCE.format(timeout=timeout, ram_size=RAM_SIZE))
+    a.assemble()
+
+    if len(a.mem) * 4 > BOOT_SIZE:
+        raise Exception("Boot ROM ({} bytes) larger than {} bytes".format(
+            len(a.mem) * 4, BOOT_SIZE))
+    return a.mem
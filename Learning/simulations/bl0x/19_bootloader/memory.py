@@ -0,0 +1,66 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    Memory
+
+class Mem(Elaboratable):
+    """Block RAM on the CPU bus.
+
+    Parameters
+    ----------
+    words   : Size in 32bit words.
+    program : Initial contents (list of words), zero filled up to words.
+              Empty RAM if None.
+    name    : Memory name, shows up in the netlist/vcd.
+    """
+
+    def __init__(self, words, program=None, name="mem"):
+        if program is None:
+            program = []
+        if len(program) > words:
+            raise Exception("Program ({} words) doesn't fit in {} ({} words)".format(
+                len(program), name, words))
+
+        self.instructions = list(program) + [0] * (words - len(program))
+
+        self.mem = Memory(width=32, depth=words, init=self.instructions, name=name)
+
+        self.mem_addr = Signal(32)
+        self.mem_rdata = Signal(32)
+        self.mem_rstrb = Signal()
+        self.mem_wdata = Signal(32)
+        self.mem_wmask = Signal(4)
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        # Using the memory module from amaranth library,
+        # we can use write_port and read_port to easily instantiate
+        # platform specific primitives to access memory efficiently.
+        w_port = m.submodules.w_port = self.mem.write_port(
+            domain="sync", granularity=8
+        )
+        r_port = m.submodules.r_port = self.mem.read_port(
+            domain="sync", transparent=False
+        )
+
+        word_addr = self.mem_addr[2:32]
+
+        # Hook up read port
+        m.d.comb += [
+            r_port.addr.eq(word_addr),
+            r_port.en.eq(self.mem_rstrb),
+            self.mem_rdata.eq(r_port.data)
+        ]
+
+        # Hook up write port
+        m.d.comb += [
+            w_port.addr.eq(word_addr),
+            w_port.en.eq(self.mem_wmask),
+            w_port.data.eq(self.mem_wdata)
+        ]
+
+        return m
@@ -0,0 +1,162 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+
+# Copies a 1KB block with a CPU loop and then with the DMA, and sends a
+# message to the UART with a paced DMA transfer. The firmware writes a
+# phase number to the LEDs so the bench can time each part.
+
+CLK_FREQ = 12000000
+BAUD = 3000000
+
+WORDS = 256
+SRC = 0x0800
+CPU_DST = 0x0C00
+DMA_DST = 0x1000
+MSG = 0x1400
+MESSAGE = b"Hello from the DMA!\r\n"
+
+a = RiscvAssembler()
+a.read("""begin:
+        LI gp, 0x400000
+        LI s0, 0x200
+
+        LI t0, 1
+        SW t0, gp, 4
+
+        LI a0, {src}
+        LI a1, {cpu_dst}
+        LI a2, {src_end}
+        copy:
+        LW t1, a0, 0
+        SW t1, a1, 0
+        ADDI a0, a0, 4
+        ADDI a1, a1, 4
+        BNE a0, a2, copy
+
+        LI t0, 2
+        SW t0, gp, 4
+
+        LI t0, {src}
+        SW t0, gp, 0x20
+        LI t0, {dma_dst}
+        SW t0, gp, 0x24
+        LI t0, {words}
+        SW t0, gp, 0x28
+        LI t0, 4
+        SW t0, gp, 0x2C
+        SW t0, gp, 0x30
+        LI t0, 1
+        SW t0, gp, 0x34
+        wait_copy:
+        LW t0, gp, 0x34
+        AND t0, t0, s0
+        BEQZ t0, wait_copy
+
+        LI t0, 3
+        SW t0, gp, 4
+
+        LI t0, {msg}
+        SW t0, gp, 0x20
+        LI t0, 0x400008
+        SW t0, gp, 0x24
+        LI t0, {msg_len}
+        SW t0, gp, 0x28
+        LI t0, 1
+        SW t0, gp, 0x2C
+        SW zero, gp, 0x30
+        LI t0, 7
+        SW t0, gp, 0x34
+        wait_msg:
+        LW t0, gp, 0x34
+        AND t0, t0, s0
+        BEQZ t0, wait_msg
+
+        LI t0, 4
+        SW t0, gp, 4
+
+        done:
+        J done
+        """.format(src=SRC, cpu_dst=CPU_DST, src_end=SRC + WORDS * 4,
+                   dma_dst=DMA_DST, words=WORDS, msg=MSG, msg_len=len(MESSAGE)))
+a.assemble()
+
+# Preload the source block and the message behind the program
+pattern = [(i * 0x9E3779B9) & 0xFFFFFFFF for i in range(WORDS)]
+program = a.mem + [0] * (SRC // 4 - len(a.mem)) + pattern
+padded = MESSAGE + bytes(-len(MESSAGE) % 4)
+program += [0] * (MSG // 4 - len(program))
+program += [int.from_bytes(padded[i:i + 4], "little") for i in range(0, len(padded), 4)]
+
+soc = SOC(baud_rate=BAUD, program=program, boot=False)
+sim = Simulator(soc)
+
+bit_cycles = CLK_FREQ // BAUD
+received = []
+cycles = [0]
+phases = {}
+
+def firmware():
+    """Times the LED phases and checks the copies."""
+    phase = 0
+    while phase != 4:
+        yield
+        leds = yield soc.leds
+        if leds != phase:
+            phase = leds
+            phases[phase] = cycles[0]
+
+    # Let the last characters drain
+    while len(received) < len(MESSAGE):
+        yield
+
+    cpu_cycles = phases[2] - phases[1]
+    dma_cycles = phases[3] - phases[2]
+    print("CPU copy: {} words in {} cycles ({:.2f} cycles/word)".format(
+        WORDS, cpu_cycles, cpu_cycles / WORDS))
+    print("DMA copy: {} words in {} cycles ({:.2f} cycles/word)".format(
+        WORDS, dma_cycles, dma_cycles / WORDS))
+
+    for name, dst in (("CPU", CPU_DST), ("DMA", DMA_DST)):
+        errors = 0
+        for i in range(WORDS):
+            if (yield soc.memory.mem[dst // 4 + i]) != pattern[i]:
+                errors += 1
+        print("{} copy: {} errors".format(name, errors))
+        assert errors == 0
+
+    print("UART says {!r}".format(bytes(received)))
+    assert bytes(received) == MESSAGE
+
+def monitor():
+    """Decodes the tx pin."""
+    yield Passive()
+    while True:
+        yield
+        if (yield soc.tx) == 0:
+            # Middle of the start bit, then every bit
+            for _ in range(bit_cycles // 2):
+                yield
+            byte = 0
+            for i in range(8):
+                for _ in range(bit_cycles):
+                    yield
+                byte |= (yield soc.tx) << i
+            for _ in range(bit_cycles):
+                yield
+            received.append(byte)
+
+def counter():
+    yield Passive()
+    while True:
+        yield
+        cycles[0] += 1
+
+sim.add_clock(1 / CLK_FREQ)
+sim.add_sync_process(firmware)
+sim.add_sync_process(monitor)
+sim.add_sync_process(counter)
+
+with sim.write_vcd('bench.vcd', traces=soc.ports):
+    sim.run()
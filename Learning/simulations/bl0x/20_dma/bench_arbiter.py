@@ -0,0 +1,124 @@
+from amaranth import Elaboratable, Module, Signal, Cat, C
+from amaranth.sim import *
+
+from lib.arbiter import BusArbiter
+from memory import Mem
+
+# Three masters hammer one block RAM through a BusArbiter. Each master
+# wants the bus with its own probability per cycle, writes a word to
+# its part of the RAM and reads it back. The bench prints per master
+# throughput and the arbiter's fairness counters for both schemes.
+
+CYCLES = 4000
+LOADS = [1.0, 0.5, 0.25]    # Request probability of each master
+
+class Traffic(Elaboratable):
+    """Writes a word, reads it back and checks it, starting each round
+    with probability *load* (from an LFSR)."""
+
+    def __init__(self, port, base, load, seed):
+        self.port = port
+        self.base = base
+        self.threshold = int(load * 0x10000)
+        self.seed = seed
+
+        self.words = Signal(32)
+        self.errors = Signal(32)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        p = self.port
+
+        lfsr = Signal(16, reset=self.seed)
+        m.d.sync += lfsr.eq(Cat(lfsr[1:], lfsr[0] ^ lfsr[2] ^ lfsr[3] ^ lfsr[5]))
+
+        n = Signal(8)
+        value = Cat(self.words[0:24], C(self.base >> 10, 8))
+
+        m.d.comb += [
+            p.mem_addr.eq(self.base + Cat(C(0, 2), n)),
+            p.mem_wdata.eq(value),
+        ]
+
+        with m.FSM():
+            with m.State("IDLE"):
+                if self.threshold >= 0x10000:
+                    m.next = "WRITE"
+                else:
+                    with m.If(lfsr < self.threshold):
+                        m.next = "WRITE"
+            with m.State("WRITE"):
+                m.d.comb += p.mem_wmask.eq(0b1111)
+                with m.If(~p.busy):
+                    m.next = "READ"
+            with m.State("READ"):
+                m.d.comb += p.mem_rstrb.eq(1)
+                with m.If(~p.busy):
+                    m.next = "CHECK"
+            with m.State("CHECK"):
+                with m.If(p.mem_rdata != value):
+                    m.d.sync += self.errors.eq(self.errors + 1)
+                m.d.sync += [
+                    self.words.eq(self.words + 1),
+                    n.eq(n + 1),
+                ]
+                m.next = "IDLE"
+
+        return m
+
+class Top(Elaboratable):
+    def __init__(self, scheme):
+        self.arbiter = BusArbiter(scheme)
+        self.masters = [
+            Traffic(self.arbiter.add("m{}".format(i)), i * 1024, load, 0xACE1 + i * 0x1234)
+            for i, load in enumerate(LOADS)
+        ]
+        self.memory = Mem(1024)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        m.submodules.arbiter = self.arbiter
+        m.submodules.memory = self.memory
+        for i, t in enumerate(self.masters):
+            m.submodules["m{}".format(i)] = t
+
+        m.d.comb += [
+            self.memory.mem_addr.eq(self.arbiter.mem_addr),
+            self.memory.mem_rstrb.eq(self.arbiter.mem_rstrb),
+            self.memory.mem_wdata.eq(self.arbiter.mem_wdata),
+            self.memory.mem_wmask.eq(self.arbiter.mem_wmask),
+            self.arbiter.mem_rdata.eq(self.memory.mem_rdata),
+        ]
+
+        return m
+
+def run(scheme):
+    top = Top(scheme)
+    sim = Simulator(top)
+
+    def stop():
+        for _ in range(CYCLES):
+            yield
+        print("{}:".format(scheme))
+        busy = 0
+        errors = 0
+        for i, load in enumerate(LOADS):
+            words = yield top.masters[i].words
+            errors += yield top.masters[i].errors
+            grants = yield top.arbiter.grants[i]
+            stalls = yield top.arbiter.stalls[i]
+            busy += grants
+            print("  m{} load {:.2f}: {:5} words, {:5} grants, {:5} stall cycles ({:.2f} per access)".format(
+                i, load, words, grants, stalls, stalls / max(1, grants)))
+        print("  bus busy {:.1f}% of {} cycles, {} read errors".format(
+            100 * busy / CYCLES, CYCLES, errors))
+        assert errors == 0
+
+    sim.add_clock(1e-6)
+    sim.add_sync_process(stop)
+    sim.run()
+
+for scheme in ("priority", "round_robin"):
+    run(scheme)
@@ -0,0 +1,180 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+
+# The firmware of 20_dma (a CPU copy loop, a DMA copy and a DMA message
+# to the UART) run with the CPU fetching over the shared bus and over
+# its own instruction port, then a check that the boot ROM still runs
+# in Harvard mode.
+
+CLK_FREQ = 12000000
+BAUD = 3000000
+
+WORDS = 256
+SRC = 0x0800
+CPU_DST = 0x0C00
+DMA_DST = 0x1000
+MSG = 0x1400
+MESSAGE = b"Hello from the DMA!\r\n"
+
+a = RiscvAssembler()
+a.read("""begin:
+        LI gp, 0x400000
+        LI s0, 0x200
+
+        LI t0, 1
+        SW t0, gp, 4
+
+        LI a0, {src}
+        LI a1, {cpu_dst}
+        LI a2, {src_end}
+        copy:
+        LW t1, a0, 0
+        SW t1, a1, 0
+        ADDI a0, a0, 4
+        ADDI a1, a1, 4
+        BNE a0, a2, copy
+
+        LI t0, 2
+        SW t0, gp, 4
+
+        LI t0, {src}
+        SW t0, gp, 0x20
+        LI t0, {dma_dst}
+        SW t0, gp, 0x24
+        LI t0, {words}
+        SW t0, gp, 0x28
+        LI t0, 4
+        SW t0, gp, 0x2C
+        SW t0, gp, 0x30
+        LI t0, 1
+        SW t0, gp, 0x34
+        wait_copy:
+        LW t0, gp, 0x34
+        AND t0, t0, s0
+        BEQZ t0, wait_copy
+
+        LI t0, 3
+        SW t0, gp, 4
+
+        LI t0, {msg}
+        SW t0, gp, 0x20
+        LI t0, 0x400008
+        SW t0, gp, 0x24
+        LI t0, {msg_len}
+        SW t0, gp, 0x28
+        LI t0, 1
+        SW t0, gp, 0x2C
+        SW zero, gp, 0x30
+        LI t0, 7
+        SW t0, gp, 0x34
+        wait_msg:
+        LW t0, gp, 0x34
+        AND t0, t0, s0
+        BEQZ t0, wait_msg
+
+        LI t0, 4
+        SW t0, gp, 4
+
+        done:
+        J done
+        """.format(src=SRC, cpu_dst=CPU_DST, src_end=SRC + WORDS * 4,
+                   dma_dst=DMA_DST, words=WORDS, msg=MSG, msg_len=len(MESSAGE)))
+a.assemble()
+
+# Preload the source block and the message behind the program
+pattern = [(i * 0x9E3779B9) & 0xFFFFFFFF for i in range(WORDS)]
+program = a.mem + [0] * (SRC // 4 - len(a.mem)) + pattern
+padded = MESSAGE + bytes(-len(MESSAGE) % 4)
+program += [0] * (MSG // 4 - len(program))
+program += [int.from_bytes(padded[i:i + 4], "little") for i in range(0, len(padded), 4)]
+
+bit_cycles = CLK_FREQ // BAUD
+
+def uart_monitor(soc, received):
+    """Decodes the tx pin into received."""
+    def process():
+        yield Passive()
+        while True:
+            yield
+            if (yield soc.tx) == 0:
+                # Middle of the start bit, then every bit
+                for _ in range(bit_cycles // 2):
+                    yield
+                byte = 0
+                for i in range(8):
+                    for _ in range(bit_cycles):
+                        yield
+                    byte |= (yield soc.tx) << i
+                for _ in range(bit_cycles):
+                    yield
+                received.append(byte)
+    return process
+
+def run(harvard):
+    soc = SOC(baud_rate=BAUD, program=program, boot=False, harvard=harvard)
+    sim = Simulator(soc)
+
+    received = []
+    cycles = [0]
+    phases = {}
+
+    def firmware():
+        """Times the LED phases and checks the copies."""
+        phase = 0
+        while phase != 4:
+            yield
+            leds = yield soc.leds
+            if leds != phase:
+                phase = leds
+                phases[phase] = cycles[0]
+
+        # Let the last characters drain
+        while len(received) < len(MESSAGE):
+            yield
+
+        for name, dst in (("CPU", CPU_DST), ("DMA", DMA_DST)):
+            for i in range(WORDS):
+                assert (yield soc.memory.mem[dst // 4 + i]) == pattern[i]
+        assert bytes(received) == MESSAGE
+
+    def counter():
+        yield Passive()
+        while True:
+            yield
+            cycles[0] += 1
+
+    sim.add_clock(1 / CLK_FREQ)
+    sim.add_sync_process(firmware)
+    sim.add_sync_process(uart_monitor(soc, received))
+    sim.add_sync_process(counter)
+    sim.run()
+
+    cpu_cycles = phases[2] - phases[1]
+    dma_cycles = phases[3] - phases[2]
+    print("harvard={}: CPU copy {:.2f} cycles/word, DMA copy {:.2f} cycles/word, total {} cycles".format(
+        harvard, cpu_cycles / WORDS, dma_cycles / WORDS, phases[4]))
+    return cpu_cycles
+
+def boot():
+    """The boot ROM runs from the ROM's instruction port."""
+    soc = SOC(baud_rate=BAUD, harvard=True)
+    sim = Simulator(soc)
+    received = []
+
+    def wait():
+        while not received:
+            yield
+        print("ROM says {!r}".format(bytes(received)))
+        assert received == [ord(">")]
+
+    sim.add_clock(1 / CLK_FREQ)
+    sim.add_sync_process(wait)
+    sim.add_sync_process(uart_monitor(soc, received))
+    sim.run()
+
+shared = run(False)
+harvard = run(True)
+print("Harvard CPU copy is {:.0f}% faster".format(100 * (shared / harvard - 1)))
+boot()
@@ -0,0 +1,37 @@
+from amaranth import *
+from amaranth_boards.arty_a7 import *
+
+from soc import SOC
+
+# A platform contains board specific information about FPGA pin assignments,
+# toolchain and specific information for uploading the bitfile.
+platform = ArtyA7_35Platform(toolchain="Symbiflow")
+
+# We need a top level module
+m = Module()
+
+# This is the instance of our SOC. Only this bitstream needs building,
+# firmware is loaded with tools/bootloader.py (make load).
+soc = SOC(baud_rate=3000000)
+
+# The SOC is turned into a submodule (fragment) of our top level module.
+m.submodules.soc = soc
+
+led0 = platform.request('led', 0)
+led1 = platform.request('led', 1)
+led2 = platform.request('led', 2)
+led3 = platform.request('led', 3)
+uart = platform.request('uart')
+
+m.d.comb += [
+    led0.o.eq(soc.leds[0]),
+    led1.o.eq(soc.leds[1]),
+    led2.o.eq(soc.leds[2]),
+    led3.o.eq(soc.leds[3]),
+    uart.tx.o.eq(soc.tx),
+    soc.rx.eq(uart.rx.i),
+]
+
+# To generate the bitstream, we build() the platform using our top level
+# module m.
+platform.build(m, do_program=False)
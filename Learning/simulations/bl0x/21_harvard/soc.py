@@ -0,0 +1,278 @@
+import sys
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    ClockSignal, \
+    DomainRenamer, \
+    EnableInserter, \
+    Mux, \
+    Cat, C
+
+from lib.clockworks import Clockworks
+from lib.uart_tx import UartTxFifo
+from lib.uart_rx import UartRxFifo
+from lib.interconnect import Interconnect
+from lib.dma import DMA
+from lib.arbiter import BusArbiter
+
+from memory import Mem, HarvardMem
+from cpu import CPU
+from bootrom import boot_rom, BOOT_BASE, BOOT_SIZE
+
+class SOC(Elaboratable):
+
+    def __init__(self, baud_rate=3000000, program=None, boot=True, scheme="priority",
+                 harvard=False):
+        """The DMA SOC of 20_dma with the CPU fetching instructions over
+        its own port into RAM and ROM.
+
+        baud_rate : UART rate, both directions
+        program   : Optional words to preload into RAM (at 0)
+        boot      : Start in the boot ROM, False starts the program at 0
+        scheme    : Bus arbitration between CPU and DMA (lib/arbiter.py).
+                    "priority" never stalls the CPU, "round_robin"
+                    alternates when both want the bus.
+        harvard   : True fetches over HarvardMem's own read port. That
+                    doubles the block RAMs and does not fit the
+                    Keks, so only the benches turn it on. False
+                    fetches over the shared bus like 20_dma
+        """
+        self.baud_rate = baud_rate
+        self.program = program
+        self.boot = boot
+        self.scheme = scheme
+        self.harvard = harvard
+
+        self.leds = Signal(5)
+        self.tx = Signal()
+        self.rx = Signal(reset=1)
+
+        # Signals in this list can easily be plotted as vcd traces
+        self.ports = []
+
+    def elaborate(self, platform: Platform) -> Module:
+        
+        m = Module()
+        
+        # The CPU runs at the full clock so it can keep up with the UART.
+        cw = Clockworks()
+
+        if platform is not None:
+            clk_frequency = int(platform.default_clk_constraint.frequency)
+            print("clock frequency = {}".format(clk_frequency))
+        else:
+            clk_frequency = 12000000
+
+        # Move the modules into the "slow" domain
+        RAM_SIZE = 0x2000
+
+        # RX oversampling, as high as the clock allows
+        oversample = min(16, clk_frequency // self.baud_rate)
+
+        memory = DomainRenamer("slow")(HarvardMem(RAM_SIZE // 4, self.program))
+        rom = DomainRenamer("slow")(HarvardMem(BOOT_SIZE // 4, boot_rom(), name="rom"))
+        cpu = DomainRenamer("slow")(CPU(reset_address=BOOT_BASE if self.boot else 0,
+                                        harvard=self.harvard))
+        uart_tx = DomainRenamer("slow")(
+                UartTxFifo(freq_hz=clk_frequency, baud_rate=self.baud_rate, depth=16))
+        uart_rx = DomainRenamer("slow")(
+                UartRxFifo(freq_hz=clk_frequency, baud_rate=self.baud_rate,
+                           oversample=oversample, depth=64))
+
+        m.submodules.cw = cw
+        m.submodules.memory = memory
+        m.submodules.rom = rom
+        m.submodules.uart_tx = uart_tx
+        m.submodules.uart_rx = uart_rx
+
+        self.cpu = cpu
+        self.memory = memory
+        self.uart_tx = uart_tx
+        self.uart_rx = uart_rx
+
+        # Memory map. The IO addresses are the ones of 17_memory_map
+        # (gp = 0x400000).
+        RAM_BASE = 0x000000
+        IO_LEDS = 0x400004
+        IO_UART_DAT = 0x400008
+        IO_UART_CNTL = 0x400010
+        IO_DMA = 0x400020
+
+        bus = Interconnect(addr_width=23)
+        m.submodules.bus = DomainRenamer("slow")(bus)
+        self.bus = bus
+
+        ram_port = bus.add("ram", RAM_BASE, RAM_SIZE)
+        rom_port = bus.add("rom", BOOT_BASE, BOOT_SIZE)
+        leds_port = bus.add("leds", IO_LEDS, 4)
+        uart_dat_port = bus.add("uart_dat", IO_UART_DAT, 4)
+        uart_cntl_port = bus.add("uart_cntl", IO_UART_CNTL, 4)
+        dma_regs = bus.add("dma", IO_DMA, DMA.SIZE)
+
+        dma = DomainRenamer("slow")(DMA(dma_regs))
+        m.submodules.dma = dma
+        self.dma = dma
+
+        for p in bus.memory_map():
+            print("  {}".format(p))
+
+        # CPU and DMA share the bus through an arbiter, the CPU first. The
+        # CPU has no wait states, it is simply frozen while it waits.
+        arbiter = BusArbiter(self.scheme)
+        m.submodules.arbiter = DomainRenamer("slow")(arbiter)
+        self.arbiter = arbiter
+
+        cpu_port = arbiter.add("cpu")
+        dma_port = arbiter.add("dma")
+
+        m.submodules.cpu = EnableInserter({"slow": ~cpu_port.busy})(cpu)
+
+        m.d.comb += [
+            cpu_port.mem_addr.eq(cpu.mem_addr),
+            cpu_port.mem_rstrb.eq(cpu.mem_rstrb),
+            cpu_port.mem_wdata.eq(cpu.mem_wdata),
+            cpu_port.mem_wmask.eq(cpu.mem_wmask),
+            cpu.mem_rdata.eq(cpu_port.mem_rdata),
+
+            dma_port.mem_addr.eq(dma.m_addr),
+            dma_port.mem_rstrb.eq(dma.m_rstrb),
+            dma_port.mem_wdata.eq(dma.m_wdata),
+            dma_port.mem_wmask.eq(dma.m_wmask),
+            dma.m_rdata.eq(dma_port.mem_rdata),
+            dma.m_busy.eq(dma_port.busy),
+
+            bus.mem_addr.eq(arbiter.mem_addr),
+            bus.mem_rstrb.eq(arbiter.mem_rstrb),
+            bus.mem_wdata.eq(arbiter.mem_wdata),
+            bus.mem_wmask.eq(arbiter.mem_wmask),
+            arbiter.mem_rdata.eq(bus.mem_rdata),
+        ]
+
+        # Connect memory to the bus
+        m.d.comb += [
+            memory.mem_addr.eq(ram_port.mem_addr),
+            memory.mem_rstrb.eq(ram_port.mem_rstrb),
+            memory.mem_wdata.eq(ram_port.mem_wdata),
+            memory.mem_wmask.eq(ram_port.mem_wmask),
+            ram_port.mem_rdata.eq(memory.mem_rdata)
+        ]
+
+        # Boot ROM, read only
+        m.d.comb += [
+            rom.mem_addr.eq(rom_port.mem_addr),
+            rom.mem_rstrb.eq(rom_port.mem_rstrb),
+            rom_port.mem_rdata.eq(rom.mem_rdata)
+        ]
+
+        # Instruction fetches go straight to the second port of the RAM
+        # or ROM, they never wait for the bus (or the DMA).
+        if self.harvard:
+            i_rom = Signal()
+            with m.If(cpu.i_rstrb):
+                m.d.slow += i_rom.eq(cpu.i_addr >= BOOT_BASE)
+
+            m.d.comb += [
+                memory.i_addr.eq(cpu.i_addr),
+                memory.i_rstrb.eq(cpu.i_rstrb & (cpu.i_addr < BOOT_BASE)),
+                rom.i_addr.eq(cpu.i_addr),
+                rom.i_rstrb.eq(cpu.i_rstrb & (cpu.i_addr >= BOOT_BASE)),
+                cpu.i_rdata.eq(Mux(i_rom, rom.i_rdata, memory.i_rdata)),
+            ]
+
+        # LEDs
+        with m.If(leds_port.mem_wmask.any()):
+            m.d.slow += self.leds.eq(leds_port.mem_wdata)
+
+        with m.If(leds_port.mem_rstrb):
+            m.d.slow += leds_port.mem_rdata.eq(self.leds)
+
+        # UART
+        uart_valid = Signal()
+        uart_ready = Signal()
+
+        m.d.comb += [
+            uart_valid.eq(uart_dat_port.mem_wmask.any())
+        ]
+
+        # Hook up UART
+        m.d.comb += [
+            uart_tx.valid.eq(uart_valid),
+            uart_tx.data.eq(uart_dat_port.mem_wdata[0:8]),
+            uart_ready.eq(uart_tx.ready),
+            self.tx.eq(uart_tx.tx)
+        ]
+
+        # A paced DMA transfer only writes while the TX FIFO has room,
+        # e.g. DST = IO_UART_DAT, DST_STRIDE = 0, byte width.
+        m.d.comb += dma.dreq.eq(uart_ready)
+
+        # Reading the data register pops the RX FIFO:
+        #   bits 0-7 : received byte
+        #   bit 31   : set when the RX FIFO was empty (no byte)
+        m.d.comb += [
+            uart_rx.rx.eq(self.rx),
+            uart_rx.read.eq(uart_dat_port.mem_rstrb & uart_rx.ready),
+        ]
+        with m.If(uart_dat_port.mem_rstrb):
+            m.d.slow += uart_dat_port.mem_rdata.eq(
+                Cat(uart_rx.data, C(0, 23), ~uart_rx.ready))
+
+        # UART status:
+        #   bit 8      : TX FIFO empty
+        #   bit 9      : TX FIFO full (the firmware polls this before the
+        #                next character, so it only waits when full)
+        #   bit 10     : RX byte available
+        #   bit 11     : RX overrun
+        #   bit 12     : RX frame error
+        #   bits 16-23 : TX FIFO level
+        #   bits 24-31 : RX FIFO level
+        # Writing the status word clears the RX errors.
+        m.d.comb += uart_rx.clear_errors.eq(uart_cntl_port.mem_wmask.any())
+        with m.If(uart_cntl_port.mem_rstrb):
+            m.d.slow += uart_cntl_port.mem_rdata.eq(
+                Cat(C(0, 8), uart_tx.empty, ~uart_ready,
+                    uart_rx.ready, uart_rx.overrun, uart_rx.frame_error, C(0, 3),
+                    uart_tx.level, C(0, 8 - len(uart_tx.level)),
+                    uart_rx.level, C(0, 8 - len(uart_rx.level))))
+
+        # Export signals for simulation
+        def export(signal, name):
+            if type(signal) is not Signal:
+                newsig = Signal(signal.shape(), name = name)
+                m.d.comb += newsig.eq(signal)
+            else:
+                newsig = signal
+            self.ports.append(newsig)
+            setattr(self, name, newsig)
+
+        if platform is None:
+            export(ClockSignal("slow"), "slow_clk")
+            # export(cpu.pc, "pc")
+            # export(cpu.instr, "instr")
+            #export(isALUreg, "isALUreg")
+            #export(isALUimm, "isALUimm")
+            #export(isBranch, "isBranch")
+            #export(isJAL, "isJAL")
+            #export(isJALR, "isJALR")
+            #export(isLoad, "isLoad")
+            #export(isStore, "isStore")
+            #export(isSystem, "isSystem")
+            #export(rdId, "rdId")
+            #export(rs1Id, "rs1Id")
+            #export(rs2Id, "rs2Id")
+            #export(Iimm, "Iimm")
+            #export(Bimm, "Bimm")
+            #export(Jimm, "Jimm")
+            #export(funct3, "funct3")
+            #export(rdId, "rdId")
+            #export(rs1, "rs1")
+            #export(rs2, "rs2")
+            #export(writeBackData, "writeBackData")
+            #export(writeBackEn, "writeBackEn")
+            #export(aluOut, "aluOut")
+            #export((1 << cpu.fsm.state), "state")
+
+        return m
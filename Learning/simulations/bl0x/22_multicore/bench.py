@@ -0,0 +1,40 @@
+from amaranth.sim import *
+
+from soc import SOC
+from firmware import program, collatz_steps, LIMIT, TOTAL, START, END
+
+# Runs the Collatz benchmark of firmware.py on 1, 2 and 4 cores.
+
+def run(cores):
+    soc = SOC(cores=cores, program=program(cores))
+    sim = Simulator(soc)
+    result = {}
+
+    def wait():
+        while not (yield soc.leds):
+            yield
+        total = yield soc.memory.mem[TOTAL // 4]
+        start = yield soc.memory.mem[START // 4]
+        end = yield soc.memory.mem[END // 4]
+        stalls = 0
+        for i in range(cores):
+            stalls += yield soc.arbiter.stalls[i]
+        result.update(total=total, cycles=end - start, stalls=stalls)
+
+    sim.add_clock(1e-6)
+    sim.add_sync_process(wait)
+    sim.run()
+
+    assert result["total"] == collatz_steps(LIMIT)
+    return result
+
+expected = collatz_steps(LIMIT)
+print("Collatz steps for 1..{} = {}".format(LIMIT, expected))
+
+base = None
+for cores in (1, 2, 4):
+    r = run(cores)
+    if base is None:
+        base = r["cycles"]
+    print("{} core(s): {:6} cycles, speedup {:.2f}, {} shared bus stall cycles".format(
+        cores, r["cycles"], base / r["cycles"], r["stalls"]))
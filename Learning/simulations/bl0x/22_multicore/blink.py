@@ -0,0 +1,36 @@
+from amaranth import *
+from amaranth_boards.arty_a7 import *
+
+from soc import SOC
+from firmware import program
+
+# A platform contains board specific information about FPGA pin assignments,
+# toolchain and specific information for uploading the bitfile.
+platform = ArtyA7_35Platform(toolchain="Symbiflow")
+
+# We need a top level module
+m = Module()
+
+# Four cores running the Collatz benchmark, LED 0 lights up when done.
+soc = SOC(cores=4, program=program(4))
+
+# The SOC is turned into a submodule (fragment) of our top level module.
+m.submodules.soc = soc
+
+led0 = platform.request('led', 0)
+led1 = platform.request('led', 1)
+led2 = platform.request('led', 2)
+led3 = platform.request('led', 3)
+uart = platform.request('uart')
+
+m.d.comb += [
+    led0.o.eq(soc.leds[0]),
+    led1.o.eq(soc.leds[1]),
+    led2.o.eq(soc.leds[2]),
+    led3.o.eq(soc.leds[3]),
+    uart.tx.o.eq(soc.tx),
+]
+
+# To generate the bitstream, we build() the platform using our top level
+# module m.
+platform.build(m, do_program=False)
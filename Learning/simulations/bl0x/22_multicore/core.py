@@ -0,0 +1,104 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    EnableInserter, \
+    Cat, C
+
+from lib.interconnect import Interconnect
+
+from memory import HarvardMem
+from cpu import CPU
+
+# Per core memory map
+LOCAL_BASE = 0x000000       # Code, stack and private data
+HARTID = 0x400000           # Reads the core number
+SHARED_BASE = 0x800000      # Everything from here goes to the shared bus
+SHARED_SIZE = 0x800000
+
+class Core(Elaboratable):
+    """A Harvard CPU (21_harvard) with a private scratchpad.
+
+    Instructions are fetched from the scratchpad's second port and
+    loads/stores below SHARED_BASE never leave the core, so cores only
+    meet on the shared bus for shared RAM and IO. The CPU is frozen
+    while *busy* (the shared bus arbiter) holds it off.
+
+    Parameters:
+    -----------
+    hart_id    : Number returned by a read of HARTID
+    program    : Words preloaded into the scratchpad, run from 0
+    local_size : Scratchpad size in bytes
+
+    Attributes:
+    -----------
+        ```txt
+        mem_addr  : (O) Shared bus address
+        mem_wdata : (O)
+        mem_wmask : (O)
+        mem_rstrb : (O)
+        mem_rdata : (I)
+        busy      : (I) Active (high) while the shared bus isn't granted
+        ```
+    """
+
+    def __init__(self, hart_id, program, local_size=0x2000):
+        self.hart_id = hart_id
+        self.program = program
+        self.local_size = local_size
+
+        self.mem_addr = Signal(32)
+        self.mem_wdata = Signal(32)
+        self.mem_wmask = Signal(4)
+        self.mem_rstrb = Signal()
+        self.mem_rdata = Signal(32)
+        self.busy = Signal()
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        cpu = CPU(reset_address=LOCAL_BASE, harvard=True)
+        local = HarvardMem(self.local_size // 4, self.program, name="local")
+        bus = Interconnect(addr_width=24)
+
+        m.submodules.cpu = EnableInserter(~self.busy)(cpu)
+        m.submodules.local = local
+        m.submodules.bus = bus
+
+        self.cpu = cpu
+        self.local = local
+
+        local_port = bus.add("local", LOCAL_BASE, self.local_size)
+        hartid_port = bus.add("hartid", HARTID, 4)
+        shared_port = bus.add("shared", SHARED_BASE, SHARED_SIZE)
+
+        m.d.comb += [
+            bus.mem_addr.eq(cpu.mem_addr),
+            bus.mem_rstrb.eq(cpu.mem_rstrb),
+            bus.mem_wdata.eq(cpu.mem_wdata),
+            bus.mem_wmask.eq(cpu.mem_wmask),
+            cpu.mem_rdata.eq(bus.mem_rdata),
+
+            local.i_addr.eq(cpu.i_addr),
+            local.i_rstrb.eq(cpu.i_rstrb),
+            cpu.i_rdata.eq(local.i_rdata),
+
+            local.mem_addr.eq(local_port.mem_addr),
+            local.mem_rstrb.eq(local_port.mem_rstrb),
+            local.mem_wdata.eq(local_port.mem_wdata),
+            local.mem_wmask.eq(local_port.mem_wmask),
+            local_port.mem_rdata.eq(local.mem_rdata),
+
+            self.mem_addr.eq(Cat(shared_port.mem_addr, C(1, 1))),
+            self.mem_rstrb.eq(shared_port.mem_rstrb),
+            self.mem_wdata.eq(shared_port.mem_wdata),
+            self.mem_wmask.eq(shared_port.mem_wmask),
+            shared_port.mem_rdata.eq(self.mem_rdata),
+        ]
+
+        with m.If(hartid_port.mem_rstrb):
+            m.d.sync += hartid_port.mem_rdata.eq(self.hart_id)
+
+        return m
@@ -0,0 +1,93 @@
+from soc import SHARED_RAM
+from tools.riscv_assembler import RiscvAssembler
+
+# A parallel benchmark: the total number of Collatz steps for 1..LIMIT.
+# Every core runs the same program from its scratchpad and takes the
+# next number from a shared counter under lock 1 (the step counts vary
+# a lot, handing out numbers one by one keeps the cores equally busy).
+# Each adds its count to a shared total under lock 0 and bumps a done
+# counter; core 0 waits for all of them and stores the end time from
+# the cycle counter.
+
+LIMIT = 64
+
+# Shared RAM words
+TOTAL = 0
+DONE = 4
+START = 8
+END = 12
+NEXT = 16
+
+def program(cores):
+    a = RiscvAssembler()
+    a.read("""begin:
+        LI gp, 0xC00000
+        LI s11, {ram}
+        LI t0, 0x400000
+        LW s0, t0, 0
+        LI s1, {cores}
+
+        BNEZ s0, work
+        LW t0, gp, 0x40
+        SW t0, s11, {start}
+
+        work:
+        LI s3, {limit}
+        LI s4, 0
+        next:
+        LW t0, gp, 0x84
+        BNEZ t0, next
+        LW s2, s11, {next}
+        ADDI s2, s2, 1
+        SW s2, s11, {next}
+        SW zero, gp, 0x84
+        BLT s3, s2, finished
+
+        MV t1, s2
+        LI t2, 1
+        steps:
+        BEQ t1, t2, next
+        ADDI s4, s4, 1
+        ANDI t3, t1, 1
+        BEQZ t3, even
+        SLLI t3, t1, 1
+        ADD t1, t1, t3
+        ADDI t1, t1, 1
+        J steps
+        even:
+        SRLI t1, t1, 1
+        J steps
+        finished:
+        LW t0, gp, 0x80
+        BNEZ t0, finished
+        LW t0, s11, {total}
+        ADD t0, t0, s4
+        SW t0, s11, {total}
+        LW t0, s11, {done}
+        ADDI t0, t0, 1
+        SW t0, s11, {done}
+        SW zero, gp, 0x80
+
+        BNEZ s0, halt
+        wait:
+        LW t0, s11, {done}
+        BNE t0, s1, wait
+        LW t0, gp, 0x40
+        SW t0, s11, {end}
+        LI t0, 1
+        SW t0, gp, 4
+
+        halt:
+        J halt
+        """.format(ram=SHARED_RAM, cores=cores, limit=LIMIT,
+                   total=TOTAL, done=DONE, start=START, end=END, next=NEXT))
+    a.assemble()
+    return a.mem
+
+def collatz_steps(limit):
+    total = 0
+    for n in range(1, limit + 1):
+        while n != 1:
+            n = 3 * n + 1 if n & 1 else n // 2
+            total += 1
+    return total
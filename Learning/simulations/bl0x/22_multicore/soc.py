@@ -0,0 +1,172 @@
+import sys
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    ClockSignal, \
+    DomainRenamer, \
+    Cat, C
+
+from lib.clockworks import Clockworks
+from lib.uart_tx import UartTxFifo
+from lib.interconnect import Interconnect
+from lib.arbiter import BusArbiter
+from lib.mutex import TestAndSet
+
+from memory import Mem
+from core import Core
+
+# Shared memory map (see core.py for the per core one)
+SHARED_RAM = 0x800000
+SHARED_RAM_SIZE = 0x4000
+IO_LEDS = 0xC00004
+IO_UART_DAT = 0xC00008
+IO_UART_CNTL = 0xC00010
+IO_CYCLES = 0xC00040
+IO_MUTEX = 0xC00080
+MUTEX_LOCKS = 8
+
+class SOC(Elaboratable):
+
+    def __init__(self, cores=2, program=None, baud_rate=3000000, scheme="round_robin"):
+        """N cores (core.py), each running the same program from its own
+        scratchpad, sharing RAM, IO and a set of test-and-set locks
+        through a bus arbiter.
+
+        cores     : Number of cores
+        program   : Words preloaded into every scratchpad
+        baud_rate : UART rate
+        scheme    : Shared bus arbitration (lib/arbiter.py)
+        """
+        if cores < 1:
+            raise Exception("A SOC needs at least one core")
+
+        self.n_cores = cores
+        self.program = program if program is not None else []
+        self.baud_rate = baud_rate
+        self.scheme = scheme
+
+        self.leds = Signal(5)
+        self.tx = Signal()
+
+        # Signals in this list can easily be plotted as vcd traces
+        self.ports = []
+
+    def elaborate(self, platform: Platform) -> Module:
+
+        m = Module()
+
+        cw = Clockworks()
+        m.submodules.cw = cw
+
+        if platform is not None:
+            clk_frequency = int(platform.default_clk_constraint.frequency)
+            print("clock frequency = {}".format(clk_frequency))
+        else:
+            clk_frequency = 12000000
+
+        # Cores, first one has the highest priority with "priority"
+        arbiter = BusArbiter(self.scheme)
+        m.submodules.arbiter = DomainRenamer("slow")(arbiter)
+        self.arbiter = arbiter
+
+        self.cores = []
+        for i in range(self.n_cores):
+            core = Core(i, self.program)
+            m.submodules["core{}".format(i)] = DomainRenamer("slow")(core)
+            self.cores.append(core)
+
+            port = arbiter.add("core{}".format(i))
+            m.d.comb += [
+                port.mem_addr.eq(core.mem_addr),
+                port.mem_rstrb.eq(core.mem_rstrb),
+                port.mem_wdata.eq(core.mem_wdata),
+                port.mem_wmask.eq(core.mem_wmask),
+                core.mem_rdata.eq(port.mem_rdata),
+                core.busy.eq(port.busy),
+            ]
+
+        # Shared bus
+        bus = Interconnect(addr_width=24)
+        m.submodules.bus = DomainRenamer("slow")(bus)
+        self.bus = bus
+
+        ram_port = bus.add("ram", SHARED_RAM, SHARED_RAM_SIZE)
+        leds_port = bus.add("leds", IO_LEDS, 4)
+        uart_dat_port = bus.add("uart_dat", IO_UART_DAT, 4)
+        uart_cntl_port = bus.add("uart_cntl", IO_UART_CNTL, 4)
+        cycles_port = bus.add("cycles", IO_CYCLES, 4)
+        mutex_port = bus.add("mutex", IO_MUTEX, MUTEX_LOCKS * 4)
+
+        for p in bus.memory_map():
+            print("  {}".format(p))
+
+        m.d.comb += [
+            bus.mem_addr.eq(arbiter.mem_addr),
+            bus.mem_rstrb.eq(arbiter.mem_rstrb),
+            bus.mem_wdata.eq(arbiter.mem_wdata),
+            bus.mem_wmask.eq(arbiter.mem_wmask),
+            arbiter.mem_rdata.eq(bus.mem_rdata),
+        ]
+
+        # Shared RAM
+        memory = DomainRenamer("slow")(Mem(SHARED_RAM_SIZE // 4, name="shared"))
+        m.submodules.memory = memory
+        self.memory = memory
+
+        m.d.comb += [
+            memory.mem_addr.eq(ram_port.mem_addr),
+            memory.mem_rstrb.eq(ram_port.mem_rstrb),
+            memory.mem_wdata.eq(ram_port.mem_wdata),
+            memory.mem_wmask.eq(ram_port.mem_wmask),
+            ram_port.mem_rdata.eq(memory.mem_rdata)
+        ]
+
+        # Locks
+        m.submodules.mutex = DomainRenamer("slow")(TestAndSet(mutex_port, MUTEX_LOCKS))
+
+        # Free running cycle counter, for timing benchmarks
+        cycles = Signal(32)
+        m.d.slow += cycles.eq(cycles + 1)
+        with m.If(cycles_port.mem_rstrb):
+            m.d.slow += cycles_port.mem_rdata.eq(cycles)
+
+        # LEDs
+        with m.If(leds_port.mem_wmask.any()):
+            m.d.slow += self.leds.eq(leds_port.mem_wdata)
+
+        with m.If(leds_port.mem_rstrb):
+            m.d.slow += leds_port.mem_rdata.eq(self.leds)
+
+        # UART, TX only. Status bit 9 is TX full like the other steps.
+        uart_tx = DomainRenamer("slow")(
+                UartTxFifo(freq_hz=clk_frequency, baud_rate=self.baud_rate, depth=16))
+        m.submodules.uart_tx = uart_tx
+        self.uart_tx = uart_tx
+
+        m.d.comb += [
+            uart_tx.valid.eq(uart_dat_port.mem_wmask.any()),
+            uart_tx.data.eq(uart_dat_port.mem_wdata[0:8]),
+            self.tx.eq(uart_tx.tx)
+        ]
+
+        with m.If(uart_cntl_port.mem_rstrb):
+            m.d.slow += uart_cntl_port.mem_rdata.eq(
+                Cat(C(0, 8), uart_tx.empty, ~uart_tx.ready))
+
+        # Export signals for simulation
+        def export(signal, name):
+            if type(signal) is not Signal:
+                newsig = Signal(signal.shape(), name = name)
+                m.d.comb += newsig.eq(signal)
+            else:
+                newsig = signal
+            self.ports.append(newsig)
+            setattr(self, name, newsig)
+
+        if platform is None:
+            export(ClockSignal("slow"), "slow_clk")
+
+        return m
@@ -0,0 +1,105 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+
+# A LED counter paced by the machine timer (the CPU sleeps in WFI
+# between ticks) against the same counter paced by a software delay
+# loop. Prints the tick intervals and how much of the time the CPU was
+# busy.
+
+CLK_FREQ = 12000000
+PERIOD = 1000       # Cycles between ticks
+TICKS = 8
+MCAUSE = 0x100      # Where the handler saves mcause
+
+# gp + 0x40 is the timer: MTIME, MTIMEH, MTIMECMP, MTIMECMPH
+timer = RiscvAssembler()
+timer.read("""begin:
+        J main
+
+        handler:
+        CSRRS t1, 0x342, zero
+        SW t1, zero, {mcause}
+        LW t0, gp, 0x48
+        ADD t0, t0, s0
+        SW t0, gp, 0x48
+        ADDI s1, s1, 1
+        SW s1, gp, 4
+        MRET
+
+        main:
+        LI gp, 0x400000
+        LI s0, {period}
+        LI s1, 0
+        LI t0, 4
+        CSRRW zero, 0x305, t0
+
+        SW zero, gp, 0x4C
+        LW t0, gp, 0x40
+        ADD t0, t0, s0
+        SW t0, gp, 0x48
+
+        LI t0, 0x80
+        CSRRS zero, 0x304, t0
+        CSRRSI zero, 0x300, 8
+
+        idle:
+        WFI
+        J idle
+        """.format(mcause=MCAUSE, period=PERIOD))
+timer.assemble()
+
+# ADDI + BNEZ take 6 cycles
+spin = RiscvAssembler()
+spin.read("""begin:
+        LI gp, 0x400000
+        LI s1, 0
+
+        loop:
+        LI t1, {count}
+        delay:
+        ADDI t1, t1, -1
+        BNEZ t1, delay
+        ADDI s1, s1, 1
+        SW s1, gp, 4
+        J loop
+        """.format(count=PERIOD // 6))
+spin.assemble()
+
+def run(name, program):
+    soc = SOC(program=program, boot=False, harvard=True)
+    sim = Simulator(soc)
+    result = {}
+
+    def bench():
+        cycles = 0
+        sleeping = 0
+        leds = 0
+        ticks = []
+        while len(ticks) < TICKS:
+            yield
+            cycles += 1
+            sleeping += yield soc.sleeping
+            now = yield soc.leds
+            if now != leds:
+                leds = now
+                ticks.append(cycles)
+        result.update(ticks=ticks, busy=1 - sleeping / cycles,
+                      mcause=(yield soc.memory.mem[MCAUSE // 4]))
+
+    sim.add_clock(1 / CLK_FREQ)
+    sim.add_sync_process(bench)
+    sim.run()
+
+    ticks = result["ticks"]
+    intervals = [b - a for a, b in zip(ticks, ticks[1:])]
+    print("{:5}: intervals {}, CPU busy {:.1f}%".format(
+        name, intervals, 100 * result["busy"]))
+    return result, intervals
+
+result, intervals = run("timer", timer.mem)
+assert result["mcause"] == 0x80000007
+assert intervals == [PERIOD] * (TICKS - 1)
+
+run("spin", spin.mem)
@@ -0,0 +1,119 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+from tools.uart_monitor import UartMonitor
+
+# Event driven IO: the UART echo and the end of a DMA copy are handled
+# in the external interrupt handler (interrupt controller at gp + 0x60)
+# while the main loop counts, instead of polling the status registers.
+
+CLK_FREQ = 12000000
+BAUD = 1000000
+
+WORDS = 64
+SRC = 0x0800
+DST = 0x0C00
+WORK = 0x0100       # Main loop counter
+MESSAGE = b"Hello, interrupts!"
+
+a = RiscvAssembler()
+a.read("""begin:
+        J main
+
+        ; Claims a source, 1 = RX byte, 3 = DMA done
+        handler:
+        LW t0, gp, 0x68
+        LI t1, 1
+        BNE t0, t1, not_rx
+        LW t0, gp, 8
+        SW t0, gp, 8
+        MRET
+        not_rx:
+        LI t1, 3
+        BNE t0, t1, not_dma
+        SW zero, gp, 0x34
+        LI t0, 1
+        SW t0, gp, 4
+        not_dma:
+        MRET
+
+        main:
+        LI gp, 0x400000
+        LI t0, 4
+        CSRW mtvec, t0
+
+        LI t0, 5
+        SW t0, gp, 0x64
+        LI t0, 0x800
+        CSRS mie, t0
+        CSRSI mstatus, 8
+
+        LI t0, {src}
+        SW t0, gp, 0x20
+        LI t0, {dst}
+        SW t0, gp, 0x24
+        LI t0, {words}
+        SW t0, gp, 0x28
+        LI t0, 4
+        SW t0, gp, 0x2C
+        SW t0, gp, 0x30
+        LI t0, 1
+        SW t0, gp, 0x34
+
+        LI s2, 0
+        work:
+        ADDI s2, s2, 1
+        SW s2, zero, {work}
+        J work
+        """.format(src=SRC, dst=DST, words=WORDS, work=WORK))
+a.assemble()
+
+pattern = [(i * 0x9E3779B9) & 0xFFFFFFFF for i in range(WORDS)]
+program = a.mem + [0] * (SRC // 4 - len(a.mem)) + pattern
+
+soc = SOC(baud_rate=BAUD, program=program, boot=False, harvard=True)
+sim = Simulator(soc)
+
+bit_cycles = CLK_FREQ // BAUD
+monitor = UartMonitor(soc.tx, bit_cycles)
+received = monitor.data
+cycles = [0]
+
+def host():
+    """Types the message, one byte at a time."""
+    yield soc.rx.eq(1)
+    for _ in range(100):
+        yield
+
+    for byte in MESSAGE:
+        bits = [0] + [(byte >> i) & 1 for i in range(8)] + [1]
+        for b in bits:
+            yield soc.rx.eq(b)
+            for _ in range(bit_cycles):
+                yield
+
+    yield from monitor.wait(len(MESSAGE))
+
+    assert bytes(received) == MESSAGE
+    assert (yield soc.leds) == 1
+    for i in range(WORDS):
+        assert (yield soc.memory.mem[DST // 4 + i]) == pattern[i]
+
+    # ADDI, SW, J at 3 cycles each
+    work = yield soc.memory.mem[WORK // 4]
+    print("Echoed {!r}, DMA done, {} cycles".format(bytes(received), cycles[0]))
+    print("Main loop: {} iterations, {:.0f}% of the CPU time".format(
+        work, 100 * work * 9 / cycles[0]))
+
+def counter():
+    yield Passive()
+    while True:
+        yield
+        cycles[0] += 1
+
+sim.add_clock(1 / CLK_FREQ)
+sim.add_sync_process(host)
+sim.add_sync_process(monitor.process)
+sim.add_sync_process(counter)
+sim.run()
@@ -0,0 +1,83 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+from tools.profiler import Profiler
+
+# Where the cycles go: a LED counter with a delay subroutine and the
+# timer interrupt driven one of bench.py, profiled with
+# tools/profiler.py. Writes <name>.folded for flamegraph.pl.
+
+CLK_FREQ = 12000000
+CYCLES = 20000
+
+spin = RiscvAssembler()
+spin.read("""begin:
+        LI gp, 0x400000
+        LI s1, 0
+
+        loop:
+        LI a0, 100
+        CALL delay
+        ADDI s1, s1, 1
+        SW s1, gp, 4
+        J loop
+
+        delay:
+        ADDI a0, a0, -1
+        BNEZ a0, delay
+        RET
+        """)
+spin.assemble()
+
+# gp + 0x40 is the timer: MTIME, MTIMEH, MTIMECMP, MTIMECMPH
+timer = RiscvAssembler()
+timer.read("""begin:
+        J main
+
+        handler:
+        LW t0, gp, 0x48
+        ADD t0, t0, s0
+        SW t0, gp, 0x48
+        ADDI s1, s1, 1
+        SW s1, gp, 4
+        MRET
+
+        main:
+        LI gp, 0x400000
+        LI s0, 1000
+        LI s1, 0
+        LI t0, 4
+        CSRW mtvec, t0
+
+        SW zero, gp, 0x4C
+        LW t0, gp, 0x40
+        ADD t0, t0, s0
+        SW t0, gp, 0x48
+
+        LI t0, 0x80
+        CSRS mie, t0
+        CSRSI mstatus, 8
+
+        idle:
+        WFI
+        J idle
+        """)
+timer.assemble()
+
+def run(name, a):
+    soc = SOC(program=a.mem, boot=False, harvard=True)
+    sim = Simulator(soc)
+    profiler = Profiler(soc.cpu, a.labels)
+
+    sim.add_clock(1 / CLK_FREQ)
+    sim.add_sync_process(profiler.process, domain="slow")
+    sim.run_until(CYCLES / CLK_FREQ)
+
+    print("{}:".format(name))
+    profiler.report()
+    profiler.write_folded("{}.folded".format(name))
+    print()
+
+run("spin", spin)
+run("timer", timer)
@@ -0,0 +1,74 @@
+import time
+
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+from tools.uart_monitor import UartMonitor
+
+# Printing text with the TX UART bypassed: the firmware writes a
+# string through the FIFO, once with the UART shifting every bit out
+# and once with uart_bypass, where it takes a byte per cycle. The
+# output is decoded/collected by tools/uart_monitor.py and copied to
+# uart.txt.
+
+CLK_FREQ = 12000000
+BAUD = 1000000
+TEXT_ADDR = 0x0400
+TEXT = b"""The quick brown fox jumps over the lazy dog.
+Pack my box with five dozen liquor jugs.
+"""
+
+a = RiscvAssembler()
+a.read("""begin:
+        LI gp, 0x400000
+        LI s0, {text}
+
+        loop:
+        LBU a0, s0, 0
+        BEQZ a0, done
+        wait:
+        LW t0, gp, 0x10
+        ANDI t0, t0, 0x200
+        BNEZ t0, wait
+        SW a0, gp, 8
+        ADDI s0, s0, 1
+        J loop
+
+        done:
+        LI t0, 1
+        SW t0, gp, 4
+        EBREAK
+        """.format(text=TEXT_ADDR))
+a.assemble()
+
+# The string, NUL terminated, little endian words
+padded = TEXT + bytes(4 - len(TEXT) % 4)
+text = [int.from_bytes(padded[i:i + 4], "little") for i in range(0, len(padded), 4)]
+program = a.mem + [0] * (TEXT_ADDR // 4 - len(a.mem)) + text
+
+def run(bypass, file=None):
+    soc = SOC(baud_rate=BAUD, program=program, boot=False, harvard=True,
+              uart_bypass=bypass)
+    sim = Simulator(soc)
+    monitor = UartMonitor(soc.tx, CLK_FREQ // BAUD, uart=soc.uart_tx, file=file)
+
+    def done():
+        yield from monitor.wait(len(TEXT))
+
+    sim.add_clock(1 / CLK_FREQ)
+    sim.add_sync_process(monitor.process)
+    sim.add_sync_process(done)
+
+    start = time.time()
+    sim.run()
+    elapsed = time.time() - start
+
+    assert bytes(monitor.data) == TEXT
+    print("{:8} {:8} cycles {:6.1f}s".format(
+        "bypass" if bypass else "serial", monitor.cycle, elapsed))
+    return monitor.cycle
+
+serial = run(False)
+bypass = run(True, file="uart.txt")
+print("{:.0f}x fewer cycles, output in uart.txt".format(serial / bypass))
@@ -0,0 +1,522 @@
+from amaranth.build import Platform
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    Array, \
+    Cat, C, Const, \
+    Repl, \
+    Mux, \
+    ClockSignal
+
+class CPU(Elaboratable):
+    """The femtorv style multi-cycle CPU.
+
+    reset_address : First instruction fetched
+    harvard       : False fetches instructions over the mem_* bus like
+                    the earlier steps. True fetches over a separate
+                    instruction port (i_addr, i_rstrb, i_rdata, with the
+                    same one cycle latency) and overlaps the fetch of
+                    the next instruction with EXECUTE and LOAD/STORE:
+                    3 cycles for ALU/branch and store, 4 for a load
+                    instead of 4, 5 and 6.
+    hart_id       : Value of the mhartid CSR
+
+    Machine mode interrupts:
+        ```txt
+        timer_irq    : (I) Level, mip.MTIP (mcause 0x80000007)
+        external_irq : (I) Level, mip.MEIP (mcause 0x8000000B), wins over
+                           the timer
+        ```
+    An enabled interrupt (mstatus.MIE and its mie bit) is taken at the
+    end of EXECUTE: the instruction completes and the CPU continues at
+    mtvec with mepc = the next pc. MRET returns. WFI waits in EXECUTE,
+    off the data bus, until an interrupt is pending (even a masked one).
+
+    CSRs: mstatus (MIE, MPIE), mie, mtvec, mscratch, mepc, mcause, mip
+    (read only), mhartid, and cycle/instret with their upper halves
+    (also as mcycle/minstret) for cycle accurate timing.
+
+        ```txt
+        cycle        : (I) Clock count read by cycle/mcycle. The SOC
+                           freezes the CPU while the bus is busy, so it
+                           counts outside the CPU, in the same domain.
+        ```
+    """
+
+    # CSR addresses
+    MSTATUS = 0x300
+    MIE = 0x304
+    MTVEC = 0x305
+    MSCRATCH = 0x340
+    MEPC = 0x341
+    MCAUSE = 0x342
+    MIP = 0x344
+    MCYCLE = 0xB00
+    MINSTRET = 0xB02
+    MCYCLEH = 0xB80
+    MINSTRETH = 0xB82
+    CYCLE = 0xC00
+    INSTRET = 0xC02
+    CYCLEH = 0xC80
+    INSTRETH = 0xC82
+    MHARTID = 0xF14
+
+    def __init__(self, reset_address=0, harvard=False, hart_id=0):
+        self.reset_address = reset_address
+        self.harvard = harvard
+        self.hart_id = hart_id
+
+        self.timer_irq = Signal()
+        self.external_irq = Signal()
+        self.sleeping = Signal()    # In WFI
+        self.cycle = Signal(64)
+
+        self.mem_addr = Signal(32)
+        self.mem_rstrb = Signal()
+        self.mem_rdata = Signal(32)
+        self.mem_wdata = Signal(32)
+        self.mem_wmask = Signal(4)
+
+        # Instruction port, only used when harvard
+        self.i_addr = Signal(32)
+        self.i_rstrb = Signal()
+        self.i_rdata = Signal(32)
+        self.x10 = Signal(32)
+        self.fsm = None
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        # Program counter
+        pc = Signal(32, reset=self.reset_address)
+        self.pc = pc
+
+        # Memory
+        mem_rdata = self.mem_rdata
+
+        # Current instruction
+        instr = Signal(32, reset=0b0110011)
+        self.instr = instr
+
+        # Register bank
+        regs = Array([Signal(32, name="x"+str(x)) for x in range(32)])
+        rs1 = Signal(32)
+        rs2 = Signal(32)
+
+        # ALU registers
+        aluOut = Signal(32)
+        takeBranch = Signal(32)
+
+        # Opcode decoder
+        # It is nice to have these as actual signals for simulation
+        isALUreg = Signal()
+        isALUimm = Signal()
+        isBranch = Signal()
+        isJALR   = Signal()
+        isJAL    = Signal()
+        isAUIPC  = Signal()
+        isLUI    = Signal()
+        isLoad   = Signal()
+        isStore  = Signal()
+        isSystem = Signal()
+        m.d.comb += [
+            isALUreg.eq(instr[0:7] == 0b0110011),
+            isALUimm.eq(instr[0:7] == 0b0010011),
+            isBranch.eq(instr[0:7] == 0b1100011),
+            isJALR.eq(instr[0:7] == 0b1100111),
+            isJAL.eq(instr[0:7] == 0b1101111),
+            isAUIPC.eq(instr[0:7] == 0b0010111),
+            isLUI.eq(instr[0:7] == 0b0110111),
+            isLoad.eq(instr[0:7] == 0b0000011),
+            isStore.eq(instr[0:7] == 0b0100011),
+            isSystem.eq(instr[0:7] == 0b1110011)
+        ]
+        self.isALUreg = isALUreg
+        self.isALUimm = isALUimm
+        self.isBranch = isBranch
+        self.isLoad = isLoad
+        self.isStore = isStore
+        self.isSystem = isSystem
+
+        # Extend a signal with a sign bit repeated n times
+        def SignExtend(signal, sign, n):
+            return Cat(signal, Repl(sign, n))
+
+        # Immediate format decoder
+        Uimm = Signal(32)
+        Iimm = Signal(32)
+        Simm = Signal(32)
+        Bimm = Signal(32)
+        Jimm = Signal(32)
+        m.d.comb += [
+            Uimm.eq(Cat(Repl(0, 12), instr[12:32])),
+            Iimm.eq(Cat(instr[20:31], Repl(instr[31], 21))),
+            Simm.eq(Cat(instr[7:12], instr[25:31], Repl(instr[31], 21))),
+            Bimm.eq(Cat(0, instr[8:12], instr[25:31], instr[7],
+                Repl(instr[31], 20))),
+            Jimm.eq(Cat(0, instr[21:31], instr[20], instr[12:20],
+                Repl(instr[31], 12)))
+        ]
+        self.Iimm = Iimm
+
+        # Register addresses decoder
+        rs1Id = instr[15:20]
+        rs2Id = instr[20:25]
+        rdId = instr[7:12]
+
+        self.rdId = rdId
+        self.rs1Id = rs1Id
+        self.rs2Id = rs2Id
+
+        # Function code decdore
+        funct3 = instr[12:15]
+        funct7 = instr[25:32]
+        self.funct3 = funct3
+
+        # ALU
+        aluIn1 = Signal.like(rs1)
+        aluIn2 = Signal.like(rs2)
+        shamt = Signal(5)
+        aluMinus = Signal(33)
+        aluPlus = Signal.like(aluIn1)
+
+        m.d.comb += [
+            aluIn1.eq(rs1),
+            aluIn2.eq(Mux((isALUreg | isBranch), rs2, Iimm)),
+            shamt.eq(Mux(isALUreg, rs2[0:5], instr[20:25]))
+        ]
+
+        m.d.comb += [
+            # aluIn1 - aluIn2 with the borrow in bit 32. (The earlier steps
+            # compute aluIn2 - aluIn1 here, which breaks SUB and makes
+            # BLT/BLTU taken for equal values.)
+            aluMinus.eq(Cat(~aluIn2, C(1,1)) + Cat(aluIn1, C(0,1)) + 1),
+            aluPlus.eq(aluIn1 + aluIn2)
+        ]
+
+        EQ = aluMinus[0:32] == 0
+        LTU = aluMinus[32]
+        LT = Mux((aluIn1[31] ^ aluIn2[31]), aluIn1[31], aluMinus[32])
+
+        def flip32(x):
+            a = [x[i] for i in range(0, 32)]
+            return Cat(*reversed(a))
+
+        # TODO: check these again!
+        shifter_in = Mux(funct3 == 0b001, flip32(aluIn1), aluIn1)
+        # SRA/SRAI shift in copies of the sign bit, SRL/SLL zeros
+        shifter = (Cat(shifter_in, Repl(instr[30] & aluIn1[31], 32)) >> shamt)[0:32]
+        leftshift = flip32(shifter)
+
+        with m.Switch(funct3) as alu:
+            with m.Case(0b000):
+                m.d.comb += aluOut.eq(Mux(funct7[5] & instr[5],
+                                          aluMinus[0:32], aluPlus))
+            with m.Case(0b001):
+                m.d.comb += aluOut.eq(leftshift)
+            with m.Case(0b010):
+                m.d.comb += aluOut.eq(LT)
+            with m.Case(0b011):
+                m.d.comb += aluOut.eq(LTU)
+            with m.Case(0b100):
+                m.d.comb += aluOut.eq(aluIn1 ^ aluIn2)
+            with m.Case(0b101):
+                m.d.comb += aluOut.eq(shifter)
+            with m.Case(0b110):
+                m.d.comb += aluOut.eq(aluIn1 | aluIn2)
+            with m.Case(0b111):
+                m.d.comb += aluOut.eq(aluIn1 & aluIn2)
+
+        with m.Switch(funct3) as alu_branch:
+            with m.Case(0b000):
+                m.d.comb += takeBranch.eq(EQ)
+            with m.Case(0b001):
+                m.d.comb += takeBranch.eq(~EQ)
+            with m.Case(0b100):
+                m.d.comb += takeBranch.eq(LT)
+            with m.Case(0b101):
+                m.d.comb += takeBranch.eq(~LT)
+            with m.Case(0b110):
+                m.d.comb += takeBranch.eq(LTU)
+            with m.Case(0b111):
+                m.d.comb += takeBranch.eq(~LTU)
+            with m.Case("---"):
+                m.d.comb += takeBranch.eq(0)
+
+        # Next program counter is either next intstruction or depends on
+        # jump target
+        pcPlusImm = pc + Mux(instr[3], Jimm[0:32],
+                             Mux(instr[4], Uimm[0:32],
+                                 Bimm[0:32]))
+        pcPlus4 = pc + 4
+
+        nextPc = Mux(((isBranch & takeBranch) | isJAL), pcPlusImm,
+                     Mux(isJALR, Cat(C(0, 1), aluPlus[1:32]),
+                         pcPlus4))
+
+        # Machine mode CSRs and interrupts
+        isCSR = Signal()
+        isMRET = Signal()
+        isWFI = Signal()
+        isHalt = Signal()
+        m.d.comb += [
+            isCSR.eq(isSystem & (funct3 != 0)),
+            isMRET.eq(isSystem & (funct3 == 0) & (instr[20:32] == 0x302)),
+            isWFI.eq(isSystem & (funct3 == 0) & (instr[20:32] == 0x105)),
+            # ECALL/EBREAK stop the CPU, like in the earlier steps
+            isHalt.eq(isSystem & ~isCSR & ~isMRET & ~isWFI),
+        ]
+        self.isCSR = isCSR
+
+        mstatus_mie = Signal()
+        mstatus_mpie = Signal()
+        mie_mtie = Signal()
+        mie_meie = Signal()
+        mtvec = Signal(32)
+        mscratch = Signal(32)
+        mepc = Signal(32)
+        mcause = Signal(32)
+        cycle = self.cycle
+        instret = Signal(64)
+        self.mepc = mepc
+        self.mcause = mcause
+
+        mip = Cat(C(0, 7), self.timer_irq, C(0, 3), self.external_irq)
+        mie = Cat(C(0, 7), mie_mtie, C(0, 3), mie_meie)
+
+        pending = Signal()
+        interrupt = Signal()
+        m.d.comb += [
+            pending.eq((mip & mie).any()),
+            # Not on SYSTEM instructions, so a trap never races a CSR
+            # write or MRET.
+            interrupt.eq(mstatus_mie & pending & ~isSystem),
+        ]
+
+        csrId = instr[20:32]
+        csrRead = Signal(32)
+        with m.Switch(csrId):
+            with m.Case(self.MSTATUS):
+                m.d.comb += csrRead.eq(Cat(C(0, 3), mstatus_mie, C(0, 3), mstatus_mpie))
+            with m.Case(self.MIE):
+                m.d.comb += csrRead.eq(mie)
+            with m.Case(self.MTVEC):
+                m.d.comb += csrRead.eq(mtvec)
+            with m.Case(self.MSCRATCH):
+                m.d.comb += csrRead.eq(mscratch)
+            with m.Case(self.MEPC):
+                m.d.comb += csrRead.eq(mepc)
+            with m.Case(self.MCAUSE):
+                m.d.comb += csrRead.eq(mcause)
+            with m.Case(self.MIP):
+                m.d.comb += csrRead.eq(mip)
+            with m.Case(self.CYCLE, self.MCYCLE):
+                m.d.comb += csrRead.eq(cycle[0:32])
+            with m.Case(self.CYCLEH, self.MCYCLEH):
+                m.d.comb += csrRead.eq(cycle[32:64])
+            with m.Case(self.INSTRET, self.MINSTRET):
+                m.d.comb += csrRead.eq(instret[0:32])
+            with m.Case(self.INSTRETH, self.MINSTRETH):
+                m.d.comb += csrRead.eq(instret[32:64])
+            with m.Case(self.MHARTID):
+                m.d.comb += csrRead.eq(self.hart_id)
+
+        # CSRRW/CSRRS/CSRRC, funct3[2] selects the 5 bit immediate
+        csrIn = Mux(funct3[2], instr[15:20], rs1)
+        csrOut = Signal(32)
+        with m.Switch(funct3[0:2]):
+            with m.Case(0b01):
+                m.d.comb += csrOut.eq(csrIn)
+            with m.Case(0b10):
+                m.d.comb += csrOut.eq(csrRead | csrIn)
+            with m.Case(0b11):
+                m.d.comb += csrOut.eq(csrRead & ~csrIn)
+
+        # Where EXECUTE goes next
+        pcNext = Signal(32)
+        m.d.comb += pcNext.eq(
+            Mux(interrupt, mtvec,
+                Mux(isMRET, mepc,
+                    Mux(isHalt, pc, nextPc))))
+
+        # Main state machine
+        with m.FSM(reset="FETCH_INSTR") as fsm:
+            self.fsm = fsm
+            with m.State("FETCH_INSTR"):
+                m.next = "WAIT_INSTR"
+            with m.State("WAIT_INSTR"):
+                m.d.sync += instr.eq(self.i_rdata if self.harvard else self.mem_rdata)
+                m.next = ("FETCH_REGS")
+            with m.State("FETCH_REGS"):
+                m.d.sync += [
+                    rs1.eq(regs[rs1Id]),
+                    rs2.eq(regs[rs2Id])
+                ]
+                m.next = "EXECUTE"
+            with m.State("EXECUTE"):
+                with m.If(isWFI & ~pending):
+                    # Sleep
+                    m.d.comb += self.sleeping.eq(1)
+                with m.Else():
+                    m.d.sync += [
+                        pc.eq(pcNext),
+                        instret.eq(instret + 1),
+                    ]
+
+                    with m.If(interrupt):
+                        m.d.sync += [
+                            mepc.eq(nextPc),
+                            mcause.eq(Mux(self.external_irq & mie_meie,
+                                          0x8000000B, 0x80000007)),
+                            mstatus_mpie.eq(mstatus_mie),
+                            mstatus_mie.eq(0),
+                        ]
+                    with m.Elif(isMRET):
+                        m.d.sync += [
+                            mstatus_mie.eq(mstatus_mpie),
+                            mstatus_mpie.eq(1),
+                        ]
+
+                    with m.If(isCSR):
+                        with m.Switch(csrId):
+                            with m.Case(self.MSTATUS):
+                                m.d.sync += [
+                                    mstatus_mie.eq(csrOut[3]),
+                                    mstatus_mpie.eq(csrOut[7]),
+                                ]
+                            with m.Case(self.MIE):
+                                m.d.sync += [
+                                    mie_mtie.eq(csrOut[7]),
+                                    mie_meie.eq(csrOut[11]),
+                                ]
+                            with m.Case(self.MTVEC):
+                                m.d.sync += mtvec.eq(Cat(C(0, 2), csrOut[2:32]))
+                            with m.Case(self.MSCRATCH):
+                                m.d.sync += mscratch.eq(csrOut)
+                            with m.Case(self.MEPC):
+                                m.d.sync += mepc.eq(Cat(C(0, 2), csrOut[2:32]))
+                            with m.Case(self.MCAUSE):
+                                m.d.sync += mcause.eq(csrOut)
+
+                    with m.If(isLoad):
+                        m.next = "LOAD"
+                    with m.Elif(isStore):
+                        m.next = "STORE"
+                    with m.Else():
+                        # Harvard: the next instruction is being fetched now
+                        m.next = "WAIT_INSTR" if self.harvard else "FETCH_INSTR"
+            with m.State("LOAD"):
+                m.next = "WAIT_DATA"
+            with m.State("WAIT_DATA"):
+                if self.harvard:
+                    # The writeback still uses the old instruction this
+                    # cycle, the new one is latched at the end of it.
+                    m.d.sync += instr.eq(self.i_rdata)
+                    m.next = "FETCH_REGS"
+                else:
+                    m.next = "FETCH_INSTR"
+            with m.State("STORE"):
+                if self.harvard:
+                    m.d.sync += instr.eq(self.i_rdata)
+                    m.next = "FETCH_REGS"
+                else:
+                    m.next = "FETCH_INSTR"
+
+        ## Load and store
+
+        loadStoreAddr = Signal(32)
+        m.d.comb += loadStoreAddr.eq(rs1 + Mux(isStore, Simm, Iimm))
+
+        # Load
+        memByteAccess = Signal()
+        memHalfwordAccess = Signal()
+        loadHalfword = Signal(16)
+        loadByte = Signal(8)
+        loadSign = Signal()
+        loadData = Signal(32)
+
+        m.d.comb += [
+            memByteAccess.eq(funct3[0:2] == C(0,2)),
+            memHalfwordAccess.eq(funct3[0:2] == C(1,2)),
+            loadHalfword.eq(Mux(loadStoreAddr[1], mem_rdata[16:32],
+                                mem_rdata[0:16])),
+            loadByte.eq(Mux(loadStoreAddr[0], loadHalfword[8:16],
+                            loadHalfword[0:8])),
+            loadSign.eq(~funct3[2] & Mux(memByteAccess, loadByte[7],
+                                         loadHalfword[15])),
+            loadData.eq(
+                Mux(memByteAccess, SignExtend(loadByte, loadSign, 24),
+                    Mux(memHalfwordAccess, SignExtend(loadHalfword,
+                                                      loadSign, 16),
+                        mem_rdata)))
+        ]
+
+        # Store
+        m.d.comb += [
+            self.mem_wdata[ 0: 8].eq(rs2[0:8]),
+            self.mem_wdata[ 8:16].eq(
+                Mux(loadStoreAddr[0], rs2[0:8], rs2[8:16])),
+            self.mem_wdata[16:24].eq(
+                Mux(loadStoreAddr[1], rs2[0:8], rs2[16:24])),
+            self.mem_wdata[24:32].eq(
+                Mux(loadStoreAddr[0], rs2[0:8],
+                    Mux(loadStoreAddr[1], rs2[8:16], rs2[24:32])))
+        ]
+
+        store_wmask = Signal(4)
+        m.d.comb += store_wmask.eq(
+                Mux(memByteAccess,
+                    Mux(loadStoreAddr[1],
+                        Mux(loadStoreAddr[0], 0b1000, 0b0100),
+                        Mux(loadStoreAddr[0], 0b0010, 0b0001)
+                        ),
+                    Mux(memHalfwordAccess,
+                        Mux(loadStoreAddr[1], 0b1100, 0b0011),
+                        0b1111)
+                    )
+                )
+
+        if self.harvard:
+            # Instructions on their own port, the next one is fetched
+            # in EXECUTE (ECALL/EBREAK keep refetching themselves).
+            m.d.comb += [
+                self.i_addr.eq(Mux(fsm.ongoing("EXECUTE"), pcNext, pc)),
+                self.i_rstrb.eq(fsm.ongoing("FETCH_INSTR") | fsm.ongoing("EXECUTE")),
+                self.mem_addr.eq(loadStoreAddr),
+                self.mem_rstrb.eq(fsm.ongoing("LOAD")),
+                self.mem_wmask.eq(Repl(fsm.ongoing("STORE"), 4) & store_wmask)
+            ]
+        else:
+            # Wire memory address to pc or loadStoreAddr
+            m.d.comb += [
+                self.mem_addr.eq(
+                    Mux(fsm.ongoing("WAIT_INSTR") | fsm.ongoing("FETCH_INSTR"),
+                        pc, loadStoreAddr)),
+                self.mem_rstrb.eq(fsm.ongoing("FETCH_INSTR") | fsm.ongoing("LOAD")),
+                self.mem_wmask.eq(Repl(fsm.ongoing("STORE"), 4) & store_wmask)
+            ]
+
+
+        # Register write back
+        writeBackData = Mux(isCSR, csrRead,
+                            Mux((isJAL | isJALR), pcPlus4,
+                                Mux(isLUI, Uimm,
+                                    Mux(isAUIPC, pcPlusImm,
+                                        Mux(isLoad, loadData,
+                                        aluOut)))))
+
+        writeBackEn = ((fsm.ongoing("EXECUTE") & ~isBranch & ~isStore & ~isLoad)
+                       | fsm.ongoing("WAIT_DATA"))
+
+        self.writeBackData = writeBackData
+
+
+        with m.If(writeBackEn & (rdId != 0)):
+            m.d.sync += regs[rdId].eq(writeBackData)
+            # Also assign to debug output to see what is happening
+            with m.If(rdId == 10):
+                m.d.sync += self.x10.eq(writeBackData)
+
+        return m
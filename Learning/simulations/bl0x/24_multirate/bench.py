@@ -0,0 +1,123 @@
+from amaranth.sim import *
+
+from soc import SOC
+from tools.riscv_assembler import RiscvAssembler
+from tools.uart_monitor import UartMonitor
+
+# The CPU copy loop of 20_dma, a message polled out of the UART and an
+# RX echo, with the UARTs at 12MHz and the CPU at 12MHz and 49.5MHz. The
+# copy gets faster with the CPU clock, the UART doesn't care.
+
+UART_FREQ = 12000000
+BAUD = 3000000
+
+WORDS = 256
+SRC = 0x0800
+DST = 0x0C00
+MSG = 0x1400
+MESSAGE = b"Hello from the fast domain!\r\n"
+ECHO = b"ping"
+
+a = RiscvAssembler()
+a.read("""begin:
+        LI gp, 0x400000
+        LI s0, 0x200
+
+        LI t0, 1
+        SW t0, gp, 4
+
+        LI a0, {src}
+        LI a1, {dst}
+        LI a2, {src_end}
+        copy:
+        LW t1, a0, 0
+        SW t1, a1, 0
+        ADDI a0, a0, 4
+        ADDI a1, a1, 4
+        BNE a0, a2, copy
+
+        LI t0, 2
+        SW t0, gp, 4
+
+        LI a0, {msg}
+        LI a1, {msg_end}
+        send:
+        LBU t1, a0, 0
+        wait_tx:
+        LW t0, gp, 0x10
+        AND t0, t0, s0
+        BNEZ t0, wait_tx
+        SW t1, gp, 8
+        ADDI a0, a0, 1
+        BNE a0, a1, send
+
+        LI t0, 3
+        SW t0, gp, 4
+
+        echo:
+        LW t1, gp, 8
+        BLT t1, zero, echo
+        SW t1, gp, 8
+        J echo
+        """.format(src=SRC, dst=DST, src_end=SRC + WORDS * 4,
+                   msg=MSG, msg_end=MSG + len(MESSAGE)))
+a.assemble()
+
+pattern = [(i * 0x9E3779B9) & 0xFFFFFFFF for i in range(WORDS)]
+program = a.mem + [0] * (SRC // 4 - len(a.mem)) + pattern
+padded = MESSAGE + bytes(-len(MESSAGE) % 4)
+program += [0] * (MSG // 4 - len(program))
+program += [int.from_bytes(padded[i:i + 4], "little") for i in range(0, len(padded), 4)]
+
+bit_cycles = UART_FREQ // BAUD
+
+def run(cpu_freq):
+    soc = SOC(baud_rate=BAUD, program=program, boot=False, harvard=True)
+    sim = Simulator(soc)
+
+    # monitor.cycle counts UART clock cycles, i.e. time
+    monitor = UartMonitor(soc.tx, bit_cycles)
+    received = monitor.data
+    phases = {}
+
+    def host():
+        """Times the LED phases, then sends ECHO."""
+        phase = 0
+        while phase != 3:
+            yield
+            leds = yield soc.leds
+            if leds != phase:
+                phase = leds
+                phases[phase] = monitor.cycle
+
+        yield from monitor.wait(len(MESSAGE))
+        phases[4] = monitor.cycle
+
+        for byte in ECHO:
+            bits = [0] + [(byte >> i) & 1 for i in range(8)] + [1]
+            for b in bits:
+                yield soc.rx.eq(b)
+                for _ in range(bit_cycles):
+                    yield
+
+        yield from monitor.wait(len(MESSAGE) + len(ECHO))
+
+        for i in range(WORDS):
+            assert (yield soc.memory.mem[DST // 4 + i]) == pattern[i]
+        assert bytes(received) == MESSAGE + ECHO
+
+    # Clocks that are not multiples of each other
+    sim.add_clock(1 / cpu_freq, domain="cpu")
+    sim.add_clock(1 / UART_FREQ, domain="sync", phase=0.3 / UART_FREQ)
+    sim.add_sync_process(host)
+    sim.add_sync_process(monitor.process)
+    sim.run()
+
+    us = 1e6 / UART_FREQ
+    print("cpu {:.1f}MHz: copy {:.1f}us, message {:.1f}us, echo ok".format(
+        cpu_freq / 1e6, (phases[2] - phases[1]) * us, (phases[4] - phases[2]) * us))
+    return phases[2] - phases[1]
+
+slow = run(12e6)
+fast = run(49.5e6)
+print("Copy speedup with the faster CPU clock: {:.2f}".format(slow / fast))
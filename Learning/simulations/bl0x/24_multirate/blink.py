@@ -0,0 +1,74 @@
+import argparse
+
+from amaranth import *
+from amaranth.build import *
+from amaranth_boards.machdyne_keks import KeksPlatform
+from amaranth_boards.resources import UARTResource
+
+from soc import SOC
+
+# The PLL is an iCE40 one, so this step builds for the Keks board
+# (100MHz clock) instead of the Arty. The UART is on PMOD A.
+#
+#   python blink.py                 # highest frequency that passed sweep.py
+#   python blink.py --freq 35e6     # stops if nextpnr misses the frequency
+
+# The highest frequency sweep.py passed on the Keks (fmax 42.97MHz)
+DEFAULT_FREQ = 40e6
+
+def build(cpu_freq, build_dir="build", seed=None, allow_timing_fail=False):
+    """Builds the SOC with the CPU at cpu_freq (the PLL's closest
+    frequency). The nextpnr results go to build_dir/top.report.json.
+    allow_timing_fail is for sweep.py, which wants the fmax of a
+    frequency that fails too. Without it nextpnr stops instead of
+    writing a bitstream that misses timing.
+    """
+    platform = KeksPlatform()
+    platform.add_resources([
+        UARTResource(0, rx="1", tx="2", conn=("pmod", 0),
+                     attrs=Attrs(IO_STANDARD="LVCMOS33")),
+    ])
+
+    # We need a top level module
+    m = Module()
+
+    # This is the instance of our SOC. The Harvard fetch needs 38 block
+    # RAMs and the Keks has 32.
+    soc = SOC(baud_rate=3000000, cpu_freq=cpu_freq, harvard=False)
+
+    # The SOC is turned into a submodule (fragment) of our top level module.
+    m.submodules.soc = soc
+
+    led = platform.request('led_w', 0)
+    uart = platform.request('uart', 0)
+
+    m.d.comb += [
+        led.o.eq(soc.leds[0]),
+        uart.tx.o.eq(soc.tx),
+        soc.rx.eq(uart.rx.i),
+    ]
+
+    nextpnr_opts = "--report top.report.json"
+    if allow_timing_fail:
+        nextpnr_opts += " --timing-allow-fail"
+    if seed is not None:
+        nextpnr_opts += " --seed {}".format(seed)
+
+    # To generate the bitstream, we build() the platform using our top level
+    # module m.
+    platform.build(m, name="top", build_dir=build_dir, do_program=False,
+                   nextpnr_opts=nextpnr_opts)
+
+if __name__ == "__main__":
+    from sweep import best_frequency
+
+    parser = argparse.ArgumentParser(description="Build the multi-rate SOC for Keks")
+    parser.add_argument("--freq", type=float, default=None,
+                        help="CPU frequency in Hz, default: the best of sweep.json")
+    args = parser.parse_args()
+
+    freq = args.freq
+    if freq is None:
+        freq = best_frequency() or DEFAULT_FREQ
+    print("Building with the CPU at {:.1f}MHz".format(freq / 1e6))
+    build(freq)
@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+# Builds the SOC at a range of CPU frequencies and records which ones
+# pass timing, so blink.py can use the highest one that does.
+#
+#   python sweep.py                         # 30..80MHz in 5MHz steps
+#   python sweep.py --freqs 40e6,45e6,50e6 --seeds 3
+#
+# A frequency passes when nextpnr's achieved fmax of the "cpu" clock is
+# at least --margin above the PLL frequency, for every seed. Results
+# are added to sweep.json.
+
+import argparse
+import json
+import os
+
+from tools.nextpnr_report import read, clock_fmax
+
+RESULTS = "sweep.json"
+
+def load(path=RESULTS):
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+def best_frequency(path=RESULTS):
+    """The highest requested frequency that passed, or None."""
+    passed = [r["requested"] for r in load(path) if r["pass"]]
+    return max(passed) if passed else None
+
+def sweep(freqs, seeds=1, margin=0.05, build_root="build/sweep"):
+    from blink import build
+    from pll_parameters import PLLParams
+
+    results = load()
+
+    for freq in freqs:
+        pll = PLLParams(100e6, freq)
+        achieved = []
+        for seed in range(1, seeds + 1):
+            build_dir = os.path.join(build_root, "{:.0f}_{}".format(freq / 1e6, seed))
+            try:
+                build(freq, build_dir=build_dir, seed=seed, allow_timing_fail=True)
+                fmax, _ = clock_fmax(read(os.path.join(build_dir, "top")), "cpu")
+            except Exception as e:
+                print("{:.1f}MHz seed {}: build failed: {}".format(freq / 1e6, seed, e))
+                fmax = 0.0
+            achieved.append(fmax)
+
+        worst = min(achieved)
+        result = {
+            "requested": freq,
+            "pll": pll.f_out,
+            "achieved_mhz": achieved,
+            "pass": worst * 1e6 >= pll.f_out * (1 + margin),
+        }
+        print("{:6.1f}MHz (PLL {:6.2f}MHz): fmax {} MHz -> {}".format(
+            freq / 1e6, pll.f_out / 1e6, ", ".join("{:.2f}".format(a) for a in achieved),
+            "PASS" if result["pass"] else "FAIL"))
+
+        results = [r for r in results if r["requested"] != freq] + [result]
+        with open(RESULTS, "w") as f:
+            json.dump(sorted(results, key=lambda r: r["requested"]), f, indent=2)
+
+    best = best_frequency()
+    if best is None:
+        print("No frequency passed")
+    else:
+        print("Highest passing CPU frequency: {:.1f}MHz".format(best / 1e6))
+    return best
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPU clock frequency sweep")
+    parser.add_argument("--freqs", default=None,
+                        help="Comma separated frequencies in Hz, default 30..80MHz")
+    parser.add_argument("--seeds", type=int, default=1, help="nextpnr seeds per frequency")
+    parser.add_argument("--margin", type=float, default=0.05,
+                        help="Required fmax headroom, default 5%%")
+    args = parser.parse_args()
+
+    if args.freqs is None:
+        freqs = [f * 1e6 for f in range(30, 85, 5)]
+    else:
+        freqs = [float(f) for f in args.freqs.split(",")]
+
+    sweep(freqs, args.seeds, args.margin)
@@ -0,0 +1,170 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module
+
+from amaranth.build import Platform
+
+# Bus arbitration for SOCs with more than one master (CPU, DMA, a debug
+# port, a second core) on a single Mem/Interconnect bus.
+#
+# Every master gets a MasterPort with the CPU bus signals plus *busy*.
+# A master holds its strobes until busy drops: the access happens in the
+# first cycle busy is low and the read data comes back the next cycle,
+# just like the block RAM. Masters without wait states (the bl0x CPU)
+# can be frozen with EnableInserter(~busy).
+
+class Arbiter(Elaboratable):
+    """Grants one of *n* requesters per cycle.
+
+    scheme:
+        ```txt
+        "priority"    : The lowest numbered requester wins.
+        "round_robin" : The requester after the last granted one wins, so
+                        every master is served at least once every n
+                        grants.
+        ```
+
+    Attributes:
+    -----------
+        ```txt
+        request : (I) One bit per requester
+        grant   : (O) One-hot grant (0 when nothing is requested)
+        grants  : (O) Per requester count of granted cycles
+        stalls  : (O) Per requester count of cycles spent waiting
+        ```
+    """
+
+    SCHEMES = ("priority", "round_robin")
+
+    def __init__(self, n, scheme="round_robin", counter_width=32):
+        if scheme not in self.SCHEMES:
+            raise Exception("Unknown arbitration scheme '{}', use one of {}".format(
+                scheme, self.SCHEMES))
+        if n < 1:
+            raise Exception("An arbiter needs at least one requester")
+
+        self.n = n
+        self.scheme = scheme
+
+        self.request = Signal(n)
+        self.grant = Signal(n)
+
+        self.grants = [Signal(counter_width, name="grants{}".format(i)) for i in range(n)]
+        self.stalls = [Signal(counter_width, name="stalls{}".format(i)) for i in range(n)]
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        n = self.n
+        last = Signal(range(n))     # Index of the last grant
+
+        def grant_first(order):
+            with m.If(self.request[order[0]]):
+                m.d.comb += self.grant.eq(1 << order[0])
+            for i in order[1:]:
+                with m.Elif(self.request[i]):
+                    m.d.comb += self.grant.eq(1 << i)
+
+        if self.scheme == "priority":
+            grant_first(list(range(n)))
+        else:
+            with m.Switch(last):
+                for l in range(n):
+                    with m.Case(l):
+                        grant_first([(l + 1 + i) % n for i in range(n)])
+
+        for i in range(n):
+            with m.If(self.grant[i]):
+                m.d.sync += [
+                    last.eq(i),
+                    self.grants[i].eq(self.grants[i] + 1),
+                ]
+            with m.Elif(self.request[i]):
+                m.d.sync += self.stalls[i].eq(self.stalls[i] + 1)
+
+        return m
+
+class MasterPort():
+    """The master side of a BusArbiter.
+
+    Attributes:
+    -----------
+        ```txt
+        mem_addr  : (I) Byte address
+        mem_wdata : (I) Data to write
+        mem_wmask : (I) Byte write mask
+        mem_rstrb : (I) Read strobe
+        mem_rdata : (O) Read data, the cycle after the read was granted
+        busy      : (O) Active (high) while a strobe waits for the bus
+        ```
+    """
+    def __init__(self, name):
+        self.name = name
+
+        self.mem_addr = Signal(32, name=name + "_addr")
+        self.mem_wdata = Signal(32, name=name + "_wdata")
+        self.mem_wmask = Signal(4, name=name + "_wmask")
+        self.mem_rstrb = Signal(name=name + "_rstrb")
+        self.mem_rdata = Signal(32, name=name + "_rdata")
+        self.busy = Signal(name=name + "_busy")
+
+    def __repr__(self):
+        return self.name
+
+class BusArbiter(Elaboratable):
+    """Connects several masters to one Mem/Interconnect bus.
+
+    Masters are added with add(name), the first one added is number 0
+    (highest priority with the "priority" scheme). The bus side has the
+    CPU signals of cpu.py: mem_addr, mem_rdata, mem_rstrb, mem_wdata,
+    mem_wmask. The grant counters of the inner Arbiter are exported as
+    *grants* and *stalls*.
+    """
+
+    def __init__(self, scheme="round_robin"):
+        self.scheme = scheme
+        self.ports = []
+
+        self.mem_addr = Signal(32)
+        self.mem_rdata = Signal(32)
+        self.mem_rstrb = Signal()
+        self.mem_wdata = Signal(32)
+        self.mem_wmask = Signal(4)
+
+    def add(self, name):
+        """Add a master and return its MasterPort."""
+        for p in self.ports:
+            if p.name == name:
+                raise Exception("Master '{}' already exists".format(name))
+        port = MasterPort(name)
+        self.ports.append(port)
+        return port
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        if not self.ports:
+            raise Exception("BusArbiter has no masters")
+
+        arbiter = Arbiter(len(self.ports), self.scheme)
+        m.submodules.arbiter = arbiter
+        self.grants = arbiter.grants
+        self.stalls = arbiter.stalls
+
+        for i, p in enumerate(self.ports):
+            m.d.comb += [
+                arbiter.request[i].eq(p.mem_rstrb | p.mem_wmask.any()),
+                p.busy.eq(arbiter.request[i] & ~arbiter.grant[i]),
+                p.mem_rdata.eq(self.mem_rdata),
+            ]
+
+            with m.If(arbiter.grant[i]):
+                m.d.comb += [
+                    self.mem_addr.eq(p.mem_addr),
+                    self.mem_rstrb.eq(p.mem_rstrb),
+                    self.mem_wdata.eq(p.mem_wdata),
+                    self.mem_wmask.eq(p.mem_wmask),
+                ]
+
+        return m
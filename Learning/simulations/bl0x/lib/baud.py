@@ -0,0 +1,75 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module
+
+from amaranth.build import Platform
+
+class BaudGenerator(Elaboratable):
+    """Fractional baud rate generator.
+
+    A phase accumulator adds *increment* every clock and *tick* pulses
+    each time it wraps. The average tick rate is exact to within
+    freq_hz / 2^width. A freq_hz // baud_rate counter rounds every bit
+    to whole cycles (100MHz / 3Mbaud = 33.33 becomes 33, 1% fast), and
+    the old UartTx counter added two cycles per bit on top of that
+    (14 cycles instead of 12 at 12MHz / 1Mbaud). The jitter of any one tick
+    is at most one clock.
+
+    Parameters
+    ----------
+    freq_hz    : Clock frequency
+    baud_rate  : Bit rate
+    oversample : Ticks per bit, e.g. 16 for a receiver
+    width      : Accumulator width. With 24 bits the rate is within
+                 freq_hz / 16.7M Hz, a few ppm for common baud rates.
+
+    Attributes
+    ----------
+    tick    : (O) One clock pulse at baud_rate * oversample
+    restart : (I) Clears the accumulator, so the next tick is a full
+                  period away. Used to line up with a start bit.
+    """
+
+    def __init__(self, freq_hz, baud_rate, oversample=1, width=24):
+        rate = baud_rate * oversample
+        if rate > freq_hz:
+            raise Exception(
+                "Baud rate {} x {} is faster than the clock ({}Hz)".format(
+                    baud_rate, oversample, freq_hz))
+
+        self.freq_hz = freq_hz
+        self.baud_rate = baud_rate
+        self.oversample = oversample
+        self.width = width
+
+        self.increment = round(rate * (1 << width) / freq_hz)
+        if self.increment == 0:
+            raise Exception("Baud rate {} too slow for a {}bit accumulator".format(
+                rate, width))
+
+        self.tick = Signal()
+        self.restart = Signal()
+
+    @property
+    def actual_rate(self):
+        """The baud rate really generated (ticks / oversample)."""
+        return self.increment * self.freq_hz / (1 << self.width) / self.oversample
+
+    @property
+    def error_ppm(self):
+        return (self.actual_rate - self.baud_rate) / self.baud_rate * 1e6
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        acc = Signal(self.width + 1)
+
+        m.d.comb += self.tick.eq(acc[self.width])
+
+        with m.If(self.restart):
+            m.d.sync += acc.eq(0)
+        with m.Else():
+            m.d.sync += acc.eq(acc[0:self.width] + self.increment)
+
+        return m
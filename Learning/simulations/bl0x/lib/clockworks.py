@@ -20,7 +20,8 @@ class Clockworks(Elaboratable):
     Parameters
     ----------
     slow : is the divisor for synthesis. A number that is a power of 2, for example, 2^slow.
-    sim_slow : is the divisor for simulation.
+    sim_slow : is the divisor for simulation. 0 runs "slow" on the "sync" clock,
+               like slow=0 does for synthesis.
     """
     def __init__(self, slow=0, sim_slow=None):
         # Since the module provides a new clock domain, which is accessible
@@ -38,15 +39,15 @@ class Clockworks(Elaboratable):
         clk = Signal()      # The new clock
         m = Module()
 
-        if self.slow != 0:
-            # When the design is simulated, platform is None
-            if platform is None:
-                # Have the simulation run at a different speed than the
-                # actual hardware (usually faster).
-                slow_bit = self.sim_slow
-            else:
-                slow_bit = self.slow
+        # When the design is simulated, platform is None
+        if platform is None:
+            # Have the simulation run at a different speed than the
+            # actual hardware (usually faster).
+            slow_bit = self.sim_slow
+        else:
+            slow_bit = self.slow
 
+        if slow_bit != 0:
             # Start the slow clock past the trigger bit.
             slow_clk = Signal(slow_bit + 1)
 
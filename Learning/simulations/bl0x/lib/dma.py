@@ -0,0 +1,201 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    Repl, \
+    Mux, \
+    Cat, C
+
+from amaranth.build import Platform
+
+from lib.interconnect import BusPort
+
+class DMA(Elaboratable):
+    """A single channel DMA controller.
+
+    The DMA is a second master on the CPU bus. It copies *count*
+    elements (words or bytes) from *src* to *dst*, stepping each address
+    by its stride after every element. A stride of 0 keeps hitting the
+    same address, which is what a peripheral data register wants.
+
+    The DMA is a master of a BusArbiter (lib/arbiter.py): it holds its
+    strobes until *busy* drops. With the CPU at the higher priority the
+    DMA gets the cycles the CPU leaves free, the bl0x CPU only uses the
+    bus in 1 or 2 of every 4-6 cycles. A read's data comes back the next
+    cycle, so an element takes two bus cycles, a read and a write.
+
+    With *paced* set the write waits for *dreq*, e.g. the UART TX FIFO
+    having room.
+
+    Registers (byte offsets in the region):
+        ```txt
+        0x00 SRC        : Source address
+        0x04 DST        : Destination address
+        0x08 COUNT      : Number of elements
+        0x0C SRC_STRIDE : Signed byte step of SRC (default 4)
+        0x10 DST_STRIDE : Signed byte step of DST (default 4)
+        0x14 CTRL       : Write: bit 0 start, bit 1 byte width, bit 2 paced
+                          Read:  bit 8 busy, bit 9 done
+                          Writing clears done.
+        ```
+
+    Attributes:
+    -----------
+        ```txt
+        m_addr  : (O) Master address
+        m_rstrb : (O) Master read strobe
+        m_wdata : (O) Master write data
+        m_wmask : (O) Master write mask
+        m_rdata : (I) Bus read data (the cycle after m_rstrb)
+        m_busy  : (I) Active (high) while the bus isn't granted
+        dreq    : (I) Destination ready, used by paced transfers
+        active  : (O) Transfer in progress
+        done    : (O) Set at the end of a transfer, cleared by a CTRL write
+        ```
+    """
+
+    SRC = 0x00
+    DST = 0x04
+    COUNT = 0x08
+    SRC_STRIDE = 0x0C
+    DST_STRIDE = 0x10
+    CTRL = 0x14
+
+    CTRL_START = 1 << 0
+    CTRL_BYTE = 1 << 1
+    CTRL_PACED = 1 << 2
+    STATUS_BUSY = 1 << 8
+    STATUS_DONE = 1 << 9
+
+    SIZE = 0x20     # Register region size
+
+    def __init__(self, port: BusPort):
+        self.port = port
+
+        self.m_addr = Signal(32)
+        self.m_rstrb = Signal()
+        self.m_wdata = Signal(32)
+        self.m_wmask = Signal(4)
+        self.m_rdata = Signal(32)
+        self.m_busy = Signal()
+        self.dreq = Signal(reset=1)
+
+        self.active = Signal()
+        self.done = Signal()
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        port = self.port
+
+        src = Signal(32)
+        dst = Signal(32)
+        count = Signal(32)
+        src_stride = Signal(32, reset=4)
+        dst_stride = Signal(32, reset=4)
+        byte = Signal()
+        paced = Signal()
+
+        start = Signal()
+        offset = port.mem_addr[0:5]
+
+        # ---------------------------------------------------
+        # Registers
+        # ---------------------------------------------------
+        with m.If(port.mem_wmask.any() & ~self.active):
+            with m.Switch(offset):
+                with m.Case(self.SRC):
+                    m.d.sync += src.eq(port.mem_wdata)
+                with m.Case(self.DST):
+                    m.d.sync += dst.eq(port.mem_wdata)
+                with m.Case(self.COUNT):
+                    m.d.sync += count.eq(port.mem_wdata)
+                with m.Case(self.SRC_STRIDE):
+                    m.d.sync += src_stride.eq(port.mem_wdata)
+                with m.Case(self.DST_STRIDE):
+                    m.d.sync += dst_stride.eq(port.mem_wdata)
+                with m.Case(self.CTRL):
+                    m.d.sync += [
+                        byte.eq(port.mem_wdata[1]),
+                        paced.eq(port.mem_wdata[2]),
+                        self.done.eq(0),
+                    ]
+                    m.d.comb += start.eq(port.mem_wdata[0])
+
+        with m.If(port.mem_rstrb):
+            with m.Switch(offset):
+                with m.Case(self.SRC):
+                    m.d.sync += port.mem_rdata.eq(src)
+                with m.Case(self.DST):
+                    m.d.sync += port.mem_rdata.eq(dst)
+                with m.Case(self.COUNT):
+                    m.d.sync += port.mem_rdata.eq(count)
+                with m.Case(self.SRC_STRIDE):
+                    m.d.sync += port.mem_rdata.eq(src_stride)
+                with m.Case(self.DST_STRIDE):
+                    m.d.sync += port.mem_rdata.eq(dst_stride)
+                with m.Case(self.CTRL):
+                    m.d.sync += port.mem_rdata.eq(
+                        Cat(C(0, 1), byte, paced, C(0, 5), self.active, self.done))
+                with m.Default():
+                    m.d.sync += port.mem_rdata.eq(0)
+
+        # ---------------------------------------------------
+        # Transfer
+        # ---------------------------------------------------
+        data = Signal(32)       # Element read, held if the write waits
+        fresh = Signal()        # data is still on m_rdata
+
+        value = Signal(32)
+        m.d.comb += value.eq(Mux(fresh, self.m_rdata, data))
+
+        # Byte mode picks the source lane and writes it to the
+        # destination lane.
+        src_byte = (value >> Cat(C(0, 3), src[0:2]))[0:8]
+
+        with m.FSM(reset="IDLE") as fsm:
+            self.fsm = fsm
+
+            with m.State("IDLE"):
+                with m.If(start):
+                    with m.If(count == 0):
+                        m.d.sync += self.done.eq(1)
+                    with m.Else():
+                        m.next = "READ"
+
+            with m.State("READ"):
+                m.d.comb += [
+                    self.active.eq(1),
+                    self.m_addr.eq(src),
+                    self.m_rstrb.eq(1),
+                ]
+                with m.If(~self.m_busy):
+                    m.d.sync += fresh.eq(1)
+                    m.next = "WRITE"
+
+            with m.State("WRITE"):
+                m.d.comb += [
+                    self.active.eq(1),
+                    self.m_addr.eq(dst),
+                    self.m_wdata.eq(Mux(byte, Repl(src_byte, 4), value)),
+                ]
+                m.d.sync += [
+                    data.eq(value),
+                    fresh.eq(0),
+                ]
+                with m.If(self.dreq | ~paced):
+                    m.d.comb += self.m_wmask.eq(
+                        Mux(byte, C(1, 4) << dst[0:2], C(0b1111, 4)))
+                with m.If((self.dreq | ~paced) & ~self.m_busy):
+                    m.d.sync += [
+                        src.eq(src + src_stride),
+                        dst.eq(dst + dst_stride),
+                        count.eq(count - 1),
+                    ]
+                    with m.If(count == 1):
+                        m.d.sync += self.done.eq(1)
+                        m.next = "IDLE"
+                    with m.Else():
+                        m.next = "READ"
+
+        return m
@@ -0,0 +1,88 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module
+
+from amaranth.build import Platform
+
+from lib.interconnect import BusPort
+
+class InterruptController(Elaboratable):
+    """A small PLIC style interrupt controller.
+
+    Collects level interrupt requests from the peripherals into the one
+    external interrupt line of the CPU (mip.MEIP). A source stays pending
+    as long as its peripheral holds the request (e.g. until the RX FIFO
+    is read), so the handler services the source it claims and returns;
+    a source that is still pending interrupts again right away.
+
+    Registers (byte offsets in the region):
+        ```txt
+        0x00 PENDING : (R)  Raw source levels, bit n = source n
+        0x04 ENABLE  : (RW) Sources allowed to interrupt
+        0x08 CLAIM   : (R)  1 + the lowest pending and enabled source,
+                            0 when there is none
+        ```
+
+    Parameters:
+    -----------
+    port    : BusPort of the region
+    sources : Number of sources, at most 31
+
+    Attributes:
+    -----------
+        ```txt
+        sources : (I) Source levels, active (high) while requesting
+        irq     : (O) Active (high) while an enabled source is pending
+        ```
+    """
+
+    PENDING = 0x00
+    ENABLE = 0x04
+    CLAIM = 0x08
+
+    SIZE = 0x10
+
+    def __init__(self, port: BusPort, sources=8):
+        if not 0 < sources < 32:
+            raise Exception("InterruptController sources ({}) must be 1..31".format(sources))
+
+        self.port = port
+        self.n_sources = sources
+
+        self.sources = Signal(sources)
+        self.irq = Signal()
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        port = self.port
+        enable = Signal(self.n_sources)
+        active = Signal(self.n_sources)
+        claim = Signal(range(self.n_sources + 1))
+
+        m.d.comb += [
+            active.eq(self.sources & enable),
+            self.irq.eq(active.any()),
+        ]
+
+        # Lowest numbered source first
+        for i in reversed(range(self.n_sources)):
+            with m.If(active[i]):
+                m.d.comb += claim.eq(i + 1)
+
+        offset = port.mem_addr[0:4]
+
+        with m.If(port.mem_wmask.any() & (offset == self.ENABLE)):
+            m.d.sync += enable.eq(port.mem_wdata)
+
+        with m.If(port.mem_rstrb):
+            with m.Switch(offset):
+                with m.Case(self.PENDING):
+                    m.d.sync += port.mem_rdata.eq(self.sources)
+                with m.Case(self.ENABLE):
+                    m.d.sync += port.mem_rdata.eq(enable)
+                with m.Case(self.CLAIM):
+                    m.d.sync += port.mem_rdata.eq(claim)
+
+        return m
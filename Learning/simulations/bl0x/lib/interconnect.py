@@ -0,0 +1,179 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    Repl, \
+    Const
+
+from amaranth.build import Platform
+
+# A small memory mapped bus fabric for the bl0x SOCs.
+#
+# The CPU (master) side uses the same signals as cpu.py:
+#   mem_addr, mem_rdata, mem_rstrb, mem_wdata, mem_wmask
+# and expects read data one cycle after mem_rstrb, like the block RAM.
+#
+# Peripherals register a region (base, size) and get a BusPort back.
+# A port's strobes are only active for accesses inside its region and
+# mem_addr is the offset into the region. A peripheral must present
+# its read data in the cycle after mem_rstrb, i.e. from a register.
+#
+# The decoder compares every region in parallel. The region hit by a
+# read is registered (one-hot), so the data returned to the CPU is an
+# AND-OR of registered data and registered selects: adding peripherals
+# widens the OR, it doesn't lengthen a chain of Muxes.
+
+class BusPort():
+    """The slave side of one region.
+
+    Attributes:
+    -----------
+        ```txt
+        mem_addr  : (O) Byte offset into the region
+        mem_wdata : (O) Data to write
+        mem_wmask : (O) Byte write mask, only non-zero inside the region
+        mem_rstrb : (O) Read strobe, only active inside the region
+        mem_rdata : (I) Read data, sampled the cycle after mem_rstrb
+        sel       : (O) Active (high) while the CPU addresses the region
+        ```
+    """
+    def __init__(self, name, base, size):
+        self.name = name
+        self.base = base
+        self.size = size
+
+        addr_width = max(1, (size - 1).bit_length())
+        self.mem_addr = Signal(addr_width, name=name + "_addr")
+        self.mem_wdata = Signal(32, name=name + "_wdata")
+        self.mem_wmask = Signal(4, name=name + "_wmask")
+        self.mem_rstrb = Signal(name=name + "_rstrb")
+        self.mem_rdata = Signal(32, name=name + "_rdata")
+        self.sel = Signal(name=name + "_sel")
+
+    def __repr__(self):
+        return "{}: {:#010x}-{:#010x}".format(
+            self.name, self.base, self.base + self.size - 1)
+
+class Interconnect(Elaboratable):
+    """Address decoder connecting one master to many regions.
+
+    Regions must be a power of 2 in size (at least one word) and aligned
+    to their size, so the decode of each region is a single compare of
+    the upper address bits. Overlapping regions raise an Exception.
+    Reads from unmapped addresses return 0, writes are dropped.
+    """
+
+    def __init__(self, addr_width=32):
+        self.addr_width = addr_width
+        self.ports = []
+
+        self.mem_addr = Signal(32)
+        self.mem_rdata = Signal(32)
+        self.mem_rstrb = Signal()
+        self.mem_wdata = Signal(32)
+        self.mem_wmask = Signal(4)
+
+    def add(self, name, base, size):
+        """Register a region and return its BusPort."""
+        if size < 4 or size & (size - 1):
+            raise Exception("Region '{}' size ({:#x}) must be a power of 2 >= 4".format(name, size))
+        if base % size:
+            raise Exception("Region '{}' base ({:#x}) not aligned to its size ({:#x})".format(name, base, size))
+        if base + size > (1 << self.addr_width):
+            raise Exception("Region '{}' lies outside the {}bit address space".format(name, self.addr_width))
+
+        for p in self.ports:
+            if base < p.base + p.size and p.base < base + size:
+                raise Exception("Region '{}' overlaps '{}'".format(name, p))
+            if p.name == name:
+                raise Exception("Region '{}' already exists".format(name))
+
+        port = BusPort(name, base, size)
+        self.ports.append(port)
+        return port
+
+    def memory_map(self):
+        """The regions sorted by address, handy to print."""
+        return sorted(self.ports, key=lambda p: p.base)
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        addr = self.mem_addr[0:self.addr_width]
+
+        rdata = Const(0, 32)
+        for p in self.ports:
+            shift = (p.size - 1).bit_length()
+
+            m.d.comb += [
+                p.sel.eq(addr[shift:] == (p.base >> shift)),
+                p.mem_addr.eq(addr[0:len(p.mem_addr)]),
+                p.mem_wdata.eq(self.mem_wdata),
+                p.mem_wmask.eq(Repl(p.sel, 4) & self.mem_wmask),
+                p.mem_rstrb.eq(p.sel & self.mem_rstrb),
+            ]
+
+            # Registered one-hot select of the region being read
+            read_sel = Signal(name=p.name + "_read_sel")
+            with m.If(self.mem_rstrb):
+                m.d.sync += read_sel.eq(p.sel)
+
+            rdata = rdata | (p.mem_rdata & Repl(read_sel, 32))
+
+        m.d.comb += self.mem_rdata.eq(rdata)
+
+        return m
+
+class WishboneBridge(Elaboratable):
+    """Connects a BusPort to a Wishbone classic slave.
+
+    The bl0x CPUs have no wait states, so the slave must assert ack in
+    the same cycle as stb (a combinational ack). The read data is
+    registered here, which keeps the one cycle read latency the
+    interconnect expects.
+
+    Attributes:
+    -----------
+        ```txt
+        adr   : (O) Word address
+        dat_w : (O) Write data
+        dat_r : (I) Read data
+        sel   : (O) Byte selects
+        we    : (O) Write enable
+        cyc   : (O) Cycle
+        stb   : (O) Strobe
+        ack   : (I) Acknowledge
+        ```
+    """
+
+    def __init__(self, port: BusPort):
+        self.port = port
+
+        self.adr = Signal(max(1, len(port.mem_addr) - 2))
+        self.dat_w = Signal(32)
+        self.dat_r = Signal(32)
+        self.sel = Signal(4)
+        self.we = Signal()
+        self.cyc = Signal()
+        self.stb = Signal()
+        self.ack = Signal()
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        port = self.port
+        write = port.mem_wmask.any()
+
+        m.d.comb += [
+            self.adr.eq(port.mem_addr[2:]),
+            self.dat_w.eq(port.mem_wdata),
+            self.sel.eq(port.mem_wmask | Repl(port.mem_rstrb, 4)),
+            self.we.eq(write),
+            self.cyc.eq(port.mem_rstrb | write),
+            self.stb.eq(port.mem_rstrb | write),
+        ]
+
+        with m.If(port.mem_rstrb & self.ack):
+            m.d.sync += port.mem_rdata.eq(self.dat_r)
+
+        return m
@@ -0,0 +1,66 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module, \
+    Array, \
+    Const
+
+from amaranth.build import Platform
+from amaranth.utils import bits_for
+
+from lib.interconnect import BusPort
+
+class TestAndSet(Elaboratable):
+    """Hardware locks for CPUs sharing a bus.
+
+    Each word of the region is one lock. Reading a lock returns its old
+    value (0 = it was free) and sets it, writing releases it. The bus
+    arbiter only lets one master access the bus per cycle, so the read
+    and set can't be split by another core:
+
+        ```txt
+        lock:   LW t0, gp, MUTEX
+                BNEZ t0, lock
+                ...             critical section
+                SW zero, gp, MUTEX
+        ```
+
+    Words of the region past the last lock are no locks: they read as
+    held (1) and ignore writes, so a stray access can't take or release
+    one of the real locks.
+
+    Parameters:
+    -----------
+    port  : BusPort of the region, at least locks words
+    locks : Number of locks
+    """
+
+    def __init__(self, port: BusPort, locks=8):
+        if port.size < locks * 4:
+            raise Exception("Region '{}' too small for {} locks".format(port.name, locks))
+
+        self.port = port
+        self.locks = locks
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        port = self.port
+        held = Array([Signal(name="lock{}".format(i)) for i in range(self.locks)])
+        word = port.mem_addr[2:]
+        # An Array index past the end would select the last lock
+        index = word[:bits_for(self.locks - 1)]
+        valid = word < self.locks
+
+        with m.If(port.mem_rstrb):
+            with m.If(valid):
+                m.d.sync += [
+                    port.mem_rdata.eq(held[index]),
+                    held[index].eq(Const(1, 1)),
+                ]
+            with m.Else():
+                m.d.sync += port.mem_rdata.eq(Const(1, 1))
+        with m.Elif(port.mem_wmask.any() & valid):
+            m.d.sync += held[index].eq(Const(0, 1))
+
+        return m
@@ -0,0 +1,102 @@
+from amaranth import \
+    Elaboratable, \
+    Signal, \
+    Module
+
+from amaranth.build import Platform
+
+from lib.interconnect import BusPort
+
+class Timer(Elaboratable):
+    """RISC-V style machine timer (mtime/mtimecmp).
+
+    mtime counts clock cycles (every *prescale* cycles). The interrupt
+    is a level: high while mtime >= mtimecmp, so the handler clears it by
+    moving mtimecmp forward. mtimecmp resets to all ones, i.e. no
+    interrupt until the firmware sets it.
+
+    Registers (byte offsets in the region):
+        ```txt
+        0x00 MTIME       : Low word
+        0x04 MTIMEH      : High word
+        0x08 MTIMECMP    : Low word
+        0x0C MTIMECMPH   : High word
+        ```
+    Both halves are plain registers, so a 64bit value changes between
+    two reads of the halves; read MTIMEH, MTIME, MTIMEH again if that
+    matters. Set MTIMECMPH to all ones first when changing mtimecmp.
+
+    Attributes:
+    -----------
+        ```txt
+        irq   : (O) Active (high) while mtime >= mtimecmp
+        mtime : (O) The counter
+        ```
+    """
+
+    MTIME = 0x00
+    MTIMEH = 0x04
+    MTIMECMP = 0x08
+    MTIMECMPH = 0x0C
+
+    SIZE = 0x10
+
+    def __init__(self, port: BusPort, prescale=1):
+        if prescale < 1:
+            raise Exception("Timer prescale ({}) must be >= 1".format(prescale))
+
+        self.port = port
+        self.prescale = prescale
+
+        self.irq = Signal()
+        self.mtime = Signal(64)
+
+    def elaborate(self, platform: Platform) -> Module:
+        m = Module()
+
+        port = self.port
+        mtime = self.mtime
+        mtimecmp = Signal(64, reset=(1 << 64) - 1)
+
+        tick = Signal()
+        if self.prescale == 1:
+            m.d.comb += tick.eq(1)
+        else:
+            count = Signal(range(self.prescale))
+            with m.If(count == self.prescale - 1):
+                m.d.sync += count.eq(0)
+                m.d.comb += tick.eq(1)
+            with m.Else():
+                m.d.sync += count.eq(count + 1)
+
+        offset = port.mem_addr[0:4]
+
+        # A write to mtime below wins over the increment
+        with m.If(tick):
+            m.d.sync += mtime.eq(mtime + 1)
+
+        with m.If(port.mem_wmask.any()):
+            with m.Switch(offset):
+                with m.Case(self.MTIME):
+                    m.d.sync += mtime[0:32].eq(port.mem_wdata)
+                with m.Case(self.MTIMEH):
+                    m.d.sync += mtime[32:64].eq(port.mem_wdata)
+                with m.Case(self.MTIMECMP):
+                    m.d.sync += mtimecmp[0:32].eq(port.mem_wdata)
+                with m.Case(self.MTIMECMPH):
+                    m.d.sync += mtimecmp[32:64].eq(port.mem_wdata)
+
+        with m.If(port.mem_rstrb):
+            with m.Switch(offset):
+                with m.Case(self.MTIME):
+                    m.d.sync += port.mem_rdata.eq(mtime[0:32])
+                with m.Case(self.MTIMEH):
+                    m.d.sync += port.mem_rdata.eq(mtime[32:64])
+                with m.Case(self.MTIMECMP):
+                    m.d.sync += port.mem_rdata.eq(mtimecmp[0:32])
+                with m.Case(self.MTIMECMPH):
+                    m.d.sync += port.mem_rdata.eq(mtimecmp[32:64])
+
+        m.d.comb += self.irq.eq(mtime >= mtimecmp)
+
+        return m
@@ -0,0 +1,220 @@
+from amaranth import *
+from amaranth.lib.fifo import SyncFIFO, SyncFIFOBuffered, AsyncFIFO, AsyncFIFOBuffered
+from amaranth.lib.cdc import FFSynchronizer, PulseSynchronizer
+
+from lib.baud import BaudGenerator
+
+class UartRx(Elaboratable):
+    """Oversampling UART receiver, 8N1.
+
+    The rx line is synchronised and then sampled *oversample* times per
+    bit. A falling edge starts a frame, the start bit is checked again
+    half a bit later and from there every bit is sampled in its middle.
+
+    The oversample rate must not be faster than the clock: at 12MHz a
+    3Mbaud link needs oversample=4, at 100MHz 16 works.
+
+    Parameters
+    ----------
+    freq_hz    : Clock frequency
+    baud_rate  : UART baud rate
+    oversample : Samples per bit (>= 4)
+
+    Attributes
+    ----------
+    rx          : (I) Serial input
+    data        : (O) Received byte
+    valid       : (O) One clock pulse when data holds a new byte
+    frame_error : (O) One clock pulse when the stop bit was 0
+    """
+
+    def __init__(self, freq_hz=0, baud_rate=57600, oversample=16):
+        if oversample < 4:
+            raise Exception("UartRx oversample ({}) must be >= 4".format(oversample))
+
+        self.freq_hz = freq_hz
+        self.baud_rate = baud_rate
+        self.oversample = oversample
+
+        # Inputs
+        self.rx = Signal(reset=1)
+
+        # Outputs
+        self.data = Signal(8)
+        self.valid = Signal()
+        self.frame_error = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+
+        baud = BaudGenerator(self.freq_hz, self.baud_rate, self.oversample)
+        m.submodules.baud = baud
+
+        print("UartRx: increment = {}, actual = {:.0f} baud ({:+.1f}ppm) x{}".format(
+            baud.increment, baud.actual_rate, baud.error_ppm, self.oversample))
+
+        rx = Signal(reset=1)
+        m.submodules.rx_sync = FFSynchronizer(self.rx, rx, reset=1)
+
+        ticks = Signal(range(self.oversample))
+        bit = Signal(range(9))
+        shift = Signal(8)
+
+        m.d.sync += [
+            self.valid.eq(0),
+            self.frame_error.eq(0),
+        ]
+
+        with m.FSM(reset="IDLE"):
+            with m.State("IDLE"):
+                with m.If(baud.tick & ~rx):
+                    m.d.sync += ticks.eq(self.oversample // 2 - 1)
+                    m.next = "START"
+
+            with m.State("START"):
+                with m.If(baud.tick):
+                    with m.If(ticks == 0):
+                        # Middle of the start bit
+                        with m.If(rx):
+                            m.next = "IDLE"     # Just a glitch
+                        with m.Else():
+                            m.d.sync += [
+                                ticks.eq(self.oversample - 1),
+                                bit.eq(0),
+                            ]
+                            m.next = "DATA"
+                    with m.Else():
+                        m.d.sync += ticks.eq(ticks - 1)
+
+            with m.State("DATA"):
+                with m.If(baud.tick):
+                    with m.If(ticks == 0):
+                        m.d.sync += ticks.eq(self.oversample - 1)
+                        with m.If(bit == 8):
+                            # Stop bit
+                            with m.If(rx):
+                                m.d.sync += [
+                                    self.data.eq(shift),
+                                    self.valid.eq(1),
+                                ]
+                            with m.Else():
+                                m.d.sync += self.frame_error.eq(1)
+                            m.next = "IDLE"
+                        with m.Else():
+                            m.d.sync += [
+                                shift.eq(Cat(shift[1:8], rx)),
+                                bit.eq(bit + 1),
+                            ]
+                    with m.Else():
+                        m.d.sync += ticks.eq(ticks - 1)
+
+        return m
+
+class UartRxFifo(Elaboratable):
+    """A UartRx feeding a receive FIFO.
+
+    Parameters
+    ----------
+    freq_hz    : Clock frequency
+    baud_rate  : UART baud rate
+    oversample : Samples per bit
+    depth      : FIFO depth in bytes
+    buffered   : True puts the FIFO in block RAM, False in LUT RAM.
+    bus_domain : None runs everything in "sync". Otherwise read, data,
+                 ready, level, the errors and clear_errors are in
+                 bus_domain, the UART stays in "sync" (freq_hz is its
+                 clock) and the FIFO is an AsyncFIFO between the two.
+
+    Attributes
+    ----------
+    rx          : (I) Serial input
+    data        : (O) Oldest received byte
+    ready       : (O) Active (high) when data is valid (not empty)
+    read        : (I) Active (high) to pop data
+    level       : (O) Number of bytes waiting
+    overrun     : (O) Set when a byte arrived while full, cleared
+                      by clear_errors
+    frame_error : (O) Set on a bad stop bit, cleared by clear_errors
+    clear_errors: (I) Clears overrun and frame_error
+    """
+
+    def __init__(self, freq_hz=0, baud_rate=57600, oversample=16, depth=16, buffered=True,
+                 bus_domain=None):
+        self.freq_hz = freq_hz
+        self.baud_rate = baud_rate
+        self.oversample = oversample
+        self.depth = depth
+        self.buffered = buffered
+        self.bus_domain = bus_domain
+
+        # Inputs
+        self.rx = Signal(reset=1)
+        self.read = Signal()
+        self.clear_errors = Signal()
+
+        # Outputs
+        self.data = Signal(8)
+        self.ready = Signal()
+        self.level = Signal(range(depth + 1))
+        self.overrun = Signal()
+        self.frame_error = Signal()
+
+    def elaborate(self, platform):
+        m = Module()
+
+        uart = UartRx(self.freq_hz, self.baud_rate, self.oversample)
+        if self.bus_domain is not None:
+            fifo_type = AsyncFIFOBuffered if self.buffered else AsyncFIFO
+            fifo = fifo_type(width=8, depth=self.depth,
+                             w_domain="sync", r_domain=self.bus_domain)
+        elif self.buffered:
+            fifo = SyncFIFOBuffered(width=8, depth=self.depth)
+        else:
+            fifo = SyncFIFO(width=8, depth=self.depth)
+
+        m.submodules.uart = uart
+        m.submodules.fifo = fifo
+
+        m.d.comb += [
+            uart.rx.eq(self.rx),
+
+            fifo.w_data.eq(uart.data),
+            fifo.w_en.eq(uart.valid),
+
+            self.data.eq(fifo.r_data),
+            self.ready.eq(fifo.r_rdy),
+            fifo.r_en.eq(self.read),
+            self.level.eq(fifo.r_level),
+        ]
+
+        # The errors are kept next to the UART
+        if self.bus_domain is None:
+            clear = self.clear_errors
+            overrun = self.overrun
+            frame_error = self.frame_error
+        else:
+            clear = Signal()
+            overrun = Signal()
+            frame_error = Signal()
+            clear_sync = PulseSynchronizer(self.bus_domain, "sync")
+            m.submodules.clear_sync = clear_sync
+            m.d.comb += [
+                clear_sync.i.eq(self.clear_errors),
+                clear.eq(clear_sync.o),
+            ]
+            m.submodules.error_sync = FFSynchronizer(
+                Cat(overrun, frame_error), Cat(self.overrun, self.frame_error),
+                o_domain=self.bus_domain)
+
+        with m.If(clear):
+            m.d.sync += [
+                overrun.eq(0),
+                frame_error.eq(0),
+            ]
+        with m.Else():
+            with m.If(uart.valid & ~fifo.w_rdy):
+                m.d.sync += overrun.eq(1)
+            with m.If(uart.frame_error):
+                m.d.sync += frame_error.eq(1)
+
+        return m
@@ -1,4 +1,8 @@
 from amaranth import *
+from amaranth.lib.fifo import SyncFIFO, SyncFIFOBuffered, AsyncFIFO, AsyncFIFOBuffered
+from amaranth.lib.cdc import FFSynchronizer
+
+from lib.baud import BaudGenerator
 
 # This module is designed after corescore_emitter_uart by Olof Kindgren which
 # is part of the corescore repository on github.
@@ -11,9 +15,12 @@ from amaranth import *
 
 class UartTx(Elaboratable):
 
-    def __init__(self, freq_hz=0, baud_rate=57600):
+    def __init__(self, freq_hz=0, baud_rate=57600, bypass=False):
         self.freq_hz = freq_hz
         self.baud_rate = baud_rate
+        # Simulation only: take a byte every cycle and leave tx idle.
+        # The bytes are on data while sent is high.
+        self.bypass = bypass
 
         # Inputs
         self.data = Signal(8)
@@ -22,15 +29,27 @@ class UartTx(Elaboratable):
         # Outputs
         self.ready = Signal()
         self.tx = Signal()
+        self.sent = Signal()
 
     def elaborate(self, platform):
 
-        start_value = self.freq_hz // self.baud_rate
-        width = len(Const(start_value))
+        if self.bypass:
+            # When the design is simulated, platform is None
+            if platform is not None:
+                raise Exception("UartTx bypass is for simulation only, the built tx would stay idle")
+            m = Module()
+            m.d.comb += [
+                self.ready.eq(1),
+                self.tx.eq(1),
+                self.sent.eq(self.valid),
+            ]
+            return m
+
+        baud = BaudGenerator(self.freq_hz, self.baud_rate)
 
-        print("UartTx: start_value = {}, width = {}".format(start_value, width))
+        print("UartTx: increment = {}, actual = {:.0f} baud ({:+.1f}ppm)".format(
+            baud.increment, baud.actual_rate, baud.error_ppm))
 
-        cnt = Signal(width+1)
         data = Signal(10)
 
         ready = self.ready
@@ -38,22 +57,137 @@ class UartTx(Elaboratable):
 
         m = Module()
 
+        m.submodules.baud = baud
+
         m.d.comb += self.tx.eq(data[0] | ~(data.any()))
+        m.d.comb += self.sent.eq(valid & ready)
 
-        with m.If(cnt[width] & ~(data.any())):
+        # Hold the bit timer while idle so the start bit gets a full period.
+        m.d.comb += baud.restart.eq(ready)
+
+        with m.If(baud.tick & ~(data.any())):
             m.d.sync += ready.eq(1)
         with m.Elif(valid & ready):
             m.d.sync += ready.eq(0)
 
-        with m.If(ready | cnt[width]):
-            # Cat needed ?
-            m.d.sync += cnt.eq(start_value)
-        with m.Else():
-            m.d.sync += cnt.eq(cnt - 1)
-
-        with m.If(cnt[width]):
+        with m.If(baud.tick):
             m.d.sync += data.eq(Cat(data[1:10], C(0, 1)))
         with m.Elif(valid & ready):
             m.d.sync += data.eq(Cat(C(0, 1), self.data, C(1, 1)))
 
         return m
+
+class UartTxFifo(Elaboratable):
+    """A UartTx with a transmit FIFO in front of it.
+
+    The CPU can push bytes as fast as the bus allows until the FIFO is
+    full, instead of waiting for every character to go out.
+
+    Parameters
+    ----------
+    freq_hz   : Clock frequency
+    baud_rate : UART baud rate
+    depth     : FIFO depth in bytes
+    buffered  : True puts the FIFO in block RAM (SyncFIFOBuffered),
+                False uses distributed/LUT RAM (SyncFIFO).
+    bus_domain: None runs everything in "sync". Otherwise data, valid,
+                ready, level, empty and full are in bus_domain, the
+                UART stays in "sync" (freq_hz is its clock) and the FIFO
+                is an AsyncFIFO between the two. level and empty then
+                lag the UART by a few cycles.
+    bypass    : Simulation only, see UartTx. The FIFO drains a byte per
+                cycle and tx stays high, watch sent/sent_data instead.
+
+    Attributes
+    ----------
+    data  : (I) Byte to queue
+    valid : (I) Active (high) to queue data. Ignored when full.
+    ready : (O) Active (high) when a byte can be queued (not full)
+    level : (O) Number of bytes waiting, including the one in flight
+    empty : (O) Active (high) when nothing is queued or being sent
+    full  : (O) Active (high) when the FIFO is full
+    tx    : (O) Serial output
+    sent      : (O) Active (high) when the UART takes a byte, in "sync"
+    sent_data : (O) The byte taken while sent is high
+    """
+
+    def __init__(self, freq_hz=0, baud_rate=57600, depth=16, buffered=True, bus_domain=None,
+                 bypass=False):
+        self.freq_hz = freq_hz
+        self.baud_rate = baud_rate
+        self.depth = depth
+        self.buffered = buffered
+        self.bus_domain = bus_domain
+        self.bypass = bypass
+
+        # Inputs
+        self.data = Signal(8)
+        self.valid = Signal()
+
+        # Outputs
+        self.ready = Signal()
+        self.level = Signal(range(depth + 2))
+        self.empty = Signal()
+        self.full = Signal()
+        self.tx = Signal()
+        self.sent = Signal()
+        self.sent_data = Signal(8)
+
+    def elaborate(self, platform):
+        m = Module()
+
+        if self.bus_domain is not None:
+            fifo_type = AsyncFIFOBuffered if self.buffered else AsyncFIFO
+            fifo = fifo_type(width=8, depth=self.depth,
+                             w_domain=self.bus_domain, r_domain="sync")
+        elif self.buffered:
+            fifo = SyncFIFOBuffered(width=8, depth=self.depth)
+        else:
+            fifo = SyncFIFO(width=8, depth=self.depth)
+        uart = UartTx(freq_hz=self.freq_hz, baud_rate=self.baud_rate, bypass=self.bypass)
+
+        m.submodules.fifo = fifo
+        m.submodules.uart = uart
+
+        # Byte being shifted out by the UART
+        sending = Signal()
+        with m.If(uart.valid & uart.ready):
+            m.d.sync += sending.eq(1)
+        with m.Elif(uart.ready):
+            m.d.sync += sending.eq(0)
+
+        m.d.comb += [
+            fifo.w_data.eq(self.data),
+            fifo.w_en.eq(self.valid),
+
+            uart.data.eq(fifo.r_data),
+            uart.valid.eq(fifo.r_rdy),
+            fifo.r_en.eq(uart.ready),
+
+            self.ready.eq(fifo.w_rdy),
+            self.full.eq(~fifo.w_rdy),
+            self.tx.eq(uart.tx),
+            self.sent.eq(uart.sent),
+            self.sent_data.eq(uart.data),
+        ]
+
+        if self.bus_domain is None:
+            m.d.comb += [
+                self.level.eq(fifo.r_level + sending),
+                self.empty.eq(~fifo.r_rdy & ~sending),
+            ]
+        else:
+            # The UART side state, seen from the bus domain
+            busy = Signal()
+            bus_busy = Signal()
+            bus_sending = Signal()
+            m.d.comb += busy.eq(fifo.r_rdy | sending)
+            m.submodules.busy_sync = FFSynchronizer(
+                Cat(busy, sending), Cat(bus_busy, bus_sending), o_domain=self.bus_domain)
+
+            m.d.comb += [
+                self.level.eq(fifo.w_level + bus_sending),
+                self.empty.eq((fifo.w_level == 0) & ~bus_busy),
+            ]
+
+        return m
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# Host side of the serial bootloader in 19_bootloader/bootrom.py.
+#
+# Streams a firmware image into RAM in checksummed chunks and then
+# tells the boot ROM to jump to it:
+#
+#   python tools/bootloader.py /dev/ttyUSB0 firmware.bin
+#   python tools/bootloader.py /dev/ttyUSB0 firmware.hex --address 0 --baud 3000000
+#
+# Needs pyserial (pip install pyserial) to talk to a board. The framing
+# functions don't, they are also used by the simulation bench.
+
+import argparse
+import struct
+import sys
+import time
+
+SYNC = 0x55
+ACK = b"K"
+NAK = b"E"
+PROMPT = b">"
+
+# Longer than the boot ROM takes to give up on a frame (TIMEOUT in
+# bootrom.py) on the slowest clock, so it is back waiting for a frame.
+ROM_TIMEOUT = 0.5
+
+def read_image(path):
+    """Load an image as bytes.
+
+    .hex files are the "@<word address> <word>" lines written by
+    assembly/out2hex, gaps are zero filled. Anything else is read as
+    raw little endian bytes.
+    """
+    if path.endswith(".hex"):
+        words = []
+        with open(path) as f:
+            for line in f:
+                fields = line.split()
+                if len(fields) != 2 or not fields[0].startswith("@"):
+                    continue
+                addr = int(fields[0][1:], 16)
+                while len(words) < addr:
+                    words.append(0)
+                words.append(int(fields[1], 16))
+        return words_to_bytes(words)
+
+    with open(path, "rb") as f:
+        return f.read()
+
+def words_to_bytes(words):
+    return b"".join(struct.pack("<I", w & 0xFFFFFFFF) for w in words)
+
+def frame(address, data):
+    """One load frame: sync, address, length, data, sum."""
+    return (bytes([SYNC]) + struct.pack("<II", address, len(data)) + data
+            + struct.pack("<I", sum(data) & 0xFFFFFFFF))
+
+def jump_frame(address):
+    """Frame telling the boot ROM to jump to address."""
+    return bytes([SYNC]) + struct.pack("<II", address, 0)
+
+def frames(image, address=0, chunk=256):
+    """Split image into (address, frame bytes) chunks."""
+    for offset in range(0, len(image), chunk):
+        data = image[offset:offset + chunk]
+        yield address + offset, frame(address + offset, data)
+
+def load(port, image, address=0, baud=3000000, chunk=256, retries=3, jump=True):
+    try:
+        import serial
+    except ImportError:
+        print("pyserial is needed to talk to the board: pip install pyserial")
+        sys.exit(1)
+
+    start = time.time()
+
+    with serial.Serial(port, baud, timeout=1) as ser:
+        # The ROM prints a prompt after reset, it isn't needed to sync
+        # so just drop whatever is waiting.
+        ser.reset_input_buffer()
+
+        for addr, f in frames(image, address, chunk):
+            for attempt in range(retries + 1):
+                ser.write(f)
+                reply = ser.read(1)
+                if reply == ACK:
+                    break
+                print("chunk @ {:#x}: {} (attempt {})".format(
+                    addr, "rejected" if reply == NAK else "no reply", attempt + 1))
+                # 'E' comes once the ROM has given up on the frame. Without
+                # a reply, wait until it has and drop anything late.
+                if reply != NAK:
+                    time.sleep(ROM_TIMEOUT)
+                    ser.reset_input_buffer()
+            else:
+                print("Giving up at {:#x}".format(addr))
+                sys.exit(1)
+
+        if jump:
+            ser.write(jump_frame(address))
+
+    elapsed = time.time() - start
+    print("Loaded {} bytes at {:#x} in {:.2f}s ({:.0f} bytes/s)".format(
+        len(image), address, elapsed, len(image) / elapsed))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serial firmware loader")
+    parser.add_argument("port", help="Serial port, e.g. /dev/ttyUSB0")
+    parser.add_argument("image", help=".bin or .hex firmware image")
+    parser.add_argument("--address", type=lambda x: int(x, 0), default=0,
+                        help="Load (and start) address, default 0")
+    parser.add_argument("--baud", type=int, default=3000000)
+    parser.add_argument("--chunk", type=int, default=256, help="Bytes per frame")
+    parser.add_argument("--no-jump", action="store_true", help="Load only")
+    args = parser.parse_args()
+
+    load(args.port, read_image(args.image), args.address, args.baud,
+         args.chunk, jump=not args.no_jump)
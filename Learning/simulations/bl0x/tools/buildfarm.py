@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# Builds SOC variants for the Keks board in parallel, with a cache.
+#
+# A variant is a step and the keyword arguments of its SOC, e.g.
+# ("21_harvard", {"harvard": False}). Every variant is elaborated in a
+# fresh process (the steps all have their own soc.py/cpu.py). The build
+# plan (RTLIL, constraints and tool scripts) is hashed and yosys/nextpnr
+# only run when no earlier build had the same plan:
+#
+#   build/farm/cache/<digest>/         top.bin, top.rpt, top.tim, ...
+#   build/farm/variants/<name>.json    which digest a variant built to
+#   build/farm/logs/<name>.log
+#
+#   python tools/buildfarm.py --jobs 4              # DEFAULT_VARIANTS
+#   python tools/buildfarm.py 20_dma:scheme=round_robin 24_multirate:cpu_freq=50e6
+#
+# Run from the bl0x directory. Needs yosys, nextpnr-ice40 and icepack.
+
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import traceback
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+BL0X = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+KEKS_PLL = os.path.abspath(os.path.join(BL0X, "..", "..", "keks", "pll"))
+
+FARM_ROOT = os.path.join("build", "farm")
+
+# step    : bl0x step directory, e.g. "21_harvard"
+# params  : SOC keyword arguments
+# options : platform.build() keyword arguments (e.g. nextpnr_opts),
+#           part of the build plan and so of the cache key
+Variant = namedtuple("Variant", ["step", "params", "options"], defaults=[{}, {}])
+
+# All of them fit the Keks. The Harvard fetch of 21, 23 and 24 does not
+# (38 block RAMs of 32), so it is off. 22_multicore needs 64 block RAMs
+# with a single core and is left out.
+DEFAULT_VARIANTS = [
+    Variant("19_bootloader"),
+    Variant("20_dma", {"scheme": "priority"}),
+    Variant("20_dma", {"scheme": "round_robin"}),
+    Variant("21_harvard", {"harvard": False}),
+    Variant("23_interrupts", {"harvard": False}),
+    Variant("24_multirate", {"harvard": False, "cpu_freq": 40e6}),
+    Variant("24_multirate", {"harvard": False, "cpu_freq": 50e6}),
+    Variant("24_multirate", {"harvard": False, "cpu_freq": 60e6}),
+]
+
+def variant_name(variant):
+    """e.g. "22_multicore-cores=4"."""
+    return "-".join([variant.step] +
+                    ["{}={}".format(k, variant.params[k]) for k in sorted(variant.params)])
+
+def parse_variant(text):
+    """"step:key=value,key=value", values are Python literals."""
+    import ast
+    step, _, rest = text.partition(":")
+    params = {}
+    for item in filter(None, rest.split(",")):
+        key, _, value = item.partition("=")
+        try:
+            params[key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[key] = value
+    return Variant(step.rstrip("/"), params)
+
+def keks_top(soc):
+    """Keks platform and a top module around soc. All LEDs go to the
+    one LED so none of the logic driving them is optimised away, the
+    UART is on PMOD A.
+    """
+    from amaranth import Module
+    from amaranth.build import Attrs
+    from amaranth_boards.machdyne_keks import KeksPlatform
+    from amaranth_boards.resources import UARTResource
+
+    platform = KeksPlatform()
+    platform.add_resources([
+        UARTResource(0, rx="1", tx="2", conn=("pmod", 0),
+                     attrs=Attrs(IO_STANDARD="LVCMOS33")),
+    ])
+
+    m = Module()
+    m.submodules.soc = soc
+
+    led = platform.request('led_w', 0)
+    m.d.comb += led.o.eq(soc.leds.xor())
+
+    if hasattr(soc, "tx"):
+        uart = platform.request('uart', 0)
+        m.d.comb += uart.tx.o.eq(soc.tx)
+        if hasattr(soc, "rx"):
+            m.d.comb += soc.rx.eq(uart.rx.i)
+
+    return platform, m
+
+def build_variant(variant, root=FARM_ROOT):
+    """Builds one variant (in a worker process). Returns a dict with
+    name, digest, dir (the cache entry), cached and error.
+    """
+    name = variant_name(variant)
+    root = os.path.abspath(root)
+    result = {"name": name, "step": variant.step, "params": variant.params,
+              "digest": None, "dir": None, "cached": False, "error": None}
+
+    for path in ("logs", "cache", "variants", "tmp"):
+        os.makedirs(os.path.join(root, path), exist_ok=True)
+
+    # Everything, including the tools' output, goes to the log
+    log = open(os.path.join(root, "logs", name + ".log"), "w")
+    sys.stdout.flush()
+    os.dup2(log.fileno(), 1)
+    os.dup2(log.fileno(), 2)
+
+    try:
+        step_dir = os.path.join(BL0X, variant.step)
+        os.chdir(step_dir)
+        sys.path[:0] = [step_dir, BL0X, KEKS_PLL]
+
+        from soc import SOC
+        platform, top = keks_top(SOC(**variant.params))
+
+        # A clock that misses its constraint still gives a bitstream and
+        # a report, the fmax is what the regressions are about
+        options = {"nextpnr_opts": "--report top.report.json --timing-allow-fail"}
+        options.update(variant.options)
+        plan = platform.prepare(top, name="top", **options)
+        digest = plan.digest(16).hex()
+        result["digest"] = digest
+
+        cache_dir = os.path.join(root, "cache", digest)
+        if os.path.exists(os.path.join(cache_dir, "top.bin")):
+            result["cached"] = True
+            print("{}: cached {}".format(name, digest))
+        else:
+            # Build next to the cache and move it in when complete, so a
+            # failed or concurrent build never leaves a half entry.
+            tmp_dir = os.path.join(root, "tmp", "{}-{}".format(digest, os.getpid()))
+            try:
+                plan.execute_local(tmp_dir)
+            except Exception:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+            try:
+                os.rename(tmp_dir, cache_dir)
+            except OSError:
+                # Another worker built the same plan first
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+        result["dir"] = cache_dir
+    except Exception:
+        result["error"] = traceback.format_exc().strip().splitlines()[-1]
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+
+    with open(os.path.join(root, "variants", name + ".json"), "w") as f:
+        json.dump(result, f, indent=2)
+
+    return result
+
+def build_all(variants, jobs=None, root=FARM_ROOT):
+    """Builds variants, jobs at a time (default: one per CPU). Returns
+    the results in the order of variants.
+    """
+    # A fresh process per variant: each step's soc/cpu modules would
+    # clash in a reused one.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=ctx,
+                             max_tasks_per_child=1) as pool:
+        futures = [pool.submit(build_variant, v, root) for v in variants]
+        results = []
+        for future in futures:
+            result = future.result()
+            state = "FAILED: " + result["error"] if result["error"] else \
+                    "cached" if result["cached"] else "built"
+            print("{:40} {}".format(result["name"], state))
+            results.append(result)
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Parallel cached SOC builds")
+    parser.add_argument("variants", nargs="*",
+                        help="step:key=value,... (default DEFAULT_VARIANTS)")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Parallel builds, default one per CPU")
+    parser.add_argument("--root", default=FARM_ROOT)
+    args = parser.parse_args()
+
+    variants = [parse_variant(v) for v in args.variants] or DEFAULT_VARIANTS
+    results = build_all(variants, args.jobs, args.root)
+    sys.exit(1 if any(r["error"] for r in results) else 0)
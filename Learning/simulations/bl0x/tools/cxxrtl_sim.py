@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# Compiled simulation of a SOC with yosys' CXXRTL.
+#
+# amaranth.sim runs a SOC at a few thousand cycles per second. This
+# exports the design to C++ with CXXRTL, compiles it with a small
+# driver and runs it as a program: the clock, a UART decoder on the
+# TX pin and the LEDs are in C++, Python only starts it and reads the
+# result.
+#
+# The program is loaded at run time: run(image=words) writes the words
+# into memory before the first clock. Build the SOC with any program of
+# the same size and the one build runs every firmware. The memory is
+# named by its CXXRTL path, the end of it is enough. Amaranth names the
+# memory cell after its read port, so the RAM of 17_memory_map (the
+# r_port of the "memory" submodule) is "memory r_port":
+#
+#   sim = CxxrtlSim(soc, ports=[soc.tx, soc.rx, soc.leds], tx=soc.tx,
+#                   leds=soc.leds, memory="memory r_port")
+#   result = sim.run(2000000, bit_cycles=12 << 11, stop=b"z", image=words)
+#   print(result["output"], result["leds"])
+#
+# Without an image the memory starts with its init.
+#
+# Builds are cached in build/cxxrtl/<digest>, keyed on the RTLIL of the
+# design and the driver. Needs yosys (or the amaranth-yosys package) for
+# the CXXRTL headers and a C++ compiler (CXX, default g++).
+
+import hashlib
+import os
+import re
+import subprocess
+import tempfile
+import time
+
+from amaranth.back import rtlil
+
+BUILD_ROOT = os.path.join("build", "cxxrtl")
+# NDEBUG: CXXRTL asserts a RAM address is in range on every clock, also
+# when nothing is written, and the RAM port sees the IO addresses too
+CXXFLAGS = ["-std=c++14", "-O2", "-DNDEBUG"]
+
+DRIVER = r"""
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <string>
+
+#include "top.cc"
+#include <cxxrtl/capi/cxxrtl_capi.cc>
+
+static cxxrtl_object *port(cxxrtl_handle top, const char *name) {
+    cxxrtl_object *object = cxxrtl_get(top, name);
+    if (!object) {
+        fprintf(stderr, "error no port %s\n", name);
+        exit(1);
+    }
+    return object;
+}
+
+// The memory whose hierarchical name ends in the one searched for
+struct memory_search {
+    std::string name;
+    cxxrtl_object *found;
+    int matches;
+    std::string all;
+};
+
+static void find_memory(void *data, const char *name, cxxrtl_object *object, size_t parts) {
+    memory_search *search = (memory_search *)data;
+    std::string full = name;
+    if (object->type != CXXRTL_MEMORY)
+        return;
+    search->all += " '" + full + "'";
+    if (full.size() < search->name.size())
+        return;
+    size_t at = full.size() - search->name.size();
+    if (full.compare(at, std::string::npos, search->name) != 0 || (at && full[at - 1] != ' '))
+        return;
+    search->found = object;
+    search->matches++;
+}
+
+// Loads an image, one hex word per line, at address 0 of memory
+static void load(cxxrtl_handle top, const char *path, const char *memory) {
+    memory_search search = {memory, nullptr, 0, ""};
+    cxxrtl_enum(top, &search, find_memory);
+    if (search.matches != 1) {
+        fprintf(stderr, "error %d memories called '%s', there are%s\n",
+                search.matches, memory, search.all.c_str());
+        exit(1);
+    }
+
+    FILE *f = fopen(path, "r");
+    if (!f) {
+        fprintf(stderr, "error cannot open %s\n", path);
+        exit(1);
+    }
+    size_t chunks = (search.found->width + 31) / 32;
+    size_t addr = 0;
+    unsigned long word;
+    while (fscanf(f, "%lx", &word) == 1) {
+        if (addr == search.found->depth) {
+            fprintf(stderr, "error image larger than %zu words\n", search.found->depth);
+            exit(1);
+        }
+        search.found->curr[addr++ * chunks] = (uint32_t)word;
+    }
+    fclose(f);
+}
+
+int main(int argc, char **argv) {
+    uint64_t cycles = strtoull(argv[1], nullptr, 0);
+    uint64_t bit_cycles = strtoull(argv[2], nullptr, 0);
+    std::string stop = argv[3];
+
+    cxxrtl_handle top = cxxrtl_create(cxxrtl_design_create());
+    if (argc > 5)
+        load(top, argv[4], argv[5]);
+
+    cxxrtl_object *clk = port(top, "clk");
+    cxxrtl_object *tx = TX_PORT;
+    cxxrtl_object *leds = LEDS_PORT;
+
+    std::string output;
+    bool stopped = false;
+
+    // UART receiver: sampled in the middle of each bit
+    bool receiving = false;
+    bool last_tx = true;
+    int bit = 0;
+    uint8_t byte = 0;
+    uint64_t next_sample = 0;
+
+    uint64_t cycle;
+    for (cycle = 0; cycle < cycles && !stopped; cycle++) {
+        clk->next[0] = 0;
+        cxxrtl_step(top);
+        clk->next[0] = 1;
+        cxxrtl_step(top);
+
+        if (!bit_cycles || !tx)
+            continue;
+        bool level = tx->curr[0] & 1;
+        if (!receiving && last_tx && !level) {
+            receiving = true;
+            bit = 0;
+            byte = 0;
+            next_sample = cycle + bit_cycles + bit_cycles / 2;
+        } else if (receiving && cycle == next_sample) {
+            if (bit < 8) {
+                byte |= level << bit++;
+                next_sample += bit_cycles;
+            } else {
+                receiving = false;
+                output += (char)byte;
+                fputc(byte, stdout);
+                fflush(stdout);
+                if (!stop.empty() && output.size() >= stop.size() &&
+                    output.compare(output.size() - stop.size(), stop.size(), stop) == 0)
+                    stopped = true;
+            }
+        }
+        last_tx = level;
+    }
+
+    fprintf(stderr, "cycles %llu\n", (unsigned long long)cycle);
+    fprintf(stderr, "leds %llu\n", leds ? (unsigned long long)leds->curr[0] : 0ULL);
+    fprintf(stderr, "stopped %d\n", stopped ? 1 : 0);
+    cxxrtl_destroy(top);
+    return 0;
+}
+"""
+
+class CxxrtlSim():
+    """A design compiled with CXXRTL.
+
+    ```txt
+    Attributes:
+        top   : The elaboratable, with "sync" driven by the clk port
+        ports : Top level signals (must include tx and leds)
+        tx     : Signal decoded as a UART, None for no decoding
+        leds   : Signal reported at the end, None for none
+        memory : CXXRTL path (or its end) of the memory run(image=)
+                 loads, e.g. "memory r_port"
+    ```
+    """
+
+    def __init__(self, top, ports, tx=None, leds=None, memory=None, build_root=BUILD_ROOT):
+        self.top = top
+        self.ports = ports
+        self.tx = tx
+        self.leds = leds
+        self.memory = memory
+        self.build_root = build_root
+        self.binary = None
+
+    def driver(self):
+        tx = 'port(top, "{}")'.format(self.tx.name) if self.tx is not None else "nullptr"
+        leds = 'port(top, "{}")'.format(self.leds.name) if self.leds is not None else "nullptr"
+        return DRIVER.replace("TX_PORT", tx).replace("LEDS_PORT", leds)
+
+    def build(self):
+        """Exports and compiles the design, unless the same design was
+        built before. Returns the path of the program.
+        """
+        text = rtlil.convert(self.top, ports=self.ports)
+        driver = self.driver()
+        cxx = os.environ.get("CXX", "g++")
+
+        digest = hashlib.sha256("\0".join([text, driver, cxx] + CXXFLAGS).encode()).hexdigest()[:32]
+        build_dir = os.path.abspath(os.path.join(self.build_root, digest))
+        binary = os.path.join(build_dir, "sim")
+        if os.path.exists(binary):
+            self.binary = binary
+            return binary
+
+        from amaranth._toolchain.yosys import find_yosys
+        yosys = find_yosys(lambda version: version >= (0, 10))
+
+        os.makedirs(build_dir, exist_ok=True)
+        cc = yosys.run(["-q", "-"], "read_rtlil <<rtlil\n{}\nrtlil\nwrite_cxxrtl".format(text))
+        with open(os.path.join(build_dir, "top.cc"), "w") as f:
+            f.write(cc)
+        with open(os.path.join(build_dir, "main.cc"), "w") as f:
+            f.write(driver)
+
+        include = yosys.data_dir() / "include"
+        subprocess.check_call([cxx] + CXXFLAGS + [
+            "-I", str(include), "-I", str(include / "backends" / "cxxrtl" / "runtime"),
+            "-o", binary + ".tmp", "main.cc"], cwd=build_dir)
+        os.replace(binary + ".tmp", binary)
+
+        self.binary = binary
+        return binary
+
+    def run(self, cycles, bit_cycles=0, stop=None, image=None):
+        """Runs for cycles clocks, or until the UART printed stop (bytes).
+        bit_cycles are the clocks per UART bit, 0 turns the decoder off.
+        image (a list of words) is loaded into memory first.
+
+        Returns a dict: cycles, output (bytes), leds, stopped (stop
+        was seen) and rate (cycles per second).
+        """
+        binary = self.binary or self.build()
+        args = [os.path.abspath(binary), str(int(cycles)), str(int(bit_cycles)),
+                stop.decode("latin-1") if stop else ""]
+
+        with tempfile.TemporaryDirectory() as tmp:
+            if image is not None:
+                if self.memory is None:
+                    raise Exception("An image needs the name of the memory to load")
+                path = os.path.join(tmp, "image.hex")
+                with open(path, "w") as f:
+                    f.write("".join("{:08x}\n".format(word) for word in image))
+                args += [path, self.memory]
+
+            start = time.time()
+            proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            elapsed = time.time() - start
+
+        if proc.returncode:
+            raise Exception("{} failed: {}".format(binary, proc.stderr.decode().strip()))
+
+        status = dict(re.findall(r"^(\w+) (\d+)$", proc.stderr.decode(), re.MULTILINE))
+        done = int(status["cycles"])
+        return {
+            "cycles": done,
+            "output": proc.stdout,
+            "leds": int(status["leds"]),
+            "stopped": status["stopped"] == "1",
+            "rate": done / elapsed if elapsed else None,
+        }
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# Fast-forward: the part of a program nobody wants to watch runs on the
+# instruction level model (tools/rv32i_model.py), RTL simulation takes
+# over from its state.
+#
+# The model runs until the pc reaches a trigger address (or after a
+# number of instructions), then a process loads its registers, pc and
+# memory into the CPU and RAM of the SOC before the first clock:
+#
+#   sim = Simulator(soc)            # elaborates soc.cpu and soc.memory
+#   model = fast_forward(soc.memory.mem.init, until_pc=0x40)
+#   sim.add_process(restore(soc.cpu, soc.memory.mem, model, leds=soc.leds))
+#
+# The CPU starts in FETCH_INSTR, so the pc is the next instruction to
+# run. Only architectural state is copied: FIFOs, timers and the like
+# start from reset. The model's IO is the LEDs and UART of
+# 17_memory_map, with a TX FIFO that is never full.
+
+from tools.rv32i_model import RV32I
+
+IO_BASE = 0x400000
+IO_LEDS = 0x400004
+IO_UART_DAT = 0x400008
+IO_UART_CNTL = 0x400010
+
+class SocIO():
+    """The IO of the 17_memory_map memory map, for the model.
+
+    ```txt
+    Attributes:
+        leds : Last value written to the LEDs
+        uart : bytearray, bytes written to the UART
+    ```
+    """
+
+    base = IO_BASE
+
+    def __init__(self):
+        self.leds = 0
+        self.uart = bytearray()
+
+    def load(self, addr, funct3):
+        if addr == IO_LEDS:
+            return self.leds
+        if addr == IO_UART_DAT:
+            return 1 << 31      # No RX byte
+        if addr == IO_UART_CNTL:
+            return 1 << 8       # TX FIFO empty
+        return 0
+
+    def store(self, addr, funct3, value):
+        if addr == IO_LEDS:
+            self.leds = value
+        elif addr == IO_UART_DAT:
+            self.uart.append(value & 0xff)
+
+def fast_forward(image, size=None, until_pc=None, instructions=None, io=None):
+    """Runs image on the model until the pc is until_pc (that
+    instruction not executed yet) and/or for instructions. Returns the
+    model.
+    """
+    if until_pc is None and instructions is None:
+        raise Exception("fast_forward needs until_pc or instructions")
+
+    model = RV32I(image, size=size, io=io if io is not None else SocIO())
+    until = (lambda m: m.pc == until_pc) if until_pc is not None else None
+    model.run(max_instructions=instructions if instructions is not None else 1 << 40,
+              until=until)
+
+    if until_pc is not None and model.pc != until_pc:
+        raise Exception("pc 0x{:08x} not reached, stopped at 0x{:08x} after {} instructions".format(
+            until_pc, model.pc, model.instret))
+    return model
+
+def restore(cpu, mem, model, leds=None):
+    """Process for Simulator.add_process() copying the model's state into
+    the CPU (cpu.regs, cpu.pc, cpu.instr) and the RAM (a Memory) at
+    time 0. leds gets the last LED value of the model's IO.
+    """
+    def process():
+        if len(model.mem) > mem.depth:
+            raise Exception("Model memory of {} words does not fit in {}".format(
+                len(model.mem), mem.depth))
+        for addr, word in enumerate(model.mem):
+            yield mem[addr].eq(word)
+        for i in range(1, 32):
+            yield cpu.regs[i].eq(model.regs[i])
+        yield cpu.pc.eq(model.pc)
+        yield cpu.instr.eq(model.mem[model.word_index(model.pc)])
+        if leds is not None:
+            yield leds.eq(model.io.leds)
+    return process
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# Reads the results of a nextpnr place and route: the achieved
+# frequency of every clock and the cell usage.
+#
+# Amaranth's iCE40 build writes the nextpnr log to <name>.tim. Passing
+# nextpnr_opts="--report <name>.report.json" to platform.build() also
+# gets a JSON report, which is preferred when it exists:
+#
+#   python tools/nextpnr_report.py build/top
+
+import json
+import os
+import re
+import sys
+
+# "Max frequency for clock 'soc.cpu_clk': 52.34 MHz (PASS at 40.00 MHz)"
+FMAX_RE = re.compile(r"Max frequency for clock\s+'([^']+)':\s+([\d.]+) MHz \((PASS|FAIL) at ([\d.]+) MHz\)")
+# "Info: 	         ICESTORM_LC:  1828/ 7680    23%"
+CELL_RE = re.compile(r"^Info:\s+(\w+):\s+(\d+)/\s*(\d+)\s+\d+%")
+
+def read_json(path):
+    """fmax and utilization from a nextpnr --report file."""
+    with open(path) as f:
+        report = json.load(f)
+
+    fmax = {}
+    for clock, v in report.get("fmax", {}).items():
+        fmax[clock] = (v["achieved"], v["constraint"])
+
+    utilization = {}
+    for cell, v in report.get("utilization", {}).items():
+        utilization[cell] = (v["used"], v["available"])
+
+    return {"fmax": fmax, "utilization": utilization}
+
+def read_log(path):
+    """fmax and utilization from a nextpnr log.
+
+    nextpnr prints the frequencies after placement and again after
+    routing, the last ones are kept.
+    """
+    fmax = {}
+    utilization = {}
+    with open(path) as f:
+        for line in f:
+            m = FMAX_RE.search(line)
+            if m:
+                fmax[m.group(1)] = (float(m.group(2)), float(m.group(4)))
+                continue
+            m = CELL_RE.match(line)
+            if m:
+                utilization[m.group(1)] = (int(m.group(2)), int(m.group(3)))
+
+    return {"fmax": fmax, "utilization": utilization}
+
+def read(base):
+    """The results of build *base*, e.g. "build/top": base.report.json
+    if it exists, else the log base.tim.
+    """
+    if os.path.exists(base + ".report.json"):
+        return read_json(base + ".report.json")
+    if os.path.exists(base + ".tim"):
+        return read_log(base + ".tim")
+    raise Exception("No nextpnr report or log for {}".format(base))
+
+def clock_fmax(report, domain):
+    """(achieved, constraint) in MHz of the clock of *domain*, matched
+    on the net name nextpnr reports: "soc.cpu_clk" or
+    "cd_sync_clk100_0__i" (a clock from a pin) both contain the domain
+    as a word.
+    """
+    for clock, value in report["fmax"].items():
+        if domain in re.split(r"[^a-z0-9]+", clock.lower()):
+            return value
+    raise Exception("No clock for domain '{}' in {}".format(domain, list(report["fmax"])))
+
+if __name__ == "__main__":
+    report = read(sys.argv[1])
+    for clock, (achieved, constraint) in report["fmax"].items():
+        print("{:30} {:7.2f} MHz ({} at {:.2f} MHz)".format(
+            clock, achieved, "PASS" if achieved >= constraint else "FAIL", constraint))
+    for cell, (used, available) in report["utilization"].items():
+        if used:
+            print("{:30} {:5}/{:5}".format(cell, used, available))
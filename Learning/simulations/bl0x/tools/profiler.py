@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# Cycle profiler for the bl0x CPUs in simulation.
+#
+# Samples cpu.pc, cpu.fsm.state and cpu.instr on every clock of the
+# CPU's domain and charges the cycle to the label the pc is in (the
+# labels of RiscvAssembler). Gives a flat profile (cycles,
+# instructions and CPI per label), the cycles and stall cycles of every
+# FSM state, and a folded stack file for flamegraph.pl or speedscope:
+#
+#   profiler = Profiler(soc.cpu, a.labels)
+#   sim.add_sync_process(profiler.process, domain="slow")
+#   sim.run_until(...)
+#   profiler.report()
+#   profiler.write_folded("bench.folded")
+#
+# The Simulator must be created first, cpu.fsm only exists once the CPU
+# is elaborated.
+
+import bisect
+import sys
+
+from collections import Counter
+
+OP_JAL = 0b1101111
+OP_JALR = 0b1100111
+RA = 1
+
+class Profiler():
+    """Cycle and instruction counts of a running CPU.
+
+    ```txt
+    Attributes:
+        cycles       : Counter, cycles per label
+        instructions : Counter, instructions per label (counted as they
+                       enter EXECUTE)
+        states       : Counter, cycles per FSM state name
+        stalls       : Counter, cycles per state in which the FSM did not
+                       advance (a frozen CPU, WFI, a memory wait)
+        folded       : Counter, cycles per call stack ("A;B;C")
+    ```
+
+    labels are name -> byte address, base is added to them (e.g. a
+    program linked at 0 and run from a ROM at 0x10000). Calls are
+    JAL/JALR writing ra, returns JALR x0, ra. A stack frame is the
+    label of the call site.
+    """
+
+    def __init__(self, cpu, labels, base=0, execute_state="EXECUTE"):
+        self.cpu = cpu
+        by_pc = sorted((pc + base, name) for name, pc in labels.items())
+        self.label_pcs = [pc for pc, _ in by_pc]
+        self.label_names = [name for _, name in by_pc]
+        self.execute_state = execute_state
+
+        self.cycles = Counter()
+        self.instructions = Counter()
+        self.states = Counter()
+        self.stalls = Counter()
+        self.folded = Counter()
+        self.total = 0
+
+        self._label_cache = {}
+        self._frames = []
+        self._pending = None
+        self._last_state = None
+        self._last_pc = None
+
+    def label(self, pc):
+        """Name of the last label at or before pc."""
+        name = self._label_cache.get(pc)
+        if name is None:
+            i = bisect.bisect_right(self.label_pcs, pc) - 1
+            name = self.label_names[i] if i >= 0 else "0x{:08x}".format(pc)
+            self._label_cache[pc] = name
+        return name
+
+    def sample(self):
+        """Records the current cycle (a simulator generator)."""
+        pc = yield self.cpu.pc
+        state = self.cpu.fsm.decoding[(yield self.cpu.fsm.state)]
+
+        # A call or return is complete once EXECUTE has updated the pc
+        if self._pending and self._last_state == self.execute_state \
+                and state != self.execute_state:
+            if self._pending[0] == "call" and len(self._frames) < 64:
+                self._frames.append(self._pending[1])
+            elif self._pending[0] == "ret" and self._frames:
+                self._frames.pop()
+            self._pending = None
+
+        label = self.label(pc)
+        self.total += 1
+        self.cycles[label] += 1
+        self.states[state] += 1
+
+        advanced = state != self._last_state or pc != self._last_pc
+        if not advanced:
+            self.stalls[state] += 1
+        elif state == self.execute_state:
+            self.instructions[label] += 1
+            instr = yield self.cpu.instr
+            opcode = instr & 0x7f
+            rd = (instr >> 7) & 31
+            rs1 = (instr >> 15) & 31
+            if opcode in (OP_JAL, OP_JALR) and rd == RA:
+                self._pending = ("call", label)
+            elif opcode == OP_JALR and rd == 0 and rs1 == RA:
+                self._pending = ("ret", label)
+
+        self.folded[";".join(self._frames + [label])] += 1
+
+        self._last_state = state
+        self._last_pc = pc
+
+    def process(self):
+        """Sync process sampling every clock, for add_sync_process()."""
+        while True:
+            yield from self.sample()
+            yield
+
+    def report(self, file=sys.stdout, top=20):
+        """Prints the flat profile and the FSM states."""
+        total = max(self.total, 1)
+        print("{:20} {:>10} {:>6} {:>10} {:>6}".format(
+            "label", "cycles", "%", "instr", "CPI"), file=file)
+        for label, cycles in self.cycles.most_common(top):
+            instructions = self.instructions[label]
+            cpi = "{:6.2f}".format(cycles / instructions) if instructions else "     -"
+            print("{:20} {:10} {:5.1f}% {:10} {}".format(
+                label, cycles, 100 * cycles / total, instructions, cpi), file=file)
+        print("{:20} {:10}        {:10}".format(
+            "total", self.total, sum(self.instructions.values())), file=file)
+        print(file=file)
+
+        print("{:20} {:>10} {:>10}".format("state", "cycles", "stalls"), file=file)
+        for state, cycles in self.states.most_common():
+            print("{:20} {:10} {:10}".format(state, cycles, self.stalls[state]), file=file)
+
+    def write_folded(self, path):
+        """Folded stacks, one "A;B;C cycles" line per stack."""
+        with open(path, "w") as f:
+            for stack, cycles in sorted(self.folded.items()):
+                f.write("{} {}\n".format(stack, cycles))
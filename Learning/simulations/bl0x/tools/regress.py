@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# Resource and fmax regression runner for the bl0x steps.
+#
+# Builds the SOC of every step for the Keks board (iCE40HX8K, yosys and
+# nextpnr-ice40), records LUTs (ICESTORM_LC), flip flops, block RAMs
+# and the achieved fmax of the CPU clock, appends them to a JSON
+# history and flags a step that got worse than its previous run:
+#
+#   python tools/regress.py                     # all steps with a CPU
+#   python tools/regress.py 21_harvard 23_interrupts --tolerance 0.05
+#
+# Run from the bl0x directory. The builds go through the build farm
+# (tools/buildfarm.py): --jobs of them in parallel, and a step whose
+# build plan did not change since the last run is not built again.
+# Exits with 1 when something regressed or a step failed to build.
+
+import argparse
+import datetime
+import glob
+import json
+import os
+import re
+import subprocess
+import sys
+
+from buildfarm import BL0X, FARM_ROOT, Variant, build_all
+from nextpnr_report import read, clock_fmax
+
+HISTORY = "regress.json"
+
+# The CPU clock is "cpu" from 24_multirate on, "slow" before. In 19 to
+# 23 "slow" is the board clock itself (Clockworks() does not divide),
+# which nextpnr names after "sync".
+CPU_DOMAINS = ("cpu", "slow", "sync")
+
+# Smaller is better for these, larger for fmax
+METRICS = ("lc", "ff", "bram")
+
+# SOC arguments of a step for the Keks build. The Harvard fetch needs
+# 38 block RAMs and the Keks has 32.
+STEP_PARAMS = {
+    "21_harvard": {"harvard": False},
+    "23_interrupts": {"harvard": False},
+    "24_multirate": {"harvard": False},
+}
+
+# Steps that don't fit the Keks whatever their arguments, and why. They
+# are skipped instead of failing every run.
+NO_FIT = {
+    "22_multicore": "64 block RAMs of 32 with one core",
+}
+
+def steps():
+    """Steps with a CPU: every numbered directory with a soc.py and a
+    blink.py.
+    """
+    found = []
+    for path in sorted(glob.glob(os.path.join(BL0X, "[0-9][0-9]_*"))):
+        if os.path.exists(os.path.join(path, "soc.py")) and \
+           os.path.exists(os.path.join(path, "blink.py")):
+            found.append(os.path.basename(path))
+    return found
+
+def yosys_cells(path):
+    """Cell counts of the last stat in a yosys log."""
+    cells = {}
+    with open(path) as f:
+        for line in f:
+            if "Number of cells" in line:
+                cells = {}
+            # "     SB_DFFE    12" (older yosys) or "   12   SB_DFFE" (newer)
+            m = re.match(r"^\s+(SB_\w+)\s+(\d+)\s*$", line) or \
+                re.match(r"^\s+(\d+)\s+(SB_\w+)\s*$", line)
+            if m:
+                a, b = m.groups()
+                name, count = (a, b) if a.startswith("SB_") else (b, a)
+                cells[name] = int(count)
+    return cells
+
+def measure(build_dir):
+    """Results of one build."""
+    base = os.path.join(build_dir, "top")
+    report = read(base)
+
+    for domain in CPU_DOMAINS:
+        try:
+            fmax, constraint = clock_fmax(report, domain)
+            break
+        except Exception:
+            continue
+    else:
+        fmax, constraint, domain = None, None, None
+
+    cells = yosys_cells(base + ".rpt")
+    utilization = report["utilization"]
+    return {
+        "lc": utilization.get("ICESTORM_LC", (0, 0))[0],
+        "bram": utilization.get("ICESTORM_RAM", (0, 0))[0],
+        "ff": sum(n for name, n in cells.items() if name.startswith("SB_DFF")),
+        "fmax": fmax,
+        "constraint": constraint,
+        "domain": domain,
+    }
+
+def commit():
+    try:
+        rev = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                      cwd=BL0X, text=True).strip()
+        dirty = subprocess.call(["git", "diff", "--quiet", "HEAD", "--", "."], cwd=BL0X)
+        return rev + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def previous(history, step):
+    """The last recorded result of step."""
+    for run in reversed(history):
+        if step in run["results"]:
+            return run["results"][step]
+    return None
+
+def timing_failure(result):
+    """Description of a CPU clock that misses its constraint, or None."""
+    if result["fmax"] is not None and result["constraint"] and \
+            result["fmax"] < result["constraint"]:
+        return "fmax {:.2f} below the {:.2f} MHz constraint".format(
+            result["fmax"], result["constraint"])
+    return None
+
+def regressions(old, new, tolerance):
+    """Descriptions of what got worse than tolerance (a fraction)."""
+    found = []
+    for key in METRICS:
+        if old.get(key) and new.get(key) is not None and new[key] > old[key] * (1 + tolerance):
+            found.append("{} {} -> {}".format(key, old[key], new[key]))
+    if old.get("fmax") and (new.get("fmax") is None or new["fmax"] < old["fmax"] * (1 - tolerance)):
+        found.append("fmax {:.2f} -> {}".format(
+            old["fmax"], "none" if new["fmax"] is None else "{:.2f}".format(new["fmax"])))
+    return found
+
+def main(args):
+    history = []
+    if os.path.exists(args.history):
+        with open(args.history) as f:
+            history = json.load(f)
+
+    results = {}
+    flagged = {}
+    variants = []
+    for step in args.steps or steps():
+        if step in NO_FIT:
+            print("{:24} skipped, does not fit the Keks: {}".format(step, NO_FIT[step]))
+            continue
+        variants.append(Variant(step, STEP_PARAMS.get(step, {})))
+    for build in build_all(variants, args.jobs, args.root):
+        step = build["step"]
+        if build["error"]:
+            # Worse than any number getting worse
+            flagged[step] = ["build failed"]
+            print("{:24} REGRESSION: build failed, see {}".format(
+                step, os.path.join(args.root, "logs", build["name"] + ".log")))
+            continue
+        result = measure(build["dir"])
+        results[step] = result
+
+        old = previous(history, step)
+        flagged[step] = regressions(old, result, args.tolerance) if old is not None else []
+        failure = timing_failure(result)
+        if failure:
+            flagged[step].append(failure)
+
+        fmax = "-" if result["fmax"] is None else "{:.2f}".format(result["fmax"])
+        print("{:24} LC {:5}  FF {:5}  BRAM {:3}  fmax {:>7} MHz  {}".format(
+            step, result["lc"], result["ff"], result["bram"], fmax,
+            "REGRESSION: " + ", ".join(flagged[step]) if flagged.get(step) else ""))
+
+    history.append({
+        "commit": commit(),
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    })
+    with open(args.history, "w") as f:
+        json.dump(history, f, indent=2)
+
+    return 1 if any(flagged.values()) else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="bl0x resource/fmax regression runner")
+    parser.add_argument("steps", nargs="*", help="Step directories, default all")
+    parser.add_argument("--history", default=HISTORY, help="JSON history file")
+    parser.add_argument("--tolerance", type=float, default=0.03,
+                        help="Allowed change before flagging, default 3%%")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Parallel builds, default one per CPU")
+    parser.add_argument("--root", default=FARM_ROOT, help="Build farm directory")
+    args = parser.parse_args()
+
+    sys.exit(main(args))
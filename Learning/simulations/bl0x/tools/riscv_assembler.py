@@ -77,17 +77,41 @@ SysInstructions = [
     ("FENCE_I",),
     ("ECALL",),
     ("EBREAK",),
-    ("CSRRW",),
-    ("CSRRS",),
-    ("CSRRWI",),
-    ("CSRRSI",),
-    ("CSRRCI",)
+    ("MRET",),
+    ("WFI",),
+    ("CSRRW",  0b001),
+    ("CSRRS",  0b010),
+    ("CSRRC",  0b011),
+    ("CSRRWI", 0b101),
+    ("CSRRSI", 0b110),
+    ("CSRRCI", 0b111)
 ]
 SysOps = [x[0] for x in SysInstructions]
 
+# CSR names, usable wherever a CSR number is expected
+CSRNames = {
+    "MSTATUS":   0x300,
+    "MIE":       0x304,
+    "MTVEC":     0x305,
+    "MSCRATCH":  0x340,
+    "MEPC":      0x341,
+    "MCAUSE":    0x342,
+    "MIP":       0x344,
+    "MCYCLE":    0xB00,
+    "MINSTRET":  0xB02,
+    "MCYCLEH":   0xB80,
+    "MINSTRETH": 0xB82,
+    "CYCLE":     0xC00,
+    "INSTRET":   0xC02,
+    "CYCLEH":    0xC80,
+    "INSTRETH":  0xC82,
+    "MHARTID":   0xF14,
+}
+
 PseudoInstructions = [
     ("LI",),
     ("CALL",),
+    ("LA",),
     ("RET",),
     ("MV",),
     ("NOP",),
@@ -95,6 +119,13 @@ PseudoInstructions = [
     ("BEQZ",),
     ("BNEZ",),
     ("BGT",),
+    ("CSRR",),
+    ("CSRW",),
+    ("CSRS",),
+    ("CSRC",),
+    ("CSRWI",),
+    ("CSRSI",),
+    ("CSRCI",),
 ]
 PseudoOps = [x[0] for x in PseudoInstructions]
 
@@ -300,13 +331,27 @@ class RiscvAssembler():
             return 0b00000000000000000000000001110011
         elif op == "EBREAK":
             return 0b00000000000100000000000001110011
+        elif op == "MRET":
+            return 0b00110000001000000000000001110011
+        elif op == "WFI":
+            return 0b00010000010100000000000001110011
+        elif op.startswith("CSRR"):
+            # CSRRW rd, csr, rs1  or  CSRRWI rd, csr, uimm5
+            _, f3 = [x for x in SysInstructions if x[0] == op][0]
+            rd = reg2int(instruction.args[0])
+            csr = self.csr2int(instruction.args[1])
+            if op.endswith("I"):
+                rs1 = self.imm2int(instruction.args[2]) & 0x1f
+            else:
+                rs1 = reg2int(instruction.args[2])
+            return self.encodeI(csr, rs1, f3, rd, 0b1110011)
         else:
             print("Unhandled system op {}".format(op))
 
     def encodeMemops(self, instruction) -> int:
         op = instruction.op
         if op == "DATAW":
-            w = int(instruction.args[0])
+            w = self.imm2int(instruction.args[0]) & 0xffffffff
             return w
         if op == "DATAB":
             b1 = int(instruction.args[0]) & 0xff
@@ -347,6 +392,13 @@ class RiscvAssembler():
             ref2 = LabelRef(op, "offset12", instruction.args[0])
             instr.append(self.iFromLine("AUIPC x6, {}".format(ref1)))
             instr.append(self.iFromLine("JALR  x1, x6, {}".format(ref2)))
+        elif op == "LA":
+            # Address of a label, pc relative
+            rd = instruction.args[0]
+            ref1 = LabelRef(op, "hi", instruction.args[1])
+            ref2 = LabelRef(op, "lo", instruction.args[1])
+            instr.append(self.iFromLine("AUIPC {}, {}".format(rd, ref1)))
+            instr.append(self.iFromLine("ADDI  {}, {}, {}".format(rd, rd, ref2)))
         elif op == "RET":
             instr.append(self.iFromLine("JALR  x0, x1, 0"))
         elif op == "MV":
@@ -370,6 +422,16 @@ class RiscvAssembler():
             ref = LabelRef(op, "imm", instruction.args[2])
             instr.append(self.iFromLine("BLT   {}, {}, {}".format(
                 rs2, rs1, ref)))
+        elif op == "CSRR":
+            rd = instruction.args[0]
+            csr = instruction.args[1]
+            instr.append(self.iFromLine("CSRRS {}, {}, zero".format(rd, csr)))
+        elif op in ["CSRW", "CSRS", "CSRC", "CSRWI", "CSRSI", "CSRCI"]:
+            # CSRW csr, rs1 -> CSRRW zero, csr, rs1
+            csr = instruction.args[0]
+            arg = instruction.args[1]
+            instr.append(self.iFromLine("CSRR{} zero, {}, {}".format(
+                op[3:], csr, arg)))
         else:
             return [instruction], False
         return instr, True
@@ -469,6 +531,12 @@ class RiscvAssembler():
                     instructions.append(u)
         self.instructions += instructions
 
+    def csr2int(self, arg) -> int:
+        upp = arg.upper()
+        if upp in CSRNames:
+            return CSRNames[upp]
+        return self.imm2int(arg)
+
     def imm2int(self, arg) -> int:
         upp = arg.upper()
         if len(arg) == 0:
@@ -491,6 +559,15 @@ class RiscvAssembler():
                     return offset
                 if l.name == "OFFSET12":
                     return (offset + 4) & 0xfff
+            elif l.op == "LA":
+                # The ADDI is one instruction after the AUIPC, and
+                # sign extends the low 12 bits
+                if l.name == "HI":
+                    offset = self.imm2int(l.arg)
+                    return (offset + 0x800) & 0xfffff000
+                if l.name == "LO":
+                    offset = self.imm2int(l.arg) + 4
+                    return offset - ((offset + 0x800) & 0xfffff000)
             elif (l.op in ["J", "BEQZ", "BNEZ", "BGT"]):
                 if l.name == "IMM":
                     imm = self.imm2int(l.arg)
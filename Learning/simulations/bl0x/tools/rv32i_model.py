@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# Instruction level model of RV32I, the reference for the RTL CPUs.
+#
+# Runs a program image (the words of RiscvAssembler.mem, or of a
+# Memory init) one instruction at a time. Memory is a list of 32 bit
+# words; addresses wrap at its size like in the word addressed RAM of
+# the steps. EBREAK and ECALL halt the model, as they stall the CPUs.
+#
+#   model = RV32I(a.mem, size=1024)
+#   model.run()
+#   print(model.regs[10], model.instret)
+
+def sext(value, bits):
+    """Sign extends the low bits of value."""
+    value &= (1 << bits) - 1
+    return value - (1 << bits) if value >> (bits - 1) else value
+
+class RV32I():
+    """The architectural state and an interpreter.
+
+    ```txt
+    Attributes:
+        regs    : x0..x31, unsigned 32 bit
+        pc      : Program counter
+        mem     : Memory words
+        instret : Instructions retired
+        halted  : Set by EBREAK/ECALL, pc stays on it
+        io      : Memory mapped IO above io.base, None for none
+    ```
+    """
+
+    def __init__(self, image, size=None, pc=0, io=None):
+        self.mem = list(image)
+        if size is not None:
+            if len(self.mem) > size:
+                raise Exception("Image of {} words does not fit in {}".format(len(self.mem), size))
+            self.mem += [0] * (size - len(self.mem))
+        self.regs = [0] * 32
+        self.pc = pc
+        self.instret = 0
+        self.halted = False
+        self.io = io
+
+    def word_index(self, addr):
+        return (addr >> 2) % len(self.mem)
+
+    def load(self, addr, funct3):
+        if self.io is not None and addr >= self.io.base:
+            return self.io.load(addr, funct3)
+        word = self.mem[self.word_index(addr)]
+        shift = (addr & 3) * 8
+        if funct3 & 3 == 0:
+            value = (word >> shift) & 0xff
+            return value if funct3 & 4 else sext(value, 8) & 0xffffffff
+        if funct3 & 3 == 1:
+            value = (word >> (shift & 16)) & 0xffff
+            return value if funct3 & 4 else sext(value, 16) & 0xffffffff
+        return word
+
+    def store(self, addr, funct3, value):
+        if self.io is not None and addr >= self.io.base:
+            self.io.store(addr, funct3, value)
+            return
+        index = self.word_index(addr)
+        if funct3 == 0:
+            mask, shift = 0xff, (addr & 3) * 8
+        elif funct3 == 1:
+            mask, shift = 0xffff, (addr & 2) * 8
+        else:
+            mask, shift = 0xffffffff, 0
+        self.mem[index] = (self.mem[index] & ~(mask << shift)) | ((value & mask) << shift)
+
+    def alu(self, funct3, alt, a, b):
+        if funct3 == 0b000:
+            return (a - b if alt else a + b) & 0xffffffff
+        if funct3 == 0b001:
+            return (a << (b & 31)) & 0xffffffff
+        if funct3 == 0b010:
+            return int(sext(a, 32) < sext(b, 32))
+        if funct3 == 0b011:
+            return int(a < b)
+        if funct3 == 0b100:
+            return a ^ b
+        if funct3 == 0b101:
+            if alt:
+                return (sext(a, 32) >> (b & 31)) & 0xffffffff
+            return a >> (b & 31)
+        if funct3 == 0b110:
+            return a | b
+        return a & b
+
+    def branch(self, funct3, a, b):
+        if funct3 == 0b000:
+            return a == b
+        if funct3 == 0b001:
+            return a != b
+        if funct3 == 0b100:
+            return sext(a, 32) < sext(b, 32)
+        if funct3 == 0b101:
+            return sext(a, 32) >= sext(b, 32)
+        if funct3 == 0b110:
+            return a < b
+        if funct3 == 0b111:
+            return a >= b
+        raise Exception("Illegal branch at 0x{:08x}".format(self.pc))
+
+    def step(self):
+        """Executes one instruction."""
+        if self.halted:
+            return
+
+        instr = self.mem[self.word_index(self.pc)]
+        opcode = instr & 0x7f
+        rd = (instr >> 7) & 31
+        funct3 = (instr >> 12) & 7
+        rs1 = self.regs[(instr >> 15) & 31]
+        rs2 = self.regs[(instr >> 20) & 31]
+        alt = (instr >> 30) & 1
+
+        i_imm = sext(instr >> 20, 12)
+        s_imm = sext(((instr >> 25) << 5) | ((instr >> 7) & 31), 12)
+        b_imm = sext(((instr >> 31) << 12) | (((instr >> 7) & 1) << 11) |
+                     (((instr >> 25) & 0x3f) << 5) | (((instr >> 8) & 0xf) << 1), 13)
+        u_imm = instr & 0xfffff000
+        j_imm = sext(((instr >> 31) << 20) | (((instr >> 12) & 0xff) << 12) |
+                     (((instr >> 20) & 1) << 11) | (((instr >> 21) & 0x3ff) << 1), 21)
+
+        next_pc = (self.pc + 4) & 0xffffffff
+        result = None
+
+        if opcode == 0b0110011:     # ALU reg
+            result = self.alu(funct3, alt, rs1, rs2)
+        elif opcode == 0b0010011:   # ALU imm, SRAI is the only one with alt
+            result = self.alu(funct3, alt and funct3 == 0b101, rs1, i_imm & 0xffffffff)
+        elif opcode == 0b0110111:   # LUI
+            result = u_imm
+        elif opcode == 0b0010111:   # AUIPC
+            result = (self.pc + u_imm) & 0xffffffff
+        elif opcode == 0b1101111:   # JAL
+            result = next_pc
+            next_pc = (self.pc + j_imm) & 0xffffffff
+        elif opcode == 0b1100111:   # JALR
+            result = next_pc
+            next_pc = (rs1 + i_imm) & 0xfffffffe
+        elif opcode == 0b1100011:   # Branch
+            if self.branch(funct3, rs1, rs2):
+                next_pc = (self.pc + b_imm) & 0xffffffff
+        elif opcode == 0b0000011:   # Load
+            result = self.load((rs1 + i_imm) & 0xffffffff, funct3)
+        elif opcode == 0b0100011:   # Store
+            self.store((rs1 + s_imm) & 0xffffffff, funct3, rs2)
+        elif opcode == 0b0001111:   # FENCE
+            pass
+        elif opcode == 0b1110011 and funct3 == 0:   # ECALL, EBREAK
+            self.halted = True
+            return
+        else:
+            raise Exception("Illegal instruction 0x{:08x} at 0x{:08x}".format(instr, self.pc))
+
+        if result is not None and rd != 0:
+            self.regs[rd] = result
+        self.pc = next_pc
+        self.instret += 1
+
+    def run(self, max_instructions=1000000, until=None):
+        """Runs until halted, max_instructions or until(self) is true.
+        Returns the number of instructions executed.
+        """
+        start = self.instret
+        while not self.halted and self.instret - start < max_instructions:
+            if until is not None and until(self):
+                break
+            self.step()
+        return self.instret - start
@@ -0,0 +1,536 @@
+#!/usr/bin/env python
+# Self-checking RV32I tests, run on the ISA model and on RTL CPUs.
+#
+# The tests are RiscvAssembler programs. "CHECK reg, value" compares a
+# register with the value it should have: it stores the register in the
+# signature (SIG + 4 * case) and branches to fail on a mismatch. At the
+# end the program writes the result to TOHOST and halts on EBREAK:
+#
+#   1                     all cases passed
+#   (case + 1) << 1 | 1   first case that failed, so case 0 is 3, not 1
+#
+# Each (cpu, test) runs in its own process on a bare CPU with a
+# DEPTH word RAM, so no step's SOC or clocks are involved:
+#
+#   python tools/rv32i_suite.py                       # all tests, all CPUs
+#   python tools/rv32i_suite.py add_sub loads --cpu femtorv32 --jobs 4
+#
+# Run from the bl0x directory. The CPUs are 17_memory_map/cpu.py and
+# lib/femtorv32.py by default, --cpu takes any step with a cpu.py.
+# Registers t5, t6 and s11 belong to CHECK, t1 to CALL.
+
+import argparse
+import contextlib
+import importlib.util
+import io
+import os
+import sys
+
+from concurrent.futures import ProcessPoolExecutor
+
+from amaranth.hdl import \
+    Elaboratable, \
+    Module, \
+    Memory
+
+from riscv_assembler import RiscvAssembler
+from rv32i_model import RV32I
+
+BL0X = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEPTH = 1024        # RAM words
+TOHOST = 0x7fc      # Result word, the program must end below it
+SIG = 0x800         # Signature, one word per CHECK
+MAX_CYCLES = 50000
+
+# name : (file, class)
+CPUS = {
+    "17_memory_map": (os.path.join(BL0X, "17_memory_map", "cpu.py"), "CPU"),
+    "femtorv32": (os.path.join(BL0X, "..", "..", "lib", "femtorv32.py"), "Intermission"),
+}
+
+PROLOGUE = """
+    LI s11, {sig}
+"""
+
+EPILOGUE = """
+    pass:
+    LI t6, 1
+    SW t6, zero, {tohost}
+    EBREAK
+    fail:
+    ADDI t5, t5, 1
+    ADD t5, t5, t5
+    ADDI t5, t5, 1
+    SW t5, zero, {tohost}
+    EBREAK
+"""
+
+def branch_test():
+    """Every branch taken and not taken: a2 is 1 when it was taken."""
+    cases = [
+        ("BEQ", "a0", "a3", 1), ("BEQ", "a0", "a1", 0),
+        ("BNE", "a0", "a1", 1), ("BNE", "a0", "a3", 0),
+        ("BLT", "a0", "a1", 1), ("BLT", "a1", "a0", 0), ("BLT", "a0", "a3", 0),
+        ("BGE", "a1", "a0", 1), ("BGE", "a0", "a1", 0), ("BGE", "a0", "a3", 1),
+        ("BLTU", "a1", "a0", 1), ("BLTU", "a0", "a1", 0), ("BLTU", "a0", "a3", 0),
+        ("BGEU", "a0", "a1", 1), ("BGEU", "a1", "a0", 0), ("BGEU", "a0", "a3", 1),
+    ]
+    text = """
+    LI a0, -1
+    LI a1, 1
+    LI a3, -1
+    """
+    for i, (op, rs1, rs2, taken) in enumerate(cases):
+        text += """
+    LI a2, 1
+    {op} {rs1}, {rs2}, branch{i}
+    LI a2, 0
+    branch{i}:
+    CHECK a2, {taken}
+    """.format(op=op, rs1=rs1, rs2=rs2, i=i, taken=taken)
+    text += """
+    LI a2, 0
+    LI a4, 5
+    loop:
+    ADDI a2, a2, 1
+    BNE a2, a4, loop
+    CHECK a2, 5
+    """
+    return text
+
+TESTS = {
+    "add_sub": """
+    LI a0, 1
+    LI a1, 2
+    ADD a2, a0, a1
+    CHECK a2, 3
+    SUB a2, a1, a0
+    CHECK a2, 1
+    SUB a2, a0, a1
+    CHECK a2, -1
+    LI a0, 100
+    LI a1, 50
+    SUB a2, a0, a1
+    CHECK a2, 50
+    SUB a2, a1, a0
+    CHECK a2, -50
+    LI a0, 0x7fffffff
+    ADDI a2, a0, 1
+    CHECK a2, 0x80000000
+    LI a0, 0x80000000
+    LI a1, 1
+    SUB a2, a0, a1
+    CHECK a2, 0x7fffffff
+    LI a0, -1
+    ADD a2, a0, a0
+    CHECK a2, -2
+    ADDI a2, a0, -2047
+    CHECK a2, -2048
+    ADDI a2, zero, 2047
+    CHECK a2, 2047
+    ADD zero, a0, a0        ; x0 stays 0
+    CHECK zero, 0
+    """,
+
+    "compares": """
+    LI a0, -1
+    LI a1, 1
+    SLT a2, a0, a1
+    CHECK a2, 1
+    SLTU a2, a0, a1
+    CHECK a2, 0
+    SLT a2, a1, a0
+    CHECK a2, 0
+    SLTU a2, a1, a0
+    CHECK a2, 1
+    SLT a2, a0, a0
+    CHECK a2, 0
+    SLTI a2, a0, 0
+    CHECK a2, 1
+    SLTI a2, a1, -1
+    CHECK a2, 0
+    SLTIU a2, a0, -1
+    CHECK a2, 0
+    SLTIU a2, a1, -1
+    CHECK a2, 1
+    SLTIU a2, zero, 1
+    CHECK a2, 1
+    SLTIU a2, a1, 1
+    CHECK a2, 0
+    LI a0, 0x80000000
+    LI a1, 0x7fffffff
+    SLT a2, a0, a1
+    CHECK a2, 1
+    SLTU a2, a0, a1
+    CHECK a2, 0
+    """,
+
+    "logic": """
+    LI a0, 0x0ff00ff0
+    LI a1, 0x00ff00ff
+    XOR a2, a0, a1
+    CHECK a2, 0x0f0f0f0f
+    OR a2, a0, a1
+    CHECK a2, 0x0fff0fff
+    AND a2, a0, a1
+    CHECK a2, 0x00f000f0
+    XORI a2, a0, -1
+    CHECK a2, 0xf00ff00f
+    XORI a2, a1, 0x0ff
+    CHECK a2, 0x00ff0000
+    ORI a2, a0, 0x00f
+    CHECK a2, 0x0ff00fff
+    ANDI a2, a0, 0x7f0
+    CHECK a2, 0x000007f0
+    ANDI a2, a0, -16
+    CHECK a2, 0x0ff00ff0
+    """,
+
+    "shifts": """
+    LI a0, 0x80000001
+    SLLI a2, a0, 1
+    CHECK a2, 0x00000002
+    SRLI a2, a0, 1
+    CHECK a2, 0x40000000
+    SRAI a2, a0, 1
+    CHECK a2, 0xc0000000
+    SRAI a2, a0, 31
+    CHECK a2, 0xffffffff
+    SRLI a2, a0, 31
+    CHECK a2, 1
+    SLLI a2, a0, 31
+    CHECK a2, 0x80000000
+    SLLI a2, a0, 0
+    CHECK a2, 0x80000001
+    LI a1, 4
+    SLL a2, a0, a1
+    CHECK a2, 0x00000010
+    SRL a2, a0, a1
+    CHECK a2, 0x08000000
+    SRA a2, a0, a1
+    CHECK a2, 0xf8000000
+    LI a1, 33               ; Only the low 5 bits count
+    SLL a2, a0, a1
+    CHECK a2, 0x00000002
+    SRA a2, a0, a1
+    CHECK a2, 0xc0000000
+    LI a0, 0x7ffffff0
+    SRA a2, a0, a1
+    CHECK a2, 0x3ffffff8
+    """,
+
+    "lui_auipc": """
+    LUI a0, 0x12345000
+    CHECK a0, 0x12345000
+    LUI a0, 0xfffff000
+    CHECK a0, 0xfffff000
+    JAL ra, here            ; ra is the address of here
+    here:
+    AUIPC a1, 0
+    XOR a2, a1, ra
+    CHECK a2, 0
+    AUIPC a1, 0x1000
+    AUIPC a3, 0
+    ADDI a3, a3, -4
+    XOR a2, a1, a3          ; The program is below 0x1000
+    CHECK a2, 0x1000
+    """,
+
+    "branches": branch_test(),
+
+    "jumps": """
+    LI a2, 0
+    JAL ra, j1
+    ADDI a2, a2, 1
+    j1:
+    CHECK a2, 0
+    LA a3, j1
+    ADDI a3, a3, -4
+    XOR a4, ra, a3
+    CHECK a4, 0
+    LA a3, j2
+    JALR ra, a3, 0
+    ADDI a2, a2, 1
+    j2:
+    CHECK a2, 0
+    LA a3, j2
+    ADDI a3, a3, -4
+    XOR a4, ra, a3
+    CHECK a4, 0
+    LA a3, j3
+    JALR zero, a3, 1        ; Bit 0 of the target is cleared
+    ADDI a2, a2, 1
+    j3:
+    CHECK a2, 0
+    LA a3, j4
+    JALR a3, a3, 0          ; rd is rs1
+    j4:
+    LA a5, j4
+    XOR a4, a3, a5
+    CHECK a4, 0
+    J after
+    sub:
+    LI a0, 7
+    RET
+    after:
+    LI a0, 0
+    CALL sub
+    CHECK a0, 7
+    """,
+
+    "loads": """
+    LA t0, load_data
+    LB a0, t0, 0
+    CHECK a0, 0xffffffe0
+    LBU a0, t0, 0
+    CHECK a0, 0xe0
+    LBU a0, t0, 1
+    CHECK a0, 0xb1
+    LB a0, t0, 2
+    CHECK a0, 0xffffffc2
+    LB a0, t0, 3
+    CHECK a0, 0xffffffd3
+    LBU a0, t0, 3
+    CHECK a0, 0xd3
+    LH a0, t0, 0
+    CHECK a0, 0xffffb1e0
+    LHU a0, t0, 0
+    CHECK a0, 0xb1e0
+    LH a0, t0, 2
+    CHECK a0, 0xffffd3c2
+    LHU a0, t0, 2
+    CHECK a0, 0xd3c2
+    LW a0, t0, 4
+    CHECK a0, 0xdeadbeef
+    LB a0, t0, 5
+    CHECK a0, 0xffffffbe
+    LW a0, t0, 8
+    CHECK a0, 0x7f7f0102
+    LB a0, t0, 11
+    CHECK a0, 0x7f
+    LH a0, t0, 8
+    CHECK a0, 0x0102
+    LA t1, load_end
+    LW a0, t1, -4
+    CHECK a0, 0x7f7f0102
+    J pass
+    load_data:
+    DATAW 0xd3c2b1e0
+    DATAW 0xdeadbeef
+    DATAW 0x7f7f0102
+    load_end:
+    """,
+
+    "stores": """
+    LA t0, store_data
+    LI a0, 0x12345678
+    SW a0, t0, 0
+    LW a1, t0, 0
+    CHECK a1, 0x12345678
+    SB a0, t0, 4
+    SB a0, t0, 5
+    SB a0, t0, 7
+    LW a1, t0, 4
+    CHECK a1, 0x78007878
+    SH a0, t0, 8
+    SH a0, t0, 10
+    LW a1, t0, 8
+    CHECK a1, 0x56785678
+    LI a0, -1
+    SB a0, t0, 1
+    LW a1, t0, 0
+    CHECK a1, 0x1234ff78
+    SH a0, t0, 2
+    LW a1, t0, 0
+    CHECK a1, 0xffffff78
+    LA t1, store_end
+    SW a0, t1, -4
+    LW a1, t0, 12
+    CHECK a1, -1
+    J pass
+    store_data:
+    DATAW 0
+    DATAW 0
+    DATAW 0
+    DATAW 0
+    store_end:
+    """,
+}
+
+def expand(text):
+    """The program of a test: CHECK expanded, prologue and epilogue
+    added. Returns (text, expected) with the expected value of every
+    case.
+    """
+    lines = [PROLOGUE.format(sig=SIG)]
+    expected = []
+    for line in text.splitlines():
+        code = line.split(';', maxsplit=1)[0].strip()
+        if code.upper().startswith("CHECK "):
+            reg, value = [x.strip() for x in code[6:].split(',')]
+            case = len(expected)
+            expected.append(int(value, 0) & 0xffffffff)
+            lines += [
+                "LI t5, {}".format(case),
+                "LI t6, {}".format(value),
+                "SW {}, s11, {}".format(reg, 4 * case),
+                "BNE {}, t6, fail".format(reg),
+            ]
+        else:
+            lines.append(line)
+    lines.append(EPILOGUE.format(tohost=TOHOST))
+    return "\n".join(lines), expected
+
+def build(name):
+    """Assembles test name. Returns (image, expected)."""
+    text, expected = expand(TESTS[name])
+    # The assembler reports every line it reads
+    with contextlib.redirect_stdout(io.StringIO()):
+        a = RiscvAssembler()
+        a.read(text)
+        a.assemble()
+    if len(a.mem) * 4 > TOHOST:
+        raise Exception("Test {} is {} bytes, it must end below 0x{:x}".format(
+            name, len(a.mem) * 4, TOHOST))
+    return a.mem, expected
+
+def check(mem, expected):
+    """(passed, description) from the final memory words of a run."""
+    result = mem[TOHOST >> 2]
+    if result == 1:
+        return True, "PASS"
+    if result & 1:
+        case = (result >> 1) - 1
+        got = mem[(SIG >> 2) + case] if case < len(expected) else None
+        return False, "FAIL case {}: 0x{:08x}, expected 0x{:08x}".format(
+            case, got, expected[case]) if got is not None else "FAIL case {}".format(case)
+    return False, "NO RESULT"
+
+class Harness(Elaboratable):
+    """A CPU on a DEPTH word RAM holding image. Reads take a cycle
+    from mem_rstrb, writes are byte masked by mem_wmask.
+    """
+
+    def __init__(self, cpu, image):
+        self.cpu = cpu
+        self.mem = Memory(width=32, depth=DEPTH, init=image)
+
+    def elaborate(self, platform):
+        m = Module()
+        m.submodules.cpu = cpu = self.cpu
+        m.submodules.rp = rp = self.mem.read_port(transparent=False)
+        m.submodules.wp = wp = self.mem.write_port(granularity=8)
+
+        word_addr = cpu.mem_addr[2:2 + (DEPTH - 1).bit_length()]
+        m.d.comb += [
+            rp.addr.eq(word_addr),
+            rp.en.eq(cpu.mem_rstrb),
+            cpu.mem_rdata.eq(rp.data),
+            wp.addr.eq(word_addr),
+            wp.data.eq(cpu.mem_wdata),
+            wp.en.eq(cpu.mem_wmask),
+        ]
+        return m
+
+def load_cpu(name):
+    """The CPU class of name, a CPUS entry or a step directory."""
+    path, cls = CPUS.get(name, (os.path.join(BL0X, name, "cpu.py"), "CPU"))
+    # Loaded from the file, the steps' cpu modules all have the same name
+    spec = importlib.util.spec_from_file_location("cpu_" + name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return getattr(module, cls)
+
+def run_model(name):
+    image, expected = build(name)
+    model = RV32I(image, size=DEPTH)
+    model.run(MAX_CYCLES)
+    passed, text = check(model.mem, expected)
+    return {"test": name, "cpu": "model", "passed": passed, "text": text,
+            "cycles": None, "instret": model.instret}
+
+def run_rtl(cpu_name, name):
+    """Runs test name on cpu_name. The CPUs stall on EBREAK, fetching
+    it again and again: two fetches in a row from the same address end
+    the run.
+    """
+    from amaranth.sim import Simulator
+
+    image, expected = build(name)
+    cpu = load_cpu(cpu_name)()
+    top = Harness(cpu, image)
+    sim = Simulator(top)
+    sim.add_clock(1e-6)
+
+    run = {"cycles": None, "mem": None}
+
+    def process():
+        last_addr, last_cycle = None, 0
+        for cycle in range(MAX_CYCLES):
+            yield
+            if (yield cpu.mem_rstrb):
+                addr = yield cpu.mem_addr
+                if addr == last_addr:
+                    run["cycles"] = last_cycle
+                    break
+                last_addr, last_cycle = addr, cycle
+        run["mem"] = []
+        for i in range(DEPTH):
+            run["mem"].append((yield top.mem[i]))
+
+    sim.add_sync_process(process)
+    sim.run()
+
+    passed, text = check(run["mem"], expected)
+    if run["cycles"] is None:
+        passed, text = False, "TIMEOUT " + text
+    return {"test": name, "cpu": cpu_name, "passed": passed, "text": text,
+            "cycles": run["cycles"], "instret": None}
+
+def run(job):
+    cpu_name, name = job
+    try:
+        if cpu_name == "model":
+            return run_model(name)
+        with contextlib.redirect_stdout(io.StringIO()):
+            return run_rtl(cpu_name, name)
+    except Exception as e:
+        return {"test": name, "cpu": cpu_name, "passed": False,
+                "text": "ERROR {}".format(e), "cycles": None, "instret": None}
+
+def main(tests, cpus, jobs=None):
+    """Runs tests on the model and cpus, prints cycles and, for a pass,
+    CPI (the cycles over the instructions the model retired). Returns
+    the number of failed runs.
+    """
+    all_jobs = [(cpu, name) for name in tests for cpu in ["model"] + cpus]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(run, all_jobs))
+
+    instret = {r["test"]: r["instret"] for r in results if r["cpu"] == "model"}
+    failed = 0
+    for r in results:
+        if r["cpu"] == "model":
+            cost = "{:6} instructions".format(r["instret"])
+        elif r["passed"]:
+            cost = "{:6} cycles {:5.2f} CPI".format(r["cycles"], r["cycles"] / instret[r["test"]])
+        elif r["cycles"] is not None:
+            cost = "{:6} cycles".format(r["cycles"])
+        else:
+            cost = ""
+        print("{:10} {:14} {:24} {}".format(r["test"], r["cpu"], cost, r["text"]))
+        if not r["passed"]:
+            failed += 1
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Self-checking RV32I tests")
+    parser.add_argument("tests", nargs="*", help="Tests to run, default all: " + ", ".join(TESTS))
+    parser.add_argument("--cpu", action="append",
+                        help="CPUS entry or step directory, default " + ", ".join(CPUS))
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Parallel runs, default one per CPU core")
+    args = parser.parse_args()
+
+    sys.exit(1 if main(args.tests or list(TESTS), args.cpu or list(CPUS), args.jobs) else 0)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# What a SOC prints, in simulation.
+#
+# Decodes the tx pin of a SOC like the PC side of the link would
+# (8N1, sampled in the middle of each bit) and collects the bytes,
+# optionally copying them to a file as they arrive:
+#
+#   monitor = UartMonitor(soc.tx, CLK_FREQ // BAUD, uart=soc.uart_tx,
+#                         file="uart.txt")
+#   sim.add_sync_process(monitor.process)
+#   ...
+#   print(bytes(monitor.data))
+#
+# A UART built with bypass=True (lib/uart_tx.py) leaves tx idle and
+# takes a byte every cycle, the monitor then records the bytes as the
+# UART takes them. A line of text is ~10 * 80 bit times on the pin but
+# only 80 cycles in bypass, the firmware no longer waits for the FIFO.
+# Pass the UART as uart= and the same bench works both ways.
+#
+# In bypass the monitor reads sent once per clock of the domain its
+# process runs in, so that must be the UART's domain. A UART in "slow"
+# needs add_sync_process(monitor.process, domain="slow"): from "sync"
+# each byte would be recorded once for every sync clock that sent is
+# high, i.e. for the whole slow cycle.
+
+from amaranth.sim import Passive
+
+class UartMonitor():
+    """Bytes sent by a UART in simulation.
+
+    ```txt
+    Attributes:
+        tx         : Serial output to decode
+        bit_cycles : Clocks per bit, of the domain the process runs in
+        uart       : Optional UartTx/UartTxFifo, used if it is bypassed
+        file       : Optional path or file object the bytes are copied to
+        data       : bytearray, everything received so far
+        times      : Cycle each byte was complete at
+        cycle      : Cycles since the process started
+    ```
+    """
+
+    def __init__(self, tx, bit_cycles, uart=None, file=None):
+        self.tx = tx
+        self.bit_cycles = bit_cycles
+        self.uart = uart
+        self.file = file
+
+        self.data = bytearray()
+        self.times = []
+        self.cycle = 0
+
+    @property
+    def bypassed(self):
+        return self.uart is not None and self.uart.bypass
+
+    def received(self, byte, out):
+        self.data.append(byte)
+        self.times.append(self.cycle)
+        if out is not None:
+            out.write(bytes([byte]))
+            out.flush()
+
+    def clock(self):
+        yield
+        self.cycle += 1
+
+    def process(self):
+        """Passive sync process, for add_sync_process() in the domain of
+        the UART (and of bit_cycles).
+        """
+        yield Passive()
+
+        out = self.file
+        if isinstance(out, str):
+            out = open(out, "wb")
+        elif hasattr(out, "buffer"):
+            # A text stream (sys.stdout), write to its byte buffer
+            out = out.buffer
+
+        while True:
+            yield from self.clock()
+
+            if self.bypassed:
+                if (yield self.uart.sent):
+                    self.received((yield self.uart.sent_data), out)
+                continue
+
+            if (yield self.tx) == 0:
+                # Middle of the start bit, then every bit
+                for _ in range(self.bit_cycles // 2):
+                    yield from self.clock()
+                byte = 0
+                for i in range(8):
+                    for _ in range(self.bit_cycles):
+                        yield from self.clock()
+                    byte |= (yield self.tx) << i
+                for _ in range(self.bit_cycles):
+                    yield from self.clock()
+                self.received(byte, out)
+
+    def wait(self, count):
+        """Waits (in a sync process) until count bytes were received."""
+        while len(self.data) < count:
+            yield
+
+    def wait_for(self, text):
+        """Waits (in a sync process) until the output ends with text."""
+        while not self.data.endswith(text):
+            yield
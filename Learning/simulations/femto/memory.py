@@ -6,35 +6,45 @@ from amaranth.hdl import \
     Module, \
     Array
 
-class Mem(Elaboratable):
+from lib.elf import load_elf
+
+def read_hex(path):
+    # Read hex file. Parse each line for instruction and locate
+    # hex instruction and convert to 32bit hex value and
+    # append to the list.
+    instructions = []
+
+    # Format of input is: @00000004 0042A383
+    paddr = 0
+
+    with open(path, 'r') as f:
+        for line in f:
+            fields = line.split()
+            nddr = fields[0].split("@")[1]
+            naddr = int(nddr, 16)
 
-    def __init__(self):
-        # Read hex file. Parse each line for instruction and locate
-        # hex instruction and convert to 32bit hex value and
-        # append to Array.
-
-        self.instructions = []
-
-        # Read firmware.hex from build on RAMDisk
-        # Format of input is: @00000004 0042A383
-        paddr = 0
-
-        with open('/media/RAMDisk/firmware.hex', 'r') as f:
-            for line in f:
-                fields = line.split()
-                nddr = fields[0].split("@")[1]
-                naddr = int(nddr, 16)
-            
-                if naddr > (paddr + 1):
-                    # Pad gap with Zeroes
-                    while paddr < (naddr-1) :
-                        self.instructions.append(0x00000000)
-                        paddr += 1
-                paddr = naddr
-
-                instr = int(fields[1], 16)
-                self.instructions.append(instr)
+            if naddr > (paddr + 1):
+                # Pad gap with Zeroes
+                while paddr < (naddr-1) :
+                    instructions.append(0x00000000)
+                    paddr += 1
+            paddr = naddr
+
+            instr = int(fields[1], 16)
+            instructions.append(instr)
+
+    return instructions
+
+class Mem(Elaboratable):
 
+    def __init__(self, firmware='/media/RAMDisk/script'):
+        """firmware : The linked program (ELF, see lib/elf.py), or a
+                   firmware.hex made by objdump and out2hex.
+        """
+        if firmware.endswith('.hex'):
+            self.instructions = read_hex(firmware)
+        else:
+            self.instructions = load_elf(firmware)
 
         # Instruction memory initialised with above instructions
         self.mem = Array([Signal(32, reset=x, name="mem{}".format(i))
@@ -68,6 +68,18 @@ class KeksPlatform(LatticeICE40Platform):
             attrs=Attrs(IO_STANDARD="LVCMOS33"),
         ),
 
+        # Bank 1 without the address bus. Both banks share A0-A17, so a
+        # design driving both banks at once requests ("sram", 0) for the
+        # address and this resource for bank 1's control and data lines.
+        Resource("sram_shared", 1,
+            Subsignal("cs", PinsN("P2", dir="o")),
+            Subsignal("oe", PinsN("P1", dir="o")),
+            Subsignal("we", PinsN("M6", dir="o")),
+            Subsignal("dm", PinsN("N2 N3", dir="o")),
+            Subsignal("d",  Pins("R1 M3 M4 N4 K4 K5 L5 M5 M1 L1 M2 K1 K3 J2 J1 H1", dir="io")),
+            Attrs(IO_STANDARD="LVCMOS33"),
+        ),
+
         # *SPIFlashResources(0,
         #     cs_n="AA2", clk="AE3", cipo="AE2", copi="AD2", wp_n="AF2", hold_n="AE1",
         #     attrs=Attrs(IO_TYPE="LVCMOS33")